@@ -0,0 +1,857 @@
+"""Benchmarks del cubo interactivo.
+
+Uso:
+    python benchmark.py deform [--sizes 16 32 64 128 256] [--iterations 200] [--json]
+    python benchmark.py decode mish.mp4 mish2.gif [--seconds 5] [--json]
+    python benchmark.py render [--scenarios idle one_video ...] [--frames 300] [--backend egl] [--json]
+    python benchmark.py glcheck [--scenarios two_videos player] [--frames 600] [--json]
+    python benchmark.py idle [--scenarios paused playing two_videos] [--seconds 10] [--json]
+    python benchmark.py wall [--counts 1 4 16 64 100] [--frames 200] [--json]
+    python benchmark.py pool mish.mp4 [--streams 1 2 4 8 16 32] [--seconds 5] [--json]
+    python benchmark.py coverage [--zooms -6 -15 -30] [--frames 300] [--json]
+    python benchmark.py drag [--rates 1 4 16 64] [--frames 200] [--json]
+
+'render' dibuja sin ventana visible (ver headless.py) escenarios fijos y reporta
+p50/p95/p99 del tiempo de frame, de decodificación y de subida de texturas; con
+--json la salida incluye el commit para comparar entre versiones. 'glcheck' repite
+'render' en procesos separados con cada modo de CUBE_GL_DEBUG (ver gldebug.py).
+'idle' mide la CPU de los bucles principales con el bucle continuo original y con
+el RenderGovernor (ver governor.py). 'wall' dibuja la pared de videowall.py con
+cada vez más cubos, con una llamada instanciada y con una llamada por cubo.
+'pool' compara cuántos frames por segundo llegan al proceso de render con N
+streams decodificados en hilos del mismo proceso y en el DecodePool (ver
+decodepool.py); los frames se consumen sin esperar al reloj.
+'coverage' reproduce dos videos con el cubo a distintas distancias, a resolución
+nativa y con la ResolutionPolicy (ver coverage.py), y reporta el escalón elegido
+y lo que se ahorra en decodificación y en subida de texturas. 'drag' arrastra un
+vértice de proyecto.py con N eventos del cursor por frame, procesando cada evento
+con lecturas de GL como antes y agrupados en uno por frame sin lecturas.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from mesh import FaceMesh
+
+CUBE_VERTICES = np.array([
+    [-1, -1,  1], [ 1, -1,  1], [ 1,  1,  1], [-1,  1,  1],
+    [-1, -1, -1], [ 1, -1, -1], [ 1,  1, -1], [-1,  1, -1],
+], dtype=np.float32)
+CUBE_FACES = {
+    'frente': [0, 1, 2, 3],
+    'derecha': [1, 5, 6, 2],
+    'arriba': [3, 2, 6, 7],
+}
+
+
+def percentiles(samples):
+    if len(samples) == 0:
+        return {'mean_ms': None, 'p50_ms': None, 'p95_ms': None, 'p99_ms': None}
+    samples = np.asarray(samples, dtype=np.float64) * 1000.0
+    return {
+        'mean_ms': float(samples.mean()),
+        'p50_ms': float(np.percentile(samples, 50)),
+        'p95_ms': float(np.percentile(samples, 95)),
+        'p99_ms': float(np.percentile(samples, 99)),
+    }
+
+
+def bench_deform(sizes, iterations, radius=1.0):
+    """Coste de una actualización de arrastre (las 3 caras que comparten la esquina 2)"""
+    results = []
+    rng = np.random.default_rng(0)
+    for n in sizes:
+        meshes = [FaceMesh(CUBE_VERTICES[idx], n) for idx in CUBE_FACES.values()]
+        corner = CUBE_VERTICES[2].copy()
+        samples = []
+        for _ in range(iterations):
+            delta = rng.normal(scale=0.01, size=3).astype(np.float32)
+            t0 = time.perf_counter()
+            for mesh in meshes:
+                mesh.deform(corner, delta, radius)
+            samples.append(time.perf_counter() - t0)
+            corner += delta
+        result = {'grid': f"{n}x{n}", 'vertices_per_face': (n + 1) ** 2}
+        result.update(percentiles(samples))
+        results.append(result)
+    return results
+
+
+def _measure_cpu(step, seconds, tick=1 / 60):
+    """CPU del proceso (todos los hilos) por segundo de reproducción llamando a step() cada tick"""
+    cpu0, wall0 = time.process_time(), time.perf_counter()
+    next_tick = wall0
+    while time.perf_counter() - wall0 < seconds:
+        step()
+        next_tick += tick
+        delay = next_tick - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+    wall = time.perf_counter() - wall0
+    return (time.process_time() - cpu0) / wall
+
+
+def bench_decode(paths, seconds):
+    """CPU por stream: VideoCapture + MediaPlayer (decodificación doble) contra MediaSource"""
+    import cv2
+    from ffpyplayer.player import MediaPlayer
+    from clock import MasterClock, FrameScheduler
+    from decoder import FrameRing
+    from media import MediaSource
+
+    results = []
+    for path in paths:
+        # Antes: OpenCV decodifica el video y MediaPlayer lo decodifica otra vez para el audio
+        cap = cv2.VideoCapture(path)
+        # En bucle como el video, para comparar el coste sostenido de cada stream
+        player = MediaPlayer(path, ff_opts={'loop': 0})
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        last = [time.time()]
+
+        def old_step():
+            player.get_frame()
+            now = time.time()
+            if now - last[0] < 1.0 / fps:
+                return
+            last[0] = now
+            ret, frame = cap.read()
+            if not ret:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                return
+            np.flipud(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)).copy()
+
+        before = _measure_cpu(old_step, seconds)
+        cap.release()
+        player.close_player()
+
+        # Después: un solo MediaSource, frames YUV presentados por el reloj
+        source = MediaSource(path, yuv=True)
+        ring = FrameRing(4)
+        scheduler = FrameScheduler(MasterClock(source.get_pts), ring, 1.0 / source.fps)
+
+        def new_step():
+            while ring.depth < ring.capacity:
+                item = source.read_frame()
+                if item is None:
+                    break
+                ring.push(item)
+            scheduler.next_frame()
+
+        after = _measure_cpu(new_step, seconds)
+        source.close()
+        results.append({
+            'source': path,
+            'cpu_before': before,
+            'cpu_after': after,
+            'saving_pct': 100.0 * (1.0 - after / before) if before > 0 else 0.0,
+        })
+    return results
+
+
+RENDER_SCENARIOS = ('idle', 'one_video', 'two_videos', 'drag', 'switch', 'player')
+PLAYLIST = ['mish.mp4', 'mish2.gif', 'mish4.gif']
+
+
+def _timed(obj, name, samples, keep=None):
+    """Reemplaza obj.name por una versión que guarda en samples cuánto tarda cada llamada"""
+    fn = getattr(obj, name)
+
+    def wrapper(*args, **kwargs):
+        t0 = time.perf_counter()
+        result = fn(*args, **kwargs)
+        if keep is None or keep(result):
+            samples.append(time.perf_counter() - t0)
+        return result
+
+    setattr(obj, name, wrapper)
+
+
+def _instrument_texture(texture, samples):
+    for name in ('upload', 'upload_image', 'upload_planes'):
+        if hasattr(texture, name):
+            _timed(texture, name, samples)
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)))
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def _init_headless(backend):
+    """Prepara el entorno para dibujar sin ventana; devuelve el backend elegido"""
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')  # sin audio: ejecuciones reproducibles
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')  # stdout limpio para --json
+    import headless
+    backend = backend or headless.default_backend()
+    headless.use_backend(backend)  # antes que OpenGL: elige la plataforma de PyOpenGL
+    import gldebug  # noqa: F401  también antes: decide el chequeo de errores por llamada de PyOpenGL
+    return backend
+
+
+def _cube_scenario(name, width, height, backend, renderer_mode, switch_every):
+    """(app, step, release) de un escenario de window.InteractiveCubeApp"""
+    from window import InteractiveCubeApp
+    from picking import project_points
+
+    app = InteractiveCubeApp(width, height, renderer_mode=renderer_mode)
+    app.video_path = {
+        'idle': {},
+        'one_video': {'derecha': 'mish.mp4'},
+    }.get(name, {'arriba': 'mish.mp4', 'derecha': 'mish4.gif'})
+    app.right_video_list = PLAYLIST
+    app.right_video_index = PLAYLIST.index(app.video_path.get('derecha', PLAYLIST[0]))
+    app.init_headless(backend)
+    decode, upload = [], []
+
+    open_video = app.open_video
+
+    def instrumented_open(path, face):
+        vp = open_video(path, face)
+        if hasattr(vp, 'decoder'):
+            _timed(vp.decoder, 'read_frame', decode, keep=lambda item: item is not None)
+        return vp
+
+    app.open_video = instrumented_open
+    app.load_resources()
+    # Las capas son de las caras: se instrumentan una sola vez aunque cambie el video
+    for face in app.video_path:
+        _instrument_texture(app.face_textures[face], upload)
+
+    step = None
+    if name == 'drag':
+        # Arrastrar la esquina 2 en círculo alrededor de su posición en pantalla
+        view, proj = app.setup_proj()
+        win, _ = project_points(app.cube.vertices[2:3], proj @ view, (0, 0, width, height))
+        cx, cy = win[0][0], height - win[0][1]
+        app.selected_vertex = 2
+
+        def step(i):
+            angle = i * 0.1
+            app.mouse_motion_callback(None, cx + 40 * np.cos(angle), cy + 40 * np.sin(angle))
+    elif name == 'switch':
+        def step(i):
+            if i % switch_every == switch_every - 1:
+                app.toggle_video()
+
+    return app.render, step, app.context, app.cleanup, decode, upload
+
+
+def _player_scenario(width, height, backend, renderer_mode):
+    """Bucle principal de proyecto.py con mish.mp4 reproduciéndose"""
+    import proyecto
+
+    proyecto.video_path = 'mish.mp4'
+    proyecto.window_width, proyecto.window_height = width, height
+    if renderer_mode:
+        proyecto.renderer_mode = renderer_mode
+    proyecto.setup(headless=backend)
+    decode, upload = [], []
+    _timed(proyecto.source, 'read_frame', decode, keep=lambda item: item is not None)
+    _instrument_texture(proyecto.video_texture, upload)
+    proyecto.is_playing = True
+    proyecto.set_paused(False)
+    return proyecto.render_frame, None, proyecto.headless_context, proyecto.shutdown, decode, upload
+
+
+def bench_render(scenarios, frames, warmup=30, width=1280, height=720, backend=None,
+                 renderer_mode=None, switch_every=30, fps=60):
+    """Tiempo de frame (render + glFinish), decodificación y subida por escenario.
+
+    Con fps los frames se lanzan a ese ritmo (el video avanza como en la app);
+    la espera entre frames no cuenta en el tiempo de frame.
+    """
+    backend = _init_headless(backend)
+    import gldebug
+    from OpenGL.GL import glFinish, glGetString, GL_RENDERER
+
+    results = []
+    for name in scenarios:
+        if name == 'player':
+            render, step, context, release, decode, upload = _player_scenario(
+                width, height, backend, renderer_mode)
+        else:
+            render, step, context, release, decode, upload = _cube_scenario(
+                name, width, height, backend, renderer_mode, switch_every)
+        gl_renderer = glGetString(GL_RENDERER).decode(errors='replace')
+        samples = []
+        next_frame = time.perf_counter()
+        try:
+            for i in range(warmup + frames):
+                if i == warmup:
+                    del decode[:], upload[:]
+                t0 = time.perf_counter()
+                if step is not None:
+                    step(i)
+                render()
+                context.swap()
+                glFinish()
+                if i >= warmup:
+                    samples.append(time.perf_counter() - t0)
+                if fps:
+                    next_frame += 1.0 / fps
+                    delay = next_frame - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+        finally:
+            release()
+        result = {'scenario': name, 'frames': frames}
+        for prefix, values in (('frame', samples), ('decode', decode), ('upload', upload)):
+            result.update({f"{prefix}_{k}": v for k, v in percentiles(values).items() if k != 'mean_ms'})
+            result[f"{prefix}_count"] = len(values)
+        results.append(result)
+    return {
+        'commit': _git_commit(),
+        'backend': backend,
+        'renderer': renderer_mode or os.environ.get('CUBE_RENDERER', 'shader'),
+        'gl_renderer': gl_renderer,
+        'size': [width, height],
+        'fps': fps,
+        'gl_debug': gldebug.stats(),
+        'scenarios': results,
+    }
+
+
+GL_DEBUG_MODES = {
+    'strict': "KHR_debug + chequeo de PyOpenGL en cada llamada",
+    '1': "solo callback de KHR_debug",
+    '0': "release, sin chequeos",
+}
+
+
+def bench_glcheck(scenarios, frames, modes=('strict', '1', '0'), backend=None, size=(320, 180)):
+    """Tiempo de frame con cada modo de CUBE_GL_DEBUG, cada uno en su propio proceso
+    (PyOpenGL fija el chequeo de errores al importarse). La ventana es chica para que
+    el costo de rasterizar no tape el de las llamadas a GL."""
+    results = []
+    baseline = {}
+    for mode in modes:
+        cmd = [sys.executable, os.path.abspath(__file__), 'render', '--json', '--fps', '0',
+               '--frames', str(frames), '--size', str(size[0]), str(size[1]), '--scenarios', *scenarios]
+        if backend:
+            cmd += ['--backend', backend]
+        env = dict(os.environ, CUBE_GL_DEBUG=mode)
+        out = subprocess.run(cmd, env=env, capture_output=True, text=True, check=True)
+        report = json.loads(out.stdout)
+        for r in report['scenarios']:
+            p50 = r['frame_p50_ms']
+            baseline.setdefault(r['scenario'], p50)
+            results.append({
+                'mode': mode,
+                'scenario': r['scenario'],
+                'frame_p50_ms': p50,
+                'frame_p95_ms': r['frame_p95_ms'],
+                'saving_ms': baseline[r['scenario']] - p50,
+                'saving_pct': 100.0 * (1.0 - p50 / baseline[r['scenario']]),
+            })
+    return results
+
+
+DRAG_MODES = ('readback', 'coalesced')
+
+
+def _readback_motion(xpos, ypos):
+    """El mouse_motion_callback anterior de proyecto.py: matrices, viewport y
+    profundidad bajo el cursor leídos de GL en cada evento"""
+    import proyecto
+    from OpenGL.GL import (GL_DEPTH_COMPONENT, GL_FLOAT, GL_MODELVIEW_MATRIX, GL_PROJECTION_MATRIX,
+                           GL_VIEWPORT, glGetDoublev, glGetIntegerv, glReadPixels)
+    from OpenGL.GLU import gluUnProject
+
+    modelview = glGetDoublev(GL_MODELVIEW_MATRIX)
+    projection = glGetDoublev(GL_PROJECTION_MATRIX)
+    viewport = glGetIntegerv(GL_VIEWPORT)
+    win_y = viewport[3] - ypos
+    win_z = glReadPixels(int(xpos), int(win_y), 1, 1, GL_DEPTH_COMPONENT, GL_FLOAT)
+    world = gluUnProject(xpos, win_y, win_z[0][0], modelview, projection, viewport)
+    if world:
+        proyecto.vertices[proyecto.selected_vertex] = world[:3]
+        proyecto.vertex_version += 1
+        proyecto.renderer.invalidate()
+
+
+def _load_gl_matrices():
+    """Deja en la pila de GL las matrices de la cámara, como hacía render_frame
+    antes de camera.py, para que _readback_motion las lea"""
+    import proyecto
+    from OpenGL.GL import GL_MODELVIEW, GL_PROJECTION, glLoadMatrixf, glMatrixMode
+    from transforms import to_gl
+
+    glMatrixMode(GL_PROJECTION)
+    glLoadMatrixf(to_gl(proyecto.camera.projection))
+    glMatrixMode(GL_MODELVIEW)
+    glLoadMatrixf(to_gl(proyecto.camera.view))
+
+
+def bench_drag(rates, frames, warmup=30, modes=DRAG_MODES, width=1000, height=800, backend=None, fps=60):
+    """Costo y latencia de arrastrar un vértice en proyecto.py con rate eventos del cursor por frame.
+
+    handler es lo que tardan los callbacks del cursor y apply_drag en cada frame;
+    latency va del primer evento del frame hasta que la GPU terminó ese frame.
+    """
+    backend = _init_headless(backend)
+    import proyecto
+    from OpenGL.GL import glFinish
+    from picking import project_points
+
+    proyecto.video_path = 'mish.mp4'
+    proyecto.window_width, proyecto.window_height = width, height
+    proyecto.setup(headless=backend)
+    applied = []
+    _timed(proyecto, 'apply_drag', applied)
+    results = []
+    try:
+        proyecto.render_frame()
+        start = proyecto.vertices.copy()
+        win, _ = project_points(start[1:2], proyecto.camera.view_projection, proyecto.camera.viewport)
+        cx, cy = win[0][0], height - win[0][1]
+        for rate in rates:
+            for mode in modes:
+                proyecto.vertices[:] = start
+                proyecto.vertex_version += 1
+                proyecto.renderer.invalidate()
+                proyecto.selected_vertex = 1
+                if mode == 'readback':
+                    _load_gl_matrices()
+                handler, latency, frame = [], [], []
+                next_frame = time.perf_counter()
+                for i in range(warmup + frames):
+                    n_applied = len(applied)
+                    t0 = time.perf_counter()
+                    for k in range(rate):
+                        angle = (i * rate + k) * 0.01
+                        x, y = cx + 30 * np.cos(angle), cy + 30 * np.sin(angle)
+                        if mode == 'readback':
+                            _readback_motion(x, y)
+                        else:
+                            proyecto.mouse_motion_callback(None, x, y)
+                    t1 = time.perf_counter()
+                    proyecto.render_frame()
+                    proyecto.headless_context.swap()
+                    glFinish()
+                    t2 = time.perf_counter()
+                    if i >= warmup:
+                        handler.append(t1 - t0 + sum(applied[n_applied:]))
+                        latency.append(t2 - t0)
+                        frame.append(t2 - t1)
+                    if fps:
+                        next_frame += 1.0 / fps
+                        delay = next_frame - time.perf_counter()
+                        if delay > 0:
+                            time.sleep(delay)
+                result = {'rate': rate, 'mode': mode}
+                for prefix, values in (('handler', handler), ('latency', latency), ('frame', frame)):
+                    result.update({f"{prefix}_{k}": v for k, v in percentiles(values).items()
+                                   if k in ('p50_ms', 'p95_ms')})
+                results.append(result)
+        proyecto.selected_vertex = None
+    finally:
+        proyecto.shutdown()
+    return results
+
+
+IDLE_SCENARIOS = ('paused', 'playing', 'two_videos')
+IDLE_MODES = {
+    'continuous': {'CUBE_CONTINUOUS': '1', 'CUBE_MAX_FPS': '0'},  # bucle original
+    'governor': {'CUBE_CONTINUOUS': '0'},
+}
+
+
+def _idle_run(scenario, seconds, width, height, backend=None):
+    """CPU del proceso con el bucle principal real (governor incluido) durante seconds"""
+    backend = _init_headless(backend)
+    if scenario == 'two_videos':
+        from window import InteractiveCubeApp
+        app = InteractiveCubeApp(width, height)
+        app.video_path = {'arriba': 'mish.mp4', 'derecha': 'mish4.gif'}
+        app.right_video_list = PLAYLIST
+        app.right_video_index = PLAYLIST.index('mish4.gif')
+        app.init_headless(backend)
+        app.load_resources()
+        loop, release = app.loop, app.cleanup
+        get_governor = lambda: app.governor  # noqa: E731
+    else:
+        import proyecto
+        proyecto.video_path = 'mish.mp4'
+        proyecto.window_width, proyecto.window_height = width, height
+        proyecto.setup(headless=backend)
+        if scenario == 'playing':
+            proyecto.is_playing = True
+            proyecto.set_paused(False)
+        loop = lambda should_close: proyecto.run_loop(None, should_close)  # noqa: E731
+        release = proyecto.shutdown
+        get_governor = lambda: proyecto.governor  # noqa: E731
+    try:
+        cpu0, wall0 = time.process_time(), time.perf_counter()
+        loop(lambda: time.perf_counter() - wall0 >= seconds)
+        wall = time.perf_counter() - wall0
+        cpu = time.process_time() - cpu0
+        stats = get_governor().stats()
+    finally:
+        release()
+    return {
+        'scenario': scenario,
+        'cpu_pct': 100.0 * cpu / wall,
+        'fps': stats['frames'] / wall,
+        'wakeups_per_s': stats['wakeups'] / wall,
+    }
+
+
+def bench_idle(scenarios, seconds, modes=tuple(IDLE_MODES), backend=None, size=(1280, 720)):
+    """CPU de cada escenario con cada modo de bucle, cada uno en su propio proceso"""
+    results = []
+    baseline = {}
+    for scenario in scenarios:
+        for mode in modes:
+            cmd = [sys.executable, os.path.abspath(__file__), 'idle', '--inprocess', '--json',
+                   '--seconds', str(seconds), '--size', str(size[0]), str(size[1]), '--scenarios', scenario]
+            if backend:
+                cmd += ['--backend', backend]
+            env = dict(os.environ, **IDLE_MODES[mode])
+            out = subprocess.run(cmd, env=env, capture_output=True, text=True, check=True)
+            r = json.loads(out.stdout)[0]
+            baseline.setdefault(scenario, r['cpu_pct'])
+            r = dict(mode=mode, **r)
+            r['cpu_saving_pct'] = baseline[scenario] - r['cpu_pct']
+            results.append(r)
+    return results
+
+
+POOL_MODES = ('threads', 'processes')
+
+
+def _drain(rings, seconds):
+    """Saca todos los frames disponibles de rings durante seconds; devuelve (frames, cpu, wall)"""
+    frames = 0
+    cpu0, wall0 = time.process_time(), time.perf_counter()
+    while time.perf_counter() - wall0 < seconds:
+        got = 0
+        for ring in rings:
+            if ring.pop_due(float('inf')) is not None:
+                got += 1
+        frames += got
+        if not got:
+            time.sleep(0.001)
+    return frames, time.process_time() - cpu0, time.perf_counter() - wall0
+
+
+def bench_pool(path, streams, seconds, modes=POOL_MODES, yuv=True):
+    """Frames por segundo entregados al render con N streams de path.
+
+    threads es el camino de VideoPlayer (MediaSource + DecodeThread, todo bajo
+    el GIL de este proceso); processes usa un proceso por stream. render_cpu_pct
+    es la CPU de este proceso: en threads incluye la decodificación.
+    """
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    from decoder import DecodeThread, FrameRing
+    from decodepool import DecodePool
+    from media import MediaSource
+
+    results = []
+    for n in streams:
+        for mode in modes:
+            startup = time.perf_counter()
+            if mode == 'threads':
+                sources = [MediaSource(path, yuv=yuv, audio=False) for _ in range(n)]
+                threads = [DecodeThread(source.read_frame, ring=FrameRing(4), name=f"decoder:{i}")
+                           for i, source in enumerate(sources)]
+                for thread in threads:
+                    thread.start()
+                rings = [thread.ring for thread in threads]
+                while any(ring.next_pts() is None for ring in rings):
+                    time.sleep(0.005)
+            else:
+                pool = DecodePool(max_workers=n)
+                pooled = [pool.open(path, yuv) for _ in range(n)]
+                while not all(stream.poll() for stream in pooled):
+                    if any(stream.error for stream in pooled):
+                        raise RuntimeError(pooled[0].error)
+                    time.sleep(0.005)
+                rings = [stream.ring for stream in pooled]
+            startup = time.perf_counter() - startup
+            try:
+                frames, cpu, wall = _drain(rings, seconds)
+            finally:
+                if mode == 'threads':
+                    for thread in threads:
+                        thread.stop()
+                    for source in sources:
+                        source.close()
+                else:
+                    pool.shutdown()
+            results.append({
+                'streams': n,
+                'mode': mode,
+                'fps_total': frames / wall,
+                'fps_per_stream': frames / wall / n,
+                'render_cpu_pct': 100.0 * cpu / wall,
+                'startup_s': startup,
+            })
+    return results
+
+
+WALL_MODES = ('instanced', 'per_cube')
+
+
+def bench_wall(counts, frames, warmup=30, modes=WALL_MODES, width=1280, height=720, backend=None,
+               fps=60):
+    """Tiempo de frame de la pared de cubos según la cantidad de cubos.
+
+    submit es lo que tarda la CPU en emitir el dibujo (sin glFinish); los cubos
+    comparten 4 videos, así que los decodificadores no crecen con la pared.
+    """
+    backend = _init_headless(backend)
+    from OpenGL.GL import glFinish
+    from videowall import VideoWallApp
+
+    results = []
+    for count in counts:
+        for mode in modes:
+            app = VideoWallApp(count=count, width=width, height=height, renderer_mode='shader')
+            app.init_headless(backend)
+            try:
+                app.load_resources()
+                app.wall.instanced = mode == 'instanced'
+                view, proj = app.setup_proj()
+                frame, submit = [], []
+                calls0 = oversized0 = 0
+                next_frame = time.perf_counter()
+                for i in range(warmup + frames):
+                    if i == warmup:
+                        calls0 = app.renderer.draw_calls
+                        oversized0 = app.wall.oversized()
+                    t0 = time.perf_counter()
+                    app.wall.update()
+                    t1 = time.perf_counter()
+                    app.wall.draw(view, proj)
+                    t2 = time.perf_counter()
+                    app.context.swap()
+                    glFinish()
+                    if i >= warmup:
+                        frame.append(time.perf_counter() - t0)
+                        submit.append(t2 - t1)
+                    if fps:
+                        next_frame += 1.0 / fps
+                        delay = next_frame - time.perf_counter()
+                        if delay > 0:
+                            time.sleep(delay)
+                stats = app.wall.stats()
+                result = {'cubes': count, 'mode': mode}
+                for prefix, values in (('frame', frame), ('submit', submit)):
+                    result.update({f"{prefix}_{k}": v for k, v in percentiles(values).items()
+                                   if k in ('p50_ms', 'p95_ms')})
+                result['draw_calls'] = (app.renderer.draw_calls - calls0) / frames
+                result['decoders'] = stats['decoders']
+                result['layers'] = stats['layers']
+                # Con el decodificador ya al tamaño de la capa no debería llegar ninguno más
+                result['oversized'] = stats['oversized'] - oversized0
+                results.append(result)
+            finally:
+                app.cleanup()
+    return results
+
+
+COVERAGE_MODES = ('native', 'adaptive')
+
+
+def bench_coverage(zooms, frames, warmup=60, modes=COVERAGE_MODES, width=1280, height=720, backend=None,
+                   fps=60):
+    """Decodificación y subida de dos videos según el zoom, con y sin resolución adaptativa.
+
+    Los MB subidos se cuentan por píxel (1,5 bytes en YUV 4:2:0, 3 en RGB); la
+    CPU es la de todo el proceso, decodificadores incluidos. ffpyplayer escala
+    después de decodificar: lo que baja es el frame que entrega el decodificador
+    (conversión, copia y subida), no el trabajo del códec.
+    """
+    backend = _init_headless(backend)
+    from OpenGL.GL import glFinish
+    from window import InteractiveCubeApp
+
+    results = []
+    for zoom in zooms:
+        for mode in modes:
+            app = InteractiveCubeApp(width, height, renderer_mode='shader')
+            app.video_path = {'arriba': 'mish.mp4', 'derecha': 'mish.mp4'}
+            app.init_headless(backend)
+            if mode == 'native':
+                app.resolution_policy = None
+            try:
+                app.load_resources()
+                app.zoom = zoom
+                frame = []
+                pixels0 = native0 = cpu0 = t_start = 0.0
+                next_frame = time.perf_counter()
+                for i in range(warmup + frames):
+                    if i == warmup:
+                        pixels0 = sum(vp.uploaded_pixels for vp in app.video_players.values())
+                        native0 = sum(vp.native_pixels for vp in app.video_players.values())
+                        cpu0, t_start = time.process_time(), time.perf_counter()
+                    t0 = time.perf_counter()
+                    app.render()
+                    app.context.swap()
+                    glFinish()
+                    if i >= warmup:
+                        frame.append(time.perf_counter() - t0)
+                    if fps:
+                        next_frame += 1.0 / fps
+                        delay = next_frame - time.perf_counter()
+                        if delay > 0:
+                            time.sleep(delay)
+                elapsed = time.perf_counter() - t_start
+                players = list(app.video_players.values())
+                bytes_per_pixel = 1.5 if app.renderer.supports_yuv else 3
+                pixels = sum(vp.uploaded_pixels for vp in players) - pixels0
+                native = sum(vp.native_pixels for vp in players) - native0
+                result = {'zoom': zoom, 'mode': mode}
+                result['scale'] = '/'.join(f"{vp.output_scale:g}" for vp in players)
+                result['upload_MB_s'] = pixels * bytes_per_pixel / elapsed / 1e6
+                # Sobre los mismos frames que upload_MB_s (sin los del calentamiento a resolución nativa)
+                result['upload_saving_pct'] = 100.0 * (1.0 - pixels / native) if native else 0.0
+                result['decode_saving_pct'] = float(np.mean([vp.stats()['decode_saving_pct'] for vp in players]))
+                result['cpu_pct'] = 100.0 * (time.process_time() - cpu0) / elapsed
+                result['frame_p50_ms'] = percentiles(frame)['p50_ms']
+                results.append(result)
+            finally:
+                app.cleanup()
+    return results
+
+
+def print_table(results):
+    if not results:
+        return
+    keys = list(results[0])
+    print("  ".join(f"{k:>18}" for k in keys))
+    for r in results:
+        print("  ".join(f"{r[k]:>18.3f}" if isinstance(r[k], float) else f"{str(r[k]):>18}" for k in keys))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    deform = sub.add_parser('deform', help="coste de deformar las mallas al arrastrar")
+    deform.add_argument('--sizes', type=int, nargs='+', default=[16, 32, 64, 128, 256])
+    deform.add_argument('--iterations', type=int, default=200)
+    deform.add_argument('--radius', type=float, default=1.0)
+    deform.add_argument('--json', action='store_true', help="salida en JSON")
+
+    decode = sub.add_parser('decode', help="CPU por stream antes y después del demux único")
+    decode.add_argument('paths', nargs='+')
+    decode.add_argument('--seconds', type=float, default=5.0)
+    decode.add_argument('--json', action='store_true', help="salida en JSON")
+
+    render = sub.add_parser('render', help="tiempos de frame sin ventana visible")
+    render.add_argument('--scenarios', nargs='+', choices=RENDER_SCENARIOS, default=list(RENDER_SCENARIOS))
+    render.add_argument('--frames', type=int, default=300)
+    render.add_argument('--warmup', type=int, default=30)
+    render.add_argument('--size', type=int, nargs=2, default=[1280, 720], metavar=('W', 'H'))
+    render.add_argument('--backend', choices=['egl', 'glfw'], default=None)
+    render.add_argument('--renderer', choices=['shader', 'immediate'], default=None)
+    render.add_argument('--switch-every', type=int, default=30, help="frames entre cambios de video")
+    render.add_argument('--fps', type=float, default=60, help="ritmo de los frames (0 = sin esperas)")
+    render.add_argument('--json', action='store_true', help="salida en JSON")
+
+    glcheck = sub.add_parser('glcheck', help="ahorro por frame de quitar el chequeo de errores de GL")
+    glcheck.add_argument('--scenarios', nargs='+', choices=RENDER_SCENARIOS, default=['two_videos', 'player'])
+    glcheck.add_argument('--frames', type=int, default=600)
+    glcheck.add_argument('--modes', nargs='+', choices=list(GL_DEBUG_MODES), default=list(GL_DEBUG_MODES))
+    glcheck.add_argument('--backend', choices=['egl', 'glfw'], default=None)
+    glcheck.add_argument('--size', type=int, nargs=2, default=[320, 180], metavar=('W', 'H'))
+    glcheck.add_argument('--json', action='store_true', help="salida en JSON")
+
+    idle = sub.add_parser('idle', help="CPU del bucle principal con y sin RenderGovernor")
+    idle.add_argument('--scenarios', nargs='+', choices=IDLE_SCENARIOS, default=list(IDLE_SCENARIOS))
+    idle.add_argument('--seconds', type=float, default=10.0)
+    idle.add_argument('--modes', nargs='+', choices=list(IDLE_MODES), default=list(IDLE_MODES))
+    idle.add_argument('--backend', choices=['egl', 'glfw'], default=None)
+    idle.add_argument('--size', type=int, nargs=2, default=[1280, 720], metavar=('W', 'H'))
+    idle.add_argument('--inprocess', action='store_true', help=argparse.SUPPRESS)
+    idle.add_argument('--json', action='store_true', help="salida en JSON")
+
+    wall = sub.add_parser('wall', help="tiempo de frame de la pared de cubos según N")
+    wall.add_argument('--counts', type=int, nargs='+', default=[1, 4, 16, 64, 100])
+    wall.add_argument('--frames', type=int, default=200)
+    wall.add_argument('--warmup', type=int, default=30)
+    wall.add_argument('--modes', nargs='+', choices=WALL_MODES, default=list(WALL_MODES))
+    wall.add_argument('--size', type=int, nargs=2, default=[1280, 720], metavar=('W', 'H'))
+    wall.add_argument('--backend', choices=['egl', 'glfw'], default=None)
+    wall.add_argument('--fps', type=float, default=60, help="ritmo de los frames (0 = sin esperas)")
+    wall.add_argument('--json', action='store_true', help="salida en JSON")
+
+    pool = sub.add_parser('pool', help="frames por segundo con N streams en hilos y en procesos")
+    pool.add_argument('path')
+    pool.add_argument('--streams', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32])
+    pool.add_argument('--seconds', type=float, default=5.0)
+    pool.add_argument('--modes', nargs='+', choices=POOL_MODES, default=list(POOL_MODES))
+    pool.add_argument('--rgb', action='store_true', help="frames RGB en lugar de YUV 4:2:0")
+    pool.add_argument('--json', action='store_true', help="salida en JSON")
+
+    coverage = sub.add_parser('coverage', help="ahorro de decodificar al tamaño de la cara en pantalla")
+    coverage.add_argument('--zooms', type=float, nargs='+', default=[-6.0, -15.0, -30.0])
+    coverage.add_argument('--frames', type=int, default=300)
+    coverage.add_argument('--warmup', type=int, default=60)
+    coverage.add_argument('--modes', nargs='+', choices=COVERAGE_MODES, default=list(COVERAGE_MODES))
+    coverage.add_argument('--size', type=int, nargs=2, default=[1280, 720], metavar=('W', 'H'))
+    coverage.add_argument('--backend', choices=['egl', 'glfw'], default=None)
+    coverage.add_argument('--fps', type=float, default=60, help="ritmo de los frames (0 = sin esperas)")
+    coverage.add_argument('--json', action='store_true', help="salida en JSON")
+
+    drag = sub.add_parser('drag', help="latencia de arrastrar un vértice según los eventos por frame")
+    drag.add_argument('--rates', type=int, nargs='+', default=[1, 4, 16, 64])
+    drag.add_argument('--frames', type=int, default=200)
+    drag.add_argument('--warmup', type=int, default=30)
+    drag.add_argument('--modes', nargs='+', choices=DRAG_MODES, default=list(DRAG_MODES))
+    drag.add_argument('--size', type=int, nargs=2, default=[1000, 800], metavar=('W', 'H'))
+    drag.add_argument('--backend', choices=['egl', 'glfw'], default=None)
+    drag.add_argument('--fps', type=float, default=60, help="ritmo de los frames (0 = sin esperas)")
+    drag.add_argument('--json', action='store_true', help="salida en JSON")
+
+    args = parser.parse_args()
+    if args.command == 'deform':
+        results = bench_deform(args.sizes, args.iterations, args.radius)
+    elif args.command == 'decode':
+        results = bench_decode(args.paths, args.seconds)
+    elif args.command == 'idle' and args.inprocess:
+        results = [_idle_run(s, args.seconds, *args.size, backend=args.backend) for s in args.scenarios]
+    elif args.command == 'idle':
+        results = bench_idle(args.scenarios, args.seconds, args.modes, args.backend, args.size)
+    elif args.command == 'pool':
+        results = bench_pool(args.path, args.streams, args.seconds, args.modes, yuv=not args.rgb)
+    elif args.command == 'wall':
+        results = bench_wall(args.counts, args.frames, args.warmup, args.modes, *args.size,
+                             backend=args.backend, fps=args.fps)
+    elif args.command == 'coverage':
+        results = bench_coverage(args.zooms, args.frames, args.warmup, args.modes, *args.size,
+                                 backend=args.backend, fps=args.fps)
+    elif args.command == 'drag':
+        results = bench_drag(args.rates, args.frames, args.warmup, args.modes, *args.size,
+                             backend=args.backend, fps=args.fps)
+    elif args.command == 'glcheck':
+        results = bench_glcheck(args.scenarios, args.frames, args.modes, args.backend, args.size)
+    elif args.command == 'render':
+        report = bench_render(args.scenarios, args.frames, args.warmup, *args.size, backend=args.backend,
+                              renderer_mode=args.renderer, switch_every=args.switch_every, fps=args.fps)
+        if args.json:
+            print(json.dumps(report, indent=2))
+        else:
+            print(f"commit {report['commit']}  {report['backend']}  {report['gl_renderer']}  "
+                  f"renderer {report['renderer']}")
+            print_table(report['scenarios'])
+        return
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_table(results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+import math
+import time
+
+import numpy as np
+
+import transforms
+
+
+class Camera:
+    """Cámara orbital alrededor del origen: zoom (traslación en z), ángulos de
+    órbita pitch (eje x) y yaw (eje y) y el viewport, del que sale el aspecto.
+
+    Es la única fuente de matrices para dibujar, hacer picking y desproyectar.
+    view, projection, view_projection y sus inversas se calculan al pedirlas y
+    se guardan hasta que cambia alguna de sus entradas: con la cámara quieta no
+    se reconstruye nada de un frame a otro.
+
+    orbit_by()/orbit_to() mueven un objetivo y update() acerca los ángulos a él
+    con un amortiguamiento exponencial (smoothing por segundo); mientras
+    animating sea True hay que seguir dibujando.
+    """
+
+    def __init__(self, zoom=-6.0, pitch=30.0, yaw=-45.0, fovy=45.0, near=0.1, far=50.0,
+                 zoom_range=(-30.0, -2.0), smoothing=12.0):
+        self.zoom_range = zoom_range
+        self.zoom = self._clamp_zoom(zoom)
+        self.pitch = self.target_pitch = pitch
+        self.yaw = self.target_yaw = yaw
+        self.fovy = fovy
+        self.near = near
+        self.far = far
+        self.viewport = (0, 0, 1, 1)
+        self.smoothing = smoothing
+        self._last_update = None
+        self._cache = {}  # nombre -> (entradas con las que se calculó, matriz)
+        # Contadores
+        self.rebuilds = 0
+
+    def _clamp_zoom(self, zoom):
+        if self.zoom_range is None:
+            return zoom
+        low, high = self.zoom_range
+        return max(low, min(high, zoom))
+
+    @property
+    def aspect(self):
+        return self.viewport[2] / self.viewport[3] if self.viewport[3] else 1.0
+
+    def set_viewport(self, width, height):
+        self.viewport = (0, 0, int(width), int(height))
+
+    def zoom_by(self, delta):
+        self.zoom = self._clamp_zoom(self.zoom + delta)
+
+    def orbit_to(self, pitch, yaw):
+        self.target_pitch = max(-89.0, min(89.0, pitch))
+        self.target_yaw = yaw
+
+    def orbit_by(self, dpitch, dyaw):
+        self.orbit_to(self.target_pitch + dpitch, self.target_yaw + dyaw)
+
+    @property
+    def animating(self):
+        return self.pitch != self.target_pitch or self.yaw != self.target_yaw
+
+    def update(self, now=None):
+        """Avanza la órbita hacia el objetivo; devuelve True si la cámara se movió"""
+        now = time.monotonic() if now is None else now
+        dt = now - self._last_update if self._last_update is not None else 0.0
+        self._last_update = now
+        if not self.animating:
+            return False
+        # Paso de la primera actualización después de estar quieta: un frame a 60 fps
+        alpha = 1.0 - math.exp(-self.smoothing * (dt if 0.0 < dt < 0.25 else 1 / 60))
+        self.pitch += (self.target_pitch - self.pitch) * alpha
+        self.yaw += (self.target_yaw - self.yaw) * alpha
+        if abs(self.target_pitch - self.pitch) < 0.01 and abs(self.target_yaw - self.yaw) < 0.01:
+            self.pitch, self.yaw = self.target_pitch, self.target_yaw
+        return True
+
+    def _cached(self, name, key, build):
+        entry = self._cache.get(name)
+        if entry is None or entry[0] != key:
+            entry = self._cache[name] = (key, build())
+            self.rebuilds += 1
+        return entry[1]
+
+    def _view_key(self):
+        return self.zoom, self.pitch, self.yaw
+
+    def _projection_key(self):
+        return self.fovy, self.aspect, self.near, self.far
+
+    @property
+    def view(self):
+        return self._cached('view', self._view_key(), lambda: (
+            transforms.translate(0.0, 0.0, self.zoom)
+            @ transforms.rotate(self.pitch, 1, 0, 0)
+            @ transforms.rotate(self.yaw, 0, 1, 0)))
+
+    @property
+    def projection(self):
+        return self._cached('projection', self._projection_key(), lambda: transforms.perspective(
+            self.fovy, self.aspect, self.near, self.far))
+
+    @property
+    def view_projection(self):
+        return self._cached('view_projection', self._view_key() + self._projection_key(),
+                            lambda: self.projection @ self.view)
+
+    @property
+    def inverse_view(self):
+        return self._cached('inverse_view', self._view_key(), lambda: np.linalg.inv(self.view))
+
+    @property
+    def inverse_projection(self):
+        return self._cached('inverse_projection', self._projection_key(),
+                            lambda: np.linalg.inv(self.projection))
+
+    @property
+    def inverse_view_projection(self):
+        return self._cached('inverse_view_projection', self._view_key() + self._projection_key(),
+                            lambda: np.linalg.inv(self.view_projection))
+
+    def stats(self):
+        return {
+            'zoom': self.zoom,
+            'pitch': self.pitch,
+            'yaw': self.yaw,
+            'animating': self.animating,
+            'rebuilds': self.rebuilds,
+        }
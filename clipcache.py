@@ -0,0 +1,195 @@
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from media import image_to_rgb
+from yuv import plane_sizes
+
+
+class DecodedClip:
+    """Clip corto decodificado por completo: todos los frames en un solo array
+    compacto (n_frames, bytes_por_frame) y sus pts relativos al inicio.
+
+    En yuv420p cada fila del array tiene los planos Y, U y V seguidos; en RGB,
+    el frame (alto, ancho, 3).
+    """
+
+    def __init__(self, path, yuv, size, pts, frames, duration):
+        self.path = path
+        self.yuv = yuv
+        self.size = size
+        self.pts = pts
+        self.frames = frames
+        self.duration = duration
+
+    @property
+    def nbytes(self):
+        return self.frames.nbytes + self.pts.nbytes
+
+    def __len__(self):
+        return len(self.frames)
+
+    def index_at(self, t):
+        """Índice del frame que se ve en el instante t (en bucle)"""
+        t = t % self.duration if self.duration > 0 else 0.0
+        return max(int(np.searchsorted(self.pts, t, side='right')) - 1, 0)
+
+    def frame(self, i):
+        """Vistas sin copia del frame i: lista de planos [Y, U, V] o array (alto, ancho, 3)"""
+        data = self.frames[i]
+        w, h = self.size
+        if not self.yuv:
+            return data.reshape(h, w, 3)
+        planes, offset = [], 0
+        for pw, ph in plane_sizes(w, h):
+            planes.append(data[offset:offset + pw * ph].reshape(ph, pw))
+            offset += pw * ph
+        return planes
+
+
+class ClipRecorder:
+    """Copia los frames de la primera vuelta de un video mientras se reproduce y,
+    al completarla, guarda el clip en el ClipCache (sin decodificar dos veces).
+
+    feed() corre en el hilo del decodificador; si el clip supera la duración
+    máxima o el presupuesto de la caché se abandona la grabación.
+    """
+
+    def __init__(self, cache, path, yuv):
+        self.cache = cache
+        self.path = path
+        self.yuv = yuv
+        self.size = None
+        self.pts = []
+        self.frames = []
+        self.nbytes = 0
+        self.done = False
+
+    def feed(self, pts, img):
+        if self.done:
+            return
+        if pts > self.cache.max_duration:
+            self.abandon()
+            return
+        w, h = img.get_size()
+        if self.size is None:
+            self.size = (w, h)
+        elif self.size != (w, h):
+            self.abandon()
+            return
+        if self.yuv:
+            buffers = img.to_memoryview(keep_align=True)
+            linesizes = img.get_linesizes(keep_align=True)
+            parts = []
+            for buf, linesize, (pw, ph) in zip(buffers, linesizes, plane_sizes(w, h)):
+                plane = np.frombuffer(buf, dtype=np.uint8, count=linesize * ph).reshape(ph, linesize)
+                parts.append(plane[:, :pw].ravel())
+            frame = np.concatenate(parts)
+        else:
+            frame = np.array(image_to_rgb(img)).ravel()  # copia compacta, sin relleno por fila
+        if self.pts and pts <= self.pts[-1]:
+            # El primer frame puede llegar repetido: se queda el último
+            self.nbytes -= self.frames.pop().nbytes
+            self.pts.pop()
+        self.nbytes += frame.nbytes
+        if self.nbytes > self.cache.budget:
+            self.abandon()
+            return
+        self.pts.append(pts)
+        self.frames.append(frame)
+
+    def finish(self):
+        """Fin de la primera vuelta: arma el clip y lo guarda en la caché"""
+        if self.done:
+            return
+        self.done = True
+        if not self.frames:
+            return
+        pts = np.asarray(self.pts, dtype=np.float64)
+        pts -= pts[0]
+        # El último frame dura lo mismo que el intervalo típico entre frames
+        frame_duration = float(np.median(np.diff(pts))) if len(pts) > 1 else 1 / 30
+        clip = DecodedClip(self.path, self.yuv, self.size, pts, np.stack(self.frames),
+                           float(pts[-1]) + frame_duration)
+        self.frames = []
+        self.cache.put(clip)
+
+    def abandon(self):
+        self.done = True
+        self.frames = []
+        self.cache.rejected += 1
+
+
+class ClipCache:
+    """Caché LRU de clips cortos decodificados con un presupuesto en bytes.
+
+    Se guardan los videos con extensión en `extensions` y duración de hasta
+    max_duration segundos; al superar el presupuesto se descartan los menos
+    usados. Las claves son (ruta, yuv).
+    """
+
+    extensions = ('.gif',)
+
+    def __init__(self, budget=128 * 1024 * 1024, max_duration=10.0):
+        self.budget = budget
+        self.max_duration = max_duration
+        self._clips = OrderedDict()
+        self._lock = threading.Lock()
+        self.nbytes = 0
+        # Contadores
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.rejected = 0  # clips demasiado largos o grandes para guardarse
+
+    def accepts(self, path):
+        return os.path.splitext(path)[1].lower() in self.extensions
+
+    def get(self, path, yuv):
+        """Clip decodificado o None; un acierto lo marca como el más reciente"""
+        with self._lock:
+            clip = self._clips.get((path, yuv))
+            if clip is None:
+                self.misses += 1
+                return None
+            self._clips.move_to_end((path, yuv))
+            self.hits += 1
+            return clip
+
+    def put(self, clip):
+        key = (clip.path, clip.yuv)
+        with self._lock:
+            if clip.nbytes > self.budget:
+                self.rejected += 1
+                return False
+            old = self._clips.pop(key, None)
+            if old is not None:
+                self.nbytes -= old.nbytes
+            self._clips[key] = clip
+            self.nbytes += clip.nbytes
+            while self.nbytes > self.budget:
+                _, evicted = self._clips.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+                self.evictions += 1
+            return True
+
+    def __contains__(self, key):
+        return key in self._clips
+
+    def clear(self):
+        with self._lock:
+            self._clips.clear()
+            self.nbytes = 0
+
+    def stats(self):
+        return {
+            'clips': len(self._clips),
+            'bytes': self.nbytes,
+            'budget': self.budget,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'rejected': self.rejected,
+        }
@@ -0,0 +1,111 @@
+import time
+
+
+class MasterClock:
+    """Reloj maestro de reproducción en segundos.
+
+    Si hay audio_pts (por ejemplo MediaPlayer.get_pts) el reloj sigue al audio;
+    mientras el audio no avanza (sin pista de audio, fin del audio, buffering)
+    continúa con el reloj monotónico desde el último valor conocido.
+    """
+
+    stale_after = 0.5  # segundos sin cambios en el pts del audio antes de ignorarlo
+
+    def __init__(self, audio_pts=None):
+        self.audio_pts = audio_pts
+        self.source = 'monotonic'
+        self.paused = False
+        self._base = time.monotonic()  # now() = monotonic - base
+        self._paused_at = 0.0
+        self._last_audio = None
+        self._last_audio_change = None
+        self.audio_drift = 0.0  # diferencia entre el audio y el reloj monotónico
+
+    def now(self):
+        if self.paused:
+            return self._paused_at
+        mono = time.monotonic()
+        if self.audio_pts is not None:
+            pts = self.audio_pts()
+            if pts is not None and pts != self._last_audio:
+                self._last_audio = pts
+                self._last_audio_change = mono
+                # Reanclar el reloj monotónico al audio
+                self.audio_drift = pts - (mono - self._base)
+                self._base = mono - pts
+                self.source = 'audio'
+                return pts
+            if self._last_audio_change is None or mono - self._last_audio_change > self.stale_after:
+                self.source = 'monotonic'
+        return mono - self._base
+
+    def pause(self):
+        if not self.paused:
+            self._paused_at = self.now()
+            self.paused = True
+
+    def resume(self):
+        if self.paused:
+            self._base = time.monotonic() - self._paused_at
+            self.paused = False
+
+    def seek(self, t):
+        self._base = time.monotonic() - t
+        self._paused_at = t
+        self._last_audio = None
+        self._last_audio_change = None
+
+
+class FrameScheduler:
+    """Elige qué frame presentar según el reloj maestro.
+
+    Presenta el frame más nuevo cuyo pts ya venció, descarta los que llegan
+    tarde y deja en espera los que todavía no tocan.
+    """
+
+    def __init__(self, clock, ring, frame_duration=1 / 30):
+        self.clock = clock
+        self.ring = ring
+        self.frame_duration = frame_duration
+        self.tolerance = frame_duration / 2
+        self.presented = 0
+        self.drift = 0.0       # reloj - pts del último frame presentado
+        self.avg_drift = 0.0
+        self.max_drift = 0.0
+
+    def next_frame(self):
+        """Frame a subir en este render o None si hay que mantener el actual"""
+        now = self.clock.now()
+        # Un frame más de un frame por delante seguido de uno anterior es de antes de un seek
+        item = self.ring.pop_due(now + self.tolerance, self.frame_duration)
+        if item is None:
+            return None
+        pts, frame = item
+        self.presented += 1
+        self.drift = now - pts
+        self.avg_drift += (self.drift - self.avg_drift) * 0.05
+        self.max_drift = max(self.max_drift, abs(self.drift))
+        return frame
+
+    def time_to_next(self, default):
+        """Segundos hasta que venza el próximo frame del buffer; default si está
+        vacío (el decodificador va atrasado) y None con el reloj en pausa"""
+        if self.clock.paused:
+            return None
+        pts = self.ring.next_pts()
+        if pts is None:
+            return default
+        return max(pts - self.tolerance - self.clock.now(), 0.0)
+
+    def stats(self):
+        return {
+            'clock': self.clock.now(),
+            'clock_source': self.clock.source,
+            'presented': self.presented,
+            'dropped_late': self.ring.skipped,
+            'underruns': self.ring.underruns,
+            'drift_ms': self.drift * 1000.0,
+            'avg_drift_ms': self.avg_drift * 1000.0,
+            'max_drift_ms': self.max_drift * 1000.0,
+            'audio_drift_ms': self.clock.audio_drift * 1000.0,
+        }
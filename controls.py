@@ -0,0 +1,237 @@
+import numpy as np
+import pygame
+
+BACKGROUND = (40, 40, 40, 230)
+GREEN = (30, 215, 96)
+GREY = (100, 100, 100)
+BUTTON = (70, 70, 70)
+ICON = (200, 200, 200)
+WHITE = (255, 255, 255)
+
+
+class Widget:
+    """Elemento del panel que solo se vuelve a dibujar cuando cambia su estado"""
+
+    def __init__(self, name, rect):
+        self.name = name
+        self.rect = pygame.Rect(rect)
+        self.dirty = True
+
+    def _set(self, attr, value):
+        if getattr(self, attr) != value:
+            setattr(self, attr, value)
+            self.dirty = True
+
+    @property
+    def dirty_rect(self):
+        return self.rect
+
+    def hit(self, x, y):
+        return self.rect.collidepoint(x, y)
+
+    def draw(self, surface):
+        """Dibuja el widget en surface; cada subclase lo redefine"""
+
+
+class ProgressBar(Widget):
+    def __init__(self, name, rect):
+        super().__init__(name, rect)
+        self.filled = 0  # ancho relleno en píxeles
+
+    def set_progress(self, progress):
+        progress = max(0.0, min(1.0, progress))
+        # Solo cambia cuando la barra avanza al menos un píxel
+        self._set('filled', int(self.rect.width * progress))
+
+    def draw(self, surface):
+        pygame.draw.rect(surface, GREY, self.rect)
+        if self.filled > 0:
+            pygame.draw.rect(surface, GREEN, (self.rect.x, self.rect.y, self.filled, self.rect.height))
+
+
+class TimeLabel(Widget):
+    def __init__(self, name, rect, atlas):
+        super().__init__(name, rect)
+        self.atlas = atlas
+        self.seconds = 0
+
+    def set_seconds(self, seconds):
+        self._set('seconds', int(seconds))
+
+    @property
+    def text(self):
+        mins, secs = divmod(self.seconds, 60)
+        return f"{mins:02d}:{secs:02d}"
+
+    def draw(self, surface):
+        # Los glifos salen del atlas: no se rasteriza la fuente en cada cambio
+        self.atlas.blit(surface, self.text, self.rect.topleft)
+
+
+class Button(Widget):
+    def __init__(self, name, rect, color=BUTTON):
+        super().__init__(name, rect)
+        self.color = color
+
+    def draw(self, surface):
+        pygame.draw.rect(surface, self.color, self.rect, border_radius=10)
+        self.draw_icon(surface)
+
+    def draw_icon(self, surface):
+        pass
+
+
+class RewindButton(Button):
+    def draw_icon(self, surface):
+        r = self.rect
+        pygame.draw.polygon(surface, ICON, [
+            (r.centerx - 10, r.centery),
+            (r.centerx - 10, r.centery - 15),
+            (r.centerx + 5, r.centery)
+        ])
+
+
+class ForwardButton(Button):
+    def draw_icon(self, surface):
+        r = self.rect
+        pygame.draw.polygon(surface, ICON, [
+            (r.centerx + 10, r.centery),
+            (r.centerx + 10, r.centery - 15),
+            (r.centerx - 5, r.centery)
+        ])
+
+
+class PlayButton(Button):
+    def __init__(self, name, rect):
+        super().__init__(name, rect, GREEN)
+        self.playing = False
+
+    def set_playing(self, playing):
+        self._set('playing', bool(playing))
+
+    def draw_icon(self, surface):
+        r = self.rect
+        if self.playing:
+            # Pausa: dos barras
+            pygame.draw.rect(surface, WHITE, (r.centerx - 15, r.centery - 15, 10, 30))
+            pygame.draw.rect(surface, WHITE, (r.centerx + 5, r.centery - 15, 10, 30))
+        else:
+            # Play: triángulo
+            pygame.draw.polygon(surface, WHITE, [
+                (r.centerx - 10, r.centery - 15),
+                (r.centerx - 10, r.centery + 15),
+                (r.centerx + 15, r.centery)
+            ])
+
+
+class VolumeSlider(Widget):
+    knob_radius = 12
+    hit_margin = 20
+
+    def __init__(self, name, rect):
+        super().__init__(name, rect)
+        self.value = 0.0
+
+    def set_value(self, value):
+        self._set('value', max(0.0, min(1.0, value)))
+
+    def value_at(self, x):
+        return max(0.0, min(1.0, (x - self.rect.x) / self.rect.width))
+
+    @property
+    def dirty_rect(self):
+        # El indicador sobresale de la barra
+        return self.rect.inflate(2 * self.knob_radius, 2 * self.knob_radius)
+
+    def hit(self, x, y):
+        return (self.rect.left <= x <= self.rect.right
+                and self.rect.y - self.hit_margin <= y <= self.rect.y + self.hit_margin)
+
+    def draw(self, surface):
+        r = self.rect
+        pygame.draw.rect(surface, GREY, r)
+        pygame.draw.rect(surface, GREEN, (r.x, r.y, r.width * self.value, r.height))
+        vol_pos = r.x + r.width * self.value
+        pygame.draw.circle(surface, ICON, (int(vol_pos), r.y + r.height // 2), self.knob_radius)
+
+
+class ControlPanel:
+    """Árbol de widgets de la cara de controles con seguimiento de regiones sucias.
+
+    Solo se rasterizan y se suben a la textura las regiones de los widgets que
+    cambiaron, así que un panel en pausa no cuesta nada por frame.
+    """
+
+    def __init__(self, size, atlas):
+        self.size = size
+        self.surface = pygame.Surface((size, size), pygame.SRCALPHA)
+        self.surface.fill(BACKGROUND)
+        self.full_redraw = True
+        self.rasterized_pixels = 0
+
+        bar_width = int(size * 0.8)
+        bar_x = (size - bar_width) // 2
+        bar_y = 50
+        button_size = 60
+        button_y = size // 2
+        vol_width = int(size * 0.7)
+        vol_x = (size - vol_width) // 2
+        vol_y = size - 80
+
+        self.progress = ProgressBar('progress', (bar_x, bar_y, bar_width, 10))
+        self.time_label = TimeLabel('time', (bar_x, bar_y + 20, bar_width, atlas.line_height), atlas)
+        self.rewind = RewindButton('rewind', (size // 2 - button_size * 2, button_y, button_size, button_size))
+        self.play = PlayButton('play', (size // 2 - button_size // 2, button_y, button_size, button_size))
+        self.forward = ForwardButton('forward', (size // 2 + button_size, button_y, button_size, button_size))
+        self.volume = VolumeSlider('volume', (vol_x, vol_y, vol_width, 20))
+        self.widgets = [self.progress, self.time_label, self.rewind,
+                        self.play, self.forward, self.volume]
+
+    def update(self, current_time, total_time, playing, volume):
+        self.progress.set_progress(current_time / total_time if total_time > 0 else 0.0)
+        self.time_label.set_seconds(current_time)
+        self.play.set_playing(playing)
+        self.volume.set_value(volume)
+
+    def widget_at(self, x, y):
+        for widget in self.widgets:
+            if widget.hit(x, y):
+                return widget
+        return None
+
+    def rasterize(self):
+        """Redibuja los widgets sucios y devuelve los rectángulos modificados"""
+        if self.full_redraw:
+            self.surface.fill(BACKGROUND)
+            for widget in self.widgets:
+                widget.dirty = True
+        dirty = []
+        bounds = self.surface.get_rect()
+        for widget in self.widgets:
+            if not widget.dirty:
+                continue
+            rect = widget.dirty_rect.clip(bounds)
+            self.surface.fill(BACKGROUND, rect)
+            self.surface.set_clip(rect)
+            widget.draw(self.surface)
+            self.surface.set_clip(None)
+            widget.dirty = False
+            dirty.append(rect)
+        if self.full_redraw:
+            self.full_redraw = False
+            return [bounds]
+        return dirty
+
+    def upload(self, texture):
+        """Rasteriza y sube a la textura solo las regiones sucias"""
+        rects = self.rasterize()
+        for rect in rects:
+            if rect.width == 0 or rect.height == 0:
+                continue
+            data = pygame.image.tostring(self.surface.subsurface(rect), "RGBA")
+            pixels = np.frombuffer(data, dtype=np.uint8).reshape((rect.height, rect.width, 4))
+            if texture.size is None:
+                texture.upload(np.zeros((self.size, self.size, 4), dtype=np.uint8))
+            texture.update_region(rect.x, rect.y, pixels)
+            self.rasterized_pixels += rect.width * rect.height
+        return rects
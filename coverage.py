@@ -0,0 +1,107 @@
+import math
+import time
+
+import numpy as np
+
+from picking import project_points
+
+TIERS = (1.0, 0.5, 0.25, 0.125)  # escala de la resolución nativa de cada escalón
+
+
+def projected_area(positions, indices, mvp, viewport):
+    """Píxeles de pantalla que cubre una malla (FaceMesh o QuadFace) con sus vértices actuales.
+
+    Solo cuentan los triángulos de frente (antihorarios en la ventana) y el
+    resultado no pasa del área del viewport. Si algún vértice queda detrás de
+    la cámara la proyección no es fiable y se devuelve el viewport entero.
+    """
+    window, in_front = project_points(positions, mvp, viewport)
+    full = float(viewport[2] * viewport[3])
+    if not in_front.all():
+        return full
+    tri = window[np.asarray(indices).reshape(-1, 3), :2]
+    a, b, c = tri[:, 0], tri[:, 1], tri[:, 2]
+    cross = (b[:, 0] - a[:, 0]) * (c[:, 1] - a[:, 1]) - (b[:, 1] - a[:, 1]) * (c[:, 0] - a[:, 0])
+    return min(float(cross[cross > 0].sum()) * 0.5, full)
+
+
+def scaled_size(width, height, scale):
+    """Tamaño (par, como pide yuv420p) de un frame de width × height a la escala scale"""
+    return max(int(width * scale) // 2 * 2, 2), max(int(height * scale) // 2 * 2, 2)
+
+
+def fit_size(width, height, max_size):
+    """Tamaño con el que un frame de width × height entra en una capa de max_size × max_size
+    (el mismo si ya entra o si max_size es None)"""
+    if max_size is None or (width <= max_size and height <= max_size):
+        return width, height
+    return scaled_size(width, height, min(max_size / width, max_size / height))
+
+
+class ResolutionPolicy:
+    """Elige la resolución de decodificación de cada video según el área en
+    pantalla de la cara que lo muestra.
+
+    La escala necesaria es sqrt(área / píxeles del video) por margin (un poco
+    más de un texel por píxel); se usa el escalón de TIERS más chico que la
+    cubre. Para que no oscile, subir de escalón es inmediato (no se ve borroso)
+    y bajar exige que el escalón inferior alcance con holgura (down_margin)
+    durante down_delay segundos seguidos.
+    """
+
+    def __init__(self, tiers=TIERS, margin=1.25, down_margin=0.8, down_delay=1.0):
+        self.tiers = sorted(tiers)
+        self.margin = margin
+        self.down_margin = down_margin
+        self.down_delay = down_delay
+        self._state = {}  # clave -> [escalón actual, desde cuándo alcanza uno menor]
+        # Contadores
+        self.changes = 0
+        self.ups = 0
+        self.downs = 0
+
+    def required_scale(self, area, native_size):
+        w, h = native_size
+        return math.sqrt(max(area, 0.0) / (w * h)) * self.margin
+
+    def _tier_for(self, scale):
+        for tier in self.tiers:
+            if tier >= scale:
+                return tier
+        return self.tiers[-1]
+
+    def update(self, key, area, native_size, now=None):
+        """Escalón para key (por ejemplo el nombre de la cara) con el área actual"""
+        now = time.monotonic() if now is None else now
+        required = self.required_scale(area, native_size)
+        state = self._state.get(key)
+        if state is None:
+            state = self._state[key] = [self._tier_for(required), None]
+            return state[0]
+        current = state[0]
+        wanted = self._tier_for(required)
+        if wanted > current:
+            state[0], state[1] = wanted, None
+            self.changes += 1
+            self.ups += 1
+        elif wanted < current and required <= wanted * self.down_margin:
+            if state[1] is None:
+                state[1] = now
+            elif now - state[1] >= self.down_delay:
+                state[0], state[1] = wanted, None
+                self.changes += 1
+                self.downs += 1
+        else:
+            state[1] = None
+        return state[0]
+
+    def forget(self, key):
+        self._state.pop(key, None)
+
+    def stats(self):
+        return {
+            'tiers': {key: state[0] for key, state in self._state.items()},
+            'changes': self.changes,
+            'ups': self.ups,
+            'downs': self.downs,
+        }
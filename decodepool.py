@@ -0,0 +1,470 @@
+"""Decodificación de video en procesos aparte, uno por fuente.
+
+Cada proceso abre su fuente sin audio (MediaSource(audio=False)) y deja los
+frames compactos en un buffer circular en memoria compartida: el proceso de
+render solo mapea los slots y los sube a la textura, sin pickle ni copias.
+
+Dos semáforos hacen de contrapresión: el trabajador espera un slot libre
+antes de escribir y el render devuelve cada slot cuando ya lo subió. Si la
+fuente cambia de resolución el trabajador avisa ('resize') y el render crea
+un buffer nuevo con el tamaño nuevo.
+
+CUBE_DECODE_POOL=N activa el pool en window.py/fullscreen.py con hasta N
+procesos ('auto' = uno por núcleo); las fuentes del pool no reproducen audio.
+"""
+import multiprocessing
+import os
+import time
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+import gldebug
+from clock import MasterClock, FrameScheduler
+from coverage import fit_size
+from media import MediaSource, image_to_rgb
+from yuv import plane_sizes
+
+# Contadores que escribe el trabajador después de los pts de los slots
+_DECODED, _DECODE_SECONDS, _FULL_WAITS, _RESIZED = range(4)
+_COUNTERS = 4
+
+
+def _header_bytes(slots):
+    # pts de cada slot + contadores, alineado a 64 bytes
+    return -(-(slots + _COUNTERS) * 8 // 64) * 64
+
+
+def _frame_layout(width, height, yuv):
+    """(ancho, alto, canales) de cada plano de un frame compacto"""
+    if yuv:
+        return [(pw, ph, 1) for pw, ph in plane_sizes(width, height)]
+    return [(width, height, 3)]
+
+
+def _frame_views(buf, offset, layout):
+    views = []
+    for pw, ph, channels in layout:
+        shape = (ph, pw) if channels == 1 else (ph, pw, channels)
+        views.append(np.ndarray(shape, dtype=np.uint8, buffer=buf, offset=offset))
+        offset += pw * ph * channels
+    return views
+
+
+def _copy_frame(img, views, yuv):
+    if not yuv:
+        views[0][:] = image_to_rgb(img)
+        return
+    buffers = img.to_memoryview(keep_align=True)
+    linesizes = img.get_linesizes(keep_align=True)
+    for buf, linesize, view in zip(buffers, linesizes, views):
+        ph, pw = view.shape
+        view[:] = np.frombuffer(buf, dtype=np.uint8, count=linesize * ph).reshape(ph, linesize)[:, :pw]
+
+
+def _map_ring(name, slots, width, height, yuv):
+    """(bloque, cabecera, vistas de cada slot) del buffer compartido que creó el render"""
+    # Con spawn el resource_tracker es el mismo del render, dueño del bloque (lo borra en release)
+    shm = SharedMemory(name=name)
+    header = np.ndarray((slots + _COUNTERS,), dtype=np.float64, buffer=shm.buf)
+    layout = _frame_layout(width, height, yuv)
+    slot_bytes = sum(pw * ph * c for pw, ph, c in layout)
+    frames = [_frame_views(shm.buf, _header_bytes(slots) + i * slot_bytes, layout) for i in range(slots)]
+    return shm, header, frames
+
+
+def _decode_worker(path, yuv, slots, conn, free, filled, stop, max_size=None):
+    """Proceso trabajador: decodifica path y llena los slots en orden; con max_size
+    los frames se decodifican ya reducidos al tamaño de la capa"""
+    try:
+        source = MediaSource(path, yuv=yuv, audio=False)
+    except ValueError as e:
+        conn.send(('error', str(e)))
+        return
+    shm = None
+    try:
+        fitted = None
+        while True:
+            if stop.is_set():
+                return
+            item = source.read_frame()
+            if item is None:
+                if source.eof:
+                    conn.send(('error', f"{path} no tiene frames de video"))
+                    return
+                time.sleep(0.002)
+                continue
+            size = item[1].get_size()
+            if fitted is None:
+                fitted = fit_size(*size, max_size)
+                if fitted != size:
+                    source.set_size(*fitted)
+            if size == fitted:
+                break  # los de antes de que set_size tome efecto se descartan
+        width, height = fitted
+        conn.send(('ready', width, height, source.fps))
+        name = conn.recv()
+        if name is None:
+            return
+        shm, header, frames = _map_ring(name, slots, width, height, yuv)
+        slot = 0
+        while not stop.is_set():
+            if item is None:
+                t0 = time.perf_counter()
+                item = source.read_frame()
+                if item is None:
+                    time.sleep(0.002)
+                    continue
+                header[slots + _DECODE_SECONDS] += time.perf_counter() - t0
+            pts, img = item
+            item = None
+            if img.get_size() != (width, height):
+                # El tamaño de los slots es fijo: el render crea otro buffer y este frame va al nuevo
+                width, height = img.get_size()
+                counters = header[slots:].copy()
+                counters[_RESIZED] += 1
+                frames = header = None
+                shm.close()
+                shm = None
+                conn.send(('resize', width, height))
+                name = conn.recv()
+                if name is None:
+                    return
+                shm, header, frames = _map_ring(name, slots, width, height, yuv)
+                header[slots:] = counters
+                slot = 0
+            # Contrapresión: sin slots libres el trabajador espera al render
+            if not free.acquire(False):
+                header[slots + _FULL_WAITS] += 1
+                while not free.acquire(timeout=0.05):
+                    # conn.poll() también es True si el proceso de render se cerró sin avisar
+                    if stop.is_set() or conn.poll():
+                        return
+            _copy_frame(img, frames[slot], yuv)
+            header[slot] = pts
+            header[slots + _DECODED] += 1
+            filled.release()
+            slot = (slot + 1) % slots
+    except (EOFError, BrokenPipeError):
+        pass  # el proceso de render ya cerró el stream
+    finally:
+        frames = header = None
+        if shm is not None:
+            shm.close()
+        source.close()
+
+
+class SharedFrameRing:
+    """Lado del render de un buffer circular en memoria compartida, con la
+    interfaz de FrameRing que usa FrameScheduler (pop_due, next_pts, clear).
+
+    Los frames se entregan como vistas de la memoria compartida: [Y, U, V]
+    compactos en YUV o (alto, ancho, 3) en RGB. El slot entregado se devuelve
+    al trabajador en la siguiente llamada, cuando ya se subió.
+    """
+
+    def __init__(self, shm, slots, layout, yuv, free, filled):
+        self.shm = shm
+        self.capacity = slots
+        self.yuv = yuv
+        self._free = free
+        self._filled = filled
+        self._header = np.ndarray((slots + _COUNTERS,), dtype=np.float64, buffer=shm.buf)
+        self._pts = self._header[:slots]
+        slot_bytes = sum(pw * ph * c for pw, ph, c in layout)
+        self._frames = [_frame_views(shm.buf, _header_bytes(slots) + i * slot_bytes, layout)
+                        for i in range(slots)]
+        self._read = 0  # próximo slot a leer
+        self._count = 0  # slots llenos ya tomados del semáforo y sin leer
+        self._presented = False  # el slot anterior a _read sigue en uso
+        # Contadores
+        self.consumed = 0
+        self.skipped = 0
+        self.underruns = 0
+
+    @property
+    def depth(self):
+        self._poll()
+        return self._count
+
+    def _poll(self):
+        while self._count < self.capacity and self._filled.acquire(False):
+            self._count += 1
+
+    def _recycle(self):
+        if self._presented:
+            self._free.release()
+            self._presented = False
+
+    def _drop(self, n):
+        for _ in range(n):
+            self._free.release()
+        self._read = (self._read + n) % self.capacity
+        self._count -= n
+
+    def pop_due(self, deadline, max_ahead=None):
+        self._recycle()
+        self._poll()
+        if self._count == 0:
+            self.underruns += 1
+            return None
+        if max_ahead is not None:
+            # Igual que FrameRing.pop_due: frames de antes de un seek hacia atrás
+            stale = 0
+            while stale < self._count - 1:
+                pts = self._pts[(self._read + stale) % self.capacity]
+                if pts <= deadline + max_ahead or self._pts[(self._read + stale + 1) % self.capacity] >= pts:
+                    break
+                stale += 1
+            self._drop(stale)
+            self.skipped += stale
+        due = 0
+        while due < self._count and self._pts[(self._read + due) % self.capacity] <= deadline:
+            due += 1
+        if due == 0:
+            return None
+        slot = (self._read + due - 1) % self.capacity
+        self._drop(due - 1)
+        self.skipped += due - 1
+        self._read = (self._read + 1) % self.capacity
+        self._count -= 1
+        self._presented = True
+        self.consumed += 1
+        frame = self._frames[slot]
+        return float(self._pts[slot]), frame if self.yuv else frame[0]
+
+    def next_pts(self):
+        self._poll()
+        if self._count == 0:
+            return None
+        return float(self._pts[self._read])
+
+    def clear(self):
+        self._recycle()
+        self._poll()
+        self._drop(self._count)
+
+    def stats(self):
+        counters = self._header[self.capacity:]
+        return {
+            'depth': self._count,
+            'capacity': self.capacity,
+            'decoded': int(counters[_DECODED]),
+            'decode_ms': float(1000.0 * counters[_DECODE_SECONDS] / max(counters[_DECODED], 1)),
+            'full_waits': int(counters[_FULL_WAITS]),
+            'resized': int(counters[_RESIZED]),
+            'consumed': self.consumed,
+            'skipped': self.skipped,
+            'underruns': self.underruns,
+        }
+
+    def close(self):
+        # Las vistas tienen que desaparecer antes de cerrar el bloque
+        self._frames = self._header = self._pts = None
+        self.shm.close()
+        self.shm.unlink()
+
+
+class PooledStream:
+    """Una fuente decodificándose en su propio proceso.
+
+    El tamaño de los frames se conoce cuando el trabajador decodifica el
+    primero; poll() termina el arranque sin bloquear y crea el buffer.
+    """
+
+    def __init__(self, ctx, path, yuv, slots, max_size=None):
+        self.path = path
+        self.yuv = yuv
+        self.slots = slots
+        self.size = None
+        self.fps = None
+        self.error = None
+        self.ring = None
+        self._free = ctx.Semaphore(slots)
+        self._filled = ctx.Semaphore(0)
+        self._stop = ctx.Event()
+        self._conn, child = ctx.Pipe()
+        self.process = ctx.Process(target=_decode_worker, name=f"decoder:{path}", daemon=True,
+                                   args=(path, yuv, slots, child, self._free, self._filled, self._stop,
+                                         max_size))
+        self.process.start()
+        child.close()
+
+    def poll(self):
+        """True si el buffer compartido está listo para leer (self.ring puede haber
+        cambiado si la fuente cambió de resolución)"""
+        if self.error is not None:
+            return False
+        try:
+            message = self._conn.recv() if self._conn.poll() else None
+        except (EOFError, OSError):
+            message = ('error', f"el proceso decodificador de {self.path} terminó")
+        if message is None:
+            return self.ring is not None
+        if message[0] == 'error':
+            self.error = message[1]
+            print(f"Error en el pool de decodificación: {self.error}")
+            return False
+        if message[0] == 'resize':
+            # Los frames del tamaño anterior se descartan con su buffer
+            _, width, height = message
+            self.ring.clear()
+            self.ring.close()
+            self.ring = None
+        else:
+            _, width, height, self.fps = message
+        self._open_ring(width, height)
+        return True
+
+    def _open_ring(self, width, height):
+        self.size = (width, height)
+        layout = _frame_layout(width, height, self.yuv)
+        nbytes = _header_bytes(self.slots) + self.slots * sum(pw * ph * c for pw, ph, c in layout)
+        shm = SharedMemory(create=True, size=nbytes)  # se crea con ceros: pts y contadores en 0
+        self.ring = SharedFrameRing(shm, self.slots, layout, self.yuv, self._free, self._filled)
+        self._conn.send(shm.name)
+
+    def stats(self):
+        stats = self.ring.stats() if self.ring is not None else {}
+        stats.update({'path': self.path, 'pid': self.process.pid, 'alive': self.process.is_alive(),
+                      'size': self.size, 'error': self.error})
+        return stats
+
+    def release(self, timeout=1.0):
+        self._stop.set()
+        try:
+            self._conn.send(None)  # por si espera el nombre de un bloque (al arrancar o en un resize)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join(timeout)
+        self._conn.close()
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
+
+
+class DecodePool:
+    """Procesos decodificadores, uno por fuente abierta y como mucho max_workers.
+
+    open() devuelve None si no quedan procesos libres: el llamador decodifica
+    esa fuente en el proceso de render como siempre.
+    """
+
+    def __init__(self, max_workers=None, slots=4):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.slots = slots
+        # spawn: los trabajadores no heredan el contexto de GL ni los hilos del render
+        self._ctx = multiprocessing.get_context('spawn')
+        self.streams = []
+        # Contadores
+        self.opened = 0
+        self.rejected = 0
+
+    @classmethod
+    def from_env(cls):
+        """DecodePool según CUBE_DECODE_POOL o None si no está activado"""
+        value = os.environ.get('CUBE_DECODE_POOL', '').lower()
+        if value in ('', '0'):
+            return None
+        return cls(None if value == 'auto' else int(value))
+
+    def open(self, path, yuv=False, max_size=None):
+        """Abre path en un proceso nuevo; max_size es el lado de la capa a la que va"""
+        if len(self.streams) >= self.max_workers:
+            self.rejected += 1
+            return None
+        stream = PooledStream(self._ctx, path, yuv, self.slots, max_size)
+        self.streams.append(stream)
+        self.opened += 1
+        return stream
+
+    def close(self, stream):
+        if stream in self.streams:
+            self.streams.remove(stream)
+        stream.release()
+
+    def stats(self):
+        return {
+            'max_workers': self.max_workers,
+            'workers': len(self.streams),
+            'opened': self.opened,
+            'rejected': self.rejected,
+            'streams': [stream.stats() for stream in self.streams],
+        }
+
+    def shutdown(self):
+        # Primero se avisa a todos para que terminen en paralelo
+        for stream in self.streams:
+            stream._stop.set()
+        for stream in list(self.streams):
+            self.close(stream)
+
+
+class PooledPlayer:
+    """Reproductor con la interfaz de VideoPlayer para una fuente del DecodePool.
+
+    Sin audio: el reloj es monotónico y arranca cuando llega el primer frame.
+    """
+
+    def __init__(self, stream, texture, pool):
+        self.stream = stream
+        self.pool = pool
+        self.yuv = stream.yuv
+        self.label = f"pool {stream.path}"
+        self.texture = texture
+        self.texture.set_label(self.label)
+        self.texture.flip_y = True
+        self.frame_size = None
+        self.fps = 30.0
+        self.clock = MasterClock()
+        self.scheduler = None
+        self.visible = True
+        self.skipped_uploads = 0
+
+    def set_visible(self, visible, pause=False):
+        # El proceso sigue decodificando: los frames vencidos se descartan sin subir
+        self.visible = visible
+
+    def update(self):
+        if not self.stream.poll():
+            return
+        if self.scheduler is None:
+            self.fps = self.stream.fps
+            self.clock.seek(0.0)
+            self.scheduler = FrameScheduler(self.clock, self.stream.ring, 1.0 / self.fps)
+        elif self.scheduler.ring is not self.stream.ring:
+            self.scheduler.ring = self.stream.ring  # la fuente cambió de resolución
+        self.frame_size = self.stream.size
+        frame = self.scheduler.next_frame()
+        if frame is None:
+            return
+        if not self.visible:
+            self.skipped_uploads += 1
+            return
+        with gldebug.group(self.label):
+            if self.yuv:
+                self.texture.upload_planes(frame)
+            else:
+                self.texture.upload(frame)
+
+    def time_to_next_frame(self):
+        if self.scheduler is None:
+            return None if self.stream.error else 1.0 / self.fps  # todavía arrancando
+        if not self.visible:
+            return None
+        return self.scheduler.time_to_next(1.0 / self.fps)
+
+    def stats(self):
+        stats = self.stream.stats()
+        if self.scheduler is not None:
+            stats.update(self.scheduler.stats())
+        stats['upload_bytes_per_second'] = self.texture.bytes_per_second
+        stats['visible'] = self.visible
+        stats['skipped_uploads'] = self.skipped_uploads
+        return stats
+
+    def release(self, close_source=None):
+        self.pool.close(self.stream)
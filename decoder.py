@@ -0,0 +1,205 @@
+import threading
+import time
+
+
+class FrameRing:
+    """Buffer circular de tamaño fijo con los últimos frames decodificados.
+
+    Los elementos pueden ser frames sueltos (pop_latest) o tuplas (pts, frame)
+    para presentarlos según un reloj (pop_due).
+
+    clear() (al hacer un seek) abre una nueva generación: push() descarta los
+    elementos de una generación anterior, como el frame previo al seek que el
+    productor tenía en la mano mientras esperaba espacio.
+    """
+
+    def __init__(self, capacity=4):
+        if capacity < 1:
+            raise ValueError("La capacidad del buffer debe ser al menos 1")
+        self.capacity = capacity
+        self._slots = [None] * capacity
+        self._head = 0   # siguiente posición a escribir
+        self._count = 0
+        self._lock = threading.Lock()
+        self._not_full = threading.Condition(self._lock)
+        self.generation = 0
+        # Contadores
+        self.pushed = 0
+        self.consumed = 0
+        self.skipped = 0    # frames descartados porque había uno más nuevo
+        self.underruns = 0  # lecturas con el buffer vacío
+        self.overruns = 0   # escrituras con el buffer lleno (se pisa el más viejo)
+        self.full_waits = 0  # veces que el productor esperó por falta de espacio
+        self.stale = 0  # frames descartados por ser de antes de un clear()
+
+    @property
+    def depth(self):
+        return self._count
+
+    def _oldest(self):
+        return (self._head - self._count) % self.capacity
+
+    def push(self, item, block=False, stop_event=None, generation=None):
+        """Agrega un elemento. Con block=True espera a que haya espacio en lugar de
+        pisar el más viejo; devuelve False si stop_event se activó mientras esperaba.
+        generation es la que leyó el productor antes de obtener item: si hubo un
+        clear() desde entonces el elemento se descarta."""
+        with self._not_full:
+            if block and self._count == self.capacity:
+                self.full_waits += 1
+                while self._count == self.capacity:
+                    if stop_event is not None and stop_event.is_set():
+                        return False
+                    self._not_full.wait(0.05)
+            if generation is not None and generation != self.generation:
+                self.stale += 1
+                return True
+            if self._count == self.capacity:
+                self.overruns += 1
+            else:
+                self._count += 1
+            self._slots[self._head] = item
+            self._head = (self._head + 1) % self.capacity
+            self.pushed += 1
+            return True
+
+    def _drop_oldest(self, n):
+        start = self._oldest()
+        for i in range(n):
+            self._slots[(start + i) % self.capacity] = None
+        self._count -= n
+        if n:
+            self._not_full.notify_all()
+
+    def pop_latest(self):
+        """Devuelve el frame más nuevo y descarta los anteriores (None si está vacío)"""
+        with self._lock:
+            if self._count == 0:
+                self.underruns += 1
+                return None
+            frame = self._slots[(self._head - 1) % self.capacity]
+            self.skipped += self._count - 1
+            self._drop_oldest(self._count)
+            self.consumed += 1
+            return frame
+
+    def pop_due(self, deadline, max_ahead=None):
+        """Devuelve el (pts, frame) más nuevo con pts <= deadline.
+
+        Los anteriores ya llegan tarde y se descartan; los futuros quedan en el
+        buffer. Devuelve None si no hay ninguno listo todavía. Con max_ahead se
+        descartan además los del principio que van más de max_ahead por delante
+        del deadline y a los que les sigue un pts menor: son de antes de un seek
+        hacia atrás y si no taparían a los nuevos.
+        """
+        with self._lock:
+            if self._count == 0:
+                self.underruns += 1
+                return None
+            start = self._oldest()
+            if max_ahead is not None:
+                stale = 0
+                while stale < self._count - 1:
+                    pts = self._slots[(start + stale) % self.capacity][0]
+                    next_pts = self._slots[(start + stale + 1) % self.capacity][0]
+                    if pts <= deadline + max_ahead or next_pts >= pts:
+                        break
+                    stale += 1
+                if stale:
+                    self.stale += stale
+                    self._drop_oldest(stale)
+                    start = self._oldest()
+            due = 0
+            for i in range(self._count):
+                if self._slots[(start + i) % self.capacity][0] > deadline:
+                    break
+                due += 1
+            if due == 0:
+                return None
+            item = self._slots[(start + due - 1) % self.capacity]
+            self.skipped += due - 1
+            self._drop_oldest(due)
+            self.consumed += 1
+            return item
+
+    def next_pts(self):
+        """pts del elemento más viejo (el próximo a presentar) o None si está vacío"""
+        with self._lock:
+            if self._count == 0:
+                return None
+            return self._slots[self._oldest()][0]
+
+    def wake(self):
+        """Despierta a los productores que esperan espacio (para que vean su stop_event)"""
+        with self._not_full:
+            self._not_full.notify_all()
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._drop_oldest(self._count)
+
+    def stats(self):
+        return {
+            'depth': self._count,
+            'capacity': self.capacity,
+            'pushed': self.pushed,
+            'consumed': self.consumed,
+            'skipped': self.skipped,
+            'underruns': self.underruns,
+            'overruns': self.overruns,
+            'full_waits': self.full_waits,
+            'stale': self.stale,
+        }
+
+
+class DecodeThread(threading.Thread):
+    """Hilo que llama a read_frame() y deja los frames en un FrameRing.
+
+    read_frame() debe devolver un elemento listo para subir o None si por ahora
+    no hay frame disponible. Con fps el hilo decodifica a ese ritmo y pisa los
+    frames viejos; sin fps decodifica por adelantado y espera cuando el buffer
+    está lleno (la presentación la decide el reloj maestro).
+    """
+
+    def __init__(self, read_frame, fps=None, ring=None, name="decoder"):
+        super().__init__(name=name, daemon=True)
+        self.read_frame = read_frame
+        self.fps = fps
+        self.ring = ring if ring is not None else FrameRing()
+        self._stop_event = threading.Event()
+        self.errors = 0
+
+    def run(self):
+        interval = 1.0 / self.fps if self.fps else None
+        next_time = time.monotonic()
+        while not self._stop_event.is_set():
+            generation = self.ring.generation
+            try:
+                frame = self.read_frame()
+            except Exception as e:
+                self.errors += 1
+                print(f"Error decodificando en {self.name}: {e}")
+                frame = None
+            if interval is None:
+                if frame is None:
+                    self._stop_event.wait(0.005)
+                elif not self.ring.push(frame, block=True, stop_event=self._stop_event,
+                                        generation=generation):
+                    break
+                continue
+            if frame is not None:
+                self.ring.push(frame, generation=generation)
+            next_time += interval
+            delay = next_time - time.monotonic()
+            if delay > 0:
+                self._stop_event.wait(delay)
+            else:
+                # Vamos atrasados: no acumular deuda de tiempo
+                next_time = time.monotonic()
+
+    def stop(self, timeout=1.0):
+        self._stop_event.set()
+        self.ring.wake()
+        if self.is_alive():
+            self.join(timeout)
@@ -0,0 +1,417 @@
+import ctypes
+
+import cv2
+import numpy as np
+
+import gldebug
+from OpenGL.GL import *
+
+from coverage import fit_size
+from renderer import MAX_LAYERS, MODE_COLOR, MODE_RGB, MODE_YUV
+from streaming import PixelBufferRing, StreamingTexture, UploadMeter
+from yuv import plane_sizes
+
+_FORMATS = {1: GL_RED, 3: GL_RGB, 4: GL_RGBA}
+_FLIP_Y, _MIPMAPS = 1, 2  # bits de u_layer_params[capa].w
+
+
+class FaceLayer(UploadMeter):
+    """Una capa de FaceTextureArray con la misma interfaz de subida que
+    StreamingTexture (upload, update_region) más upload_image/upload_planes
+    para frames yuv420p. El contenido ocupa la esquina (0, 0) de la capa y
+    tiene que entrar en ella: los reproductores le piden al decodificador el
+    tamaño de fit() en lugar de reducir cada frame en la CPU. Las imágenes
+    fijas (upload_asset) ocupan la capa entera y son las únicas que se leen
+    con mipmaps.
+    """
+
+    def __init__(self, array, index, name):
+        super().__init__()
+        self.array = array
+        self.index = index
+        self.name = name
+        self.label = name
+        self.size = None
+        self.asset_key = None  # clave de ImageCache de la imagen subida, si la hay
+
+    def _set_flag(self, bit, on):
+        flags = int(self.array.params[self.index, 3])
+        self.array.params[self.index, 3] = float(flags | bit if on else flags & ~bit)
+
+    @property
+    def flip_y(self):
+        return bool(int(self.array.params[self.index, 3]) & _FLIP_Y)
+
+    @flip_y.setter
+    def flip_y(self, flip):
+        self._set_flag(_FLIP_Y, flip)
+
+    @property
+    def mipmapped(self):
+        return bool(int(self.array.params[self.index, 3]) & _MIPMAPS)
+
+    @property
+    def mode(self):
+        return int(self.array.params[self.index, 2])
+
+    @property
+    def yuv(self):
+        return self.mode == MODE_YUV
+
+    def set_label(self, label):
+        # Las capas no son objetos GL: el nombre se usa para los grupos de gldebug
+        self.label = label
+
+    def _set_content(self, w, h, mode):
+        size = self.array.layer_size
+        self.array.params[self.index, :3] = (w / size, h / size, mode)
+        self.size = (w, h)
+        self._forget_asset()
+
+    def _forget_asset(self):
+        # Los mipmaps solo valen para la imagen con la que se generaron
+        self.asset_key = None
+        self._set_flag(_MIPMAPS, False)
+
+    @property
+    def max_size(self):
+        return self.array.layer_size
+
+    def fit(self, w, h):
+        """Tamaño con el que un contenido de w × h entra en la capa (ver coverage.fit_size)"""
+        return fit_size(w, h, self.max_size)
+
+    def _check_fits(self, w, h):
+        if self.fit(w, h) != (w, h):
+            raise ValueError(f"Un contenido de {w}×{h} no entra en la capa de {self.max_size}: "
+                             "hay que pedírselo al decodificador con el tamaño de fit()")
+
+    def upload(self, data, width=None):
+        """Sube una imagen (alto, ancho, canales) RGB o RGBA; width como en StreamingTexture.upload"""
+        h, row_length = data.shape[:2]
+        w = width or row_length
+        channels = data.shape[2] if data.ndim == 3 else 1
+        self._check_fits(w, h)
+        self.array.sub_image(self.array.rgb, self.index, 0, 0, w, h, _FORMATS[channels], data, row_length)
+        self._set_content(w, h, MODE_RGB)
+        self._account(w * h * channels)
+
+    def upload_asset(self, asset):
+        """Sube una imagen de ImageCache estirada a la capa entera y genera sus mipmaps.
+
+        Si la capa ya tiene esa versión de la imagen no sube nada y devuelve False.
+        """
+        if asset.key == self.asset_key:
+            return False
+        size = self.array.layer_size
+        pixels = asset.pixels
+        h, w = pixels.shape[:2]
+        if (w, h) != (size, size):
+            interpolation = cv2.INTER_AREA if w > size or h > size else cv2.INTER_LINEAR
+            pixels = cv2.resize(pixels, (size, size), interpolation=interpolation)
+        channels = pixels.shape[2] if pixels.ndim == 3 else 1
+        self.array.sub_image(self.array.rgb, self.index, 0, 0, size, size, _FORMATS[channels], pixels)
+        self._set_content(size, size, MODE_RGB)
+        self._account(pixels.nbytes)
+        self.array.generate_mipmaps()
+        self._set_flag(_MIPMAPS, True)
+        self.asset_key = asset.key
+        return True
+
+    def update_region(self, x, y, data):
+        """Sube solo el rectángulo (x, y) del contenido RGB ya subido"""
+        if self.size is None or self.mode != MODE_RGB:
+            raise RuntimeError("La capa no tiene contenido RGB")
+        h, w = data.shape[:2]
+        channels = data.shape[2] if data.ndim == 3 else 1
+        self.array.sub_image(self.array.rgb, self.index, x, y, w, h, _FORMATS[channels], data)
+        self._account(w * h * channels)
+        self._forget_asset()
+
+    def upload_image(self, img):
+        """Sube un ffpyplayer.pic.Image en formato yuv420p"""
+        fmt = img.get_pixel_format()
+        if fmt != 'yuv420p':
+            raise ValueError(f"Se esperaba un frame yuv420p y llegó {fmt}")
+        w, h = img.get_size()
+        buffers = img.to_memoryview(keep_align=True)
+        linesizes = img.get_linesizes(keep_align=True)
+        planes = []
+        for buf, linesize, (pw, ph) in zip(buffers, linesizes, plane_sizes(w, h)):
+            planes.append(np.frombuffer(buf, dtype=np.uint8, count=linesize * ph).reshape(ph, linesize))
+        self._upload_yuv(planes, w, h)
+
+    def upload_planes(self, planes):
+        """Sube los planos Y, U y V ya compactos (arrays alto × ancho sin relleno)"""
+        h, w = planes[0].shape
+        self._upload_yuv(planes, w, h)
+
+    def _upload_yuv(self, planes, w, h):
+        array = self.array
+        if array.yuv is None:
+            raise RuntimeError("El FaceTextureArray se creó sin capas YUV")
+        self._check_fits(w, h)
+        sizes = plane_sizes(w, h)
+        # Disposición I420 dentro de la capa: Y arriba, U y V lado a lado debajo
+        size = array.layer_size
+        origins = [(0, 0), (0, size), (size // 2, size)]
+        for plane, (pw, ph), (x, y) in zip(planes, sizes, origins):
+            # Sin copias: el linesize del decodificador se pasa como GL_UNPACK_ROW_LENGTH
+            array.sub_image(array.yuv, self.index, x, y, pw, ph, GL_RED, plane, plane.shape[1])
+        self._set_content(w, h, MODE_YUV)
+        self._account(w * h * 3 // 2)
+
+    def set_color(self, color):
+        """La cara se pinta de un color liso (r, g, b) en lugar de una textura"""
+        self.array.colors[self.index, :3] = color
+        self.array.params[self.index, 2] = MODE_COLOR
+        self.size = None
+        self._forget_asset()
+
+    def stats(self):
+        return {
+            'layer': self.index,
+            'size': self.size,
+            'mode': ('rgb', 'yuv', 'color')[self.mode],
+            'uploads': self.uploads,
+            'bytes_uploaded': self.bytes_uploaded,
+            'bytes_per_second': self.bytes_per_second,
+            'mipmapped': self.mipmapped,
+        }
+
+    def bind(self):
+        self.array.bind()
+
+    def release(self):
+        pass  # la memoria es del FaceTextureArray
+
+
+class FaceTextureArray:
+    """Texturas de todas las caras en GL_TEXTURE_2D_ARRAY, una capa por cara, para
+    dibujar el cubo entero con una sola llamada y un solo bind.
+
+    Las capas son cuadradas (layer_size): el contenido RGB/RGBA va a un array
+    RGBA8 y el YUV 4:2:0 a un array R8 de layer_size × 1.5·layer_size con la
+    disposición I420. params[capa] = (escala u, escala v, modo, flags) le dice
+    al shader qué parte de la capa ocupa el contenido y cómo leerlo.
+
+    El array RGBA tiene todos sus niveles de mipmap; generate_mipmaps() se
+    llama solo al subir una imagen fija y las demás capas leen el nivel 0.
+    """
+
+    def __init__(self, names, layer_size=1024, yuv=True):
+        names = list(names)
+        if len(names) > MAX_LAYERS:
+            raise ValueError(f"Como mucho {MAX_LAYERS} capas (llegaron {len(names)})")
+        self.names = names
+        self.layer_size = size = min(layer_size, int(glGetIntegerv(GL_MAX_TEXTURE_SIZE)) * 2 // 3)
+        self.levels = size.bit_length()  # 1024 -> 11 niveles, hasta 1 × 1
+        self.rgb = self._create(GL_RGBA8, GL_RGBA, size, size, "caras (RGBA)", self.levels)
+        self.yuv = self._create(GL_R8, GL_RED, size, size + size // 2, "caras (YUV)") if yuv else None
+        self.params = np.zeros((len(names), 4), dtype=np.float32)
+        self.params[:, 2] = MODE_COLOR
+        self.colors = np.zeros((len(names), 4), dtype=np.float32)
+        self.colors[:, 3] = 1.0
+        self.pbos = PixelBufferRing("caras") if bool(glGenBuffers) else None
+        self.layers = {name: FaceLayer(self, i, name) for i, name in enumerate(names)}
+        self.binds = 0
+        self.mipmap_builds = 0
+
+    def _create(self, internal_format, fmt, width, height, label, levels=1):
+        texture = glGenTextures(1)
+        glBindTexture(GL_TEXTURE_2D_ARRAY, texture)
+        for level in range(levels):
+            glTexImage3D(GL_TEXTURE_2D_ARRAY, level, internal_format, max(width >> level, 1),
+                         max(height >> level, 1), len(self.names), 0, fmt, GL_UNSIGNED_BYTE, None)
+        glTexParameteri(GL_TEXTURE_2D_ARRAY, GL_TEXTURE_MAX_LEVEL, levels - 1)
+        glTexParameteri(GL_TEXTURE_2D_ARRAY, GL_TEXTURE_MIN_FILTER,
+                        GL_LINEAR_MIPMAP_LINEAR if levels > 1 else GL_LINEAR)
+        glTexParameteri(GL_TEXTURE_2D_ARRAY, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+        glTexParameteri(GL_TEXTURE_2D_ARRAY, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
+        glTexParameteri(GL_TEXTURE_2D_ARRAY, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
+        gldebug.label(GL_TEXTURE, texture, label)
+        glBindTexture(GL_TEXTURE_2D_ARRAY, 0)
+        return texture
+
+    def __getitem__(self, name):
+        return self.layers[name]
+
+    def __len__(self):
+        return len(self.names)
+
+    def sub_image(self, texture, layer, x, y, w, h, fmt, data, row_length=0):
+        data = np.ascontiguousarray(data, dtype=np.uint8)
+        glBindTexture(GL_TEXTURE_2D_ARRAY, texture)
+        glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
+        row_length = row_length if row_length != w else 0
+        glPixelStorei(GL_UNPACK_ROW_LENGTH, row_length)
+        try:
+            if self.pbos is not None and self.pbos.stage(data, data.nbytes):
+                glTexSubImage3D(GL_TEXTURE_2D_ARRAY, 0, x, y, layer, w, h, 1, fmt,
+                                GL_UNSIGNED_BYTE, ctypes.c_void_p(0))
+                self.pbos.unbind()
+            else:
+                glTexSubImage3D(GL_TEXTURE_2D_ARRAY, 0, x, y, layer, w, h, 1, fmt, GL_UNSIGNED_BYTE, data)
+        finally:
+            if row_length:
+                glPixelStorei(GL_UNPACK_ROW_LENGTH, 0)
+
+    def generate_mipmaps(self):
+        """Regenera los mipmaps del array RGBA (solo hace falta al cambiar una imagen fija)"""
+        glBindTexture(GL_TEXTURE_2D_ARRAY, self.rgb)
+        glGenerateMipmap(GL_TEXTURE_2D_ARRAY)
+        glBindTexture(GL_TEXTURE_2D_ARRAY, 0)
+        self.mipmap_builds += 1
+
+    def bind(self):
+        # Unidad 0 = RGBA, unidad 1 = YUV (ver ARRAY_FRAGMENT_SHADER)
+        glActiveTexture(GL_TEXTURE0)
+        glBindTexture(GL_TEXTURE_2D_ARRAY, self.rgb)
+        glActiveTexture(GL_TEXTURE1)
+        glBindTexture(GL_TEXTURE_2D_ARRAY, self.yuv or 0)
+        glActiveTexture(GL_TEXTURE0)
+        self.binds += 1
+
+    def stats(self):
+        size = self.layer_size
+        nbytes = sum(len(self) * (size >> level) ** 2 * 4 for level in range(self.levels))
+        if self.yuv is not None:
+            nbytes += len(self) * size * (size + size // 2)
+        return {
+            'layers': len(self),
+            'layer_size': size,
+            'gpu_bytes': nbytes,
+            'binds': self.binds,
+            'mipmap_builds': self.mipmap_builds,
+            'faces': {name: layer.stats() for name, layer in self.layers.items()},
+        }
+
+    def release(self):
+        if self.pbos is not None:
+            self.pbos.release()
+            self.pbos = None
+        glDeleteTextures([t for t in (self.rgb, self.yuv) if t])
+
+
+class FaceTexture:
+    """Textura propia de una cara para el renderer inmediato (sin arrays ni YUV).
+
+    Misma interfaz que FaceLayer; la textura se crea con los canales del
+    primer contenido que se sube.
+    """
+
+    yuv = False
+    max_size = None  # cada cara tiene su textura del tamaño del contenido
+
+    def __init__(self, name):
+        self.name = name
+        self.label = name
+        self.flip_y = False
+        self.color = None
+        self.texture = None
+        self.asset_key = None
+        self._textures = {}  # canales (o 'asset') -> StreamingTexture
+
+    @property
+    def size(self):
+        return self.texture.size if self.texture is not None else None
+
+    @property
+    def bytes_per_second(self):
+        return sum(tex.bytes_per_second for tex in self._textures.values())
+
+    def fit(self, w, h):
+        return w, h
+
+    def set_label(self, label):
+        self.label = label
+        for tex in self._textures.values():
+            tex.set_label(label)
+
+    def upload(self, data, width=None):
+        channels = data.shape[2] if data.ndim == 3 else 1
+        tex = self._textures.get(channels)
+        if tex is None:
+            tex = self._textures[channels] = StreamingTexture(channels=channels)
+            tex.set_label(self.label)
+        tex.upload(data, width)
+        self.texture = tex
+        self.color = None
+        self.asset_key = None
+
+    def upload_asset(self, asset):
+        if asset.key == self.asset_key:
+            return False
+        tex = self._textures.get('asset')
+        if tex is None:
+            tex = self._textures['asset'] = StreamingTexture(
+                channels=asset.pixels.shape[2], min_filter=GL_LINEAR_MIPMAP_LINEAR, use_pbo=False)
+            tex.set_label(self.label)
+        tex.upload(asset.pixels)
+        glGenerateMipmap(GL_TEXTURE_2D)  # upload deja la textura enlazada
+        self.texture = tex
+        self.color = None
+        self.asset_key = asset.key
+        return True
+
+    def update_region(self, x, y, data):
+        self.texture.update_region(x, y, data)
+        if self.texture is self._textures.get('asset'):
+            glGenerateMipmap(GL_TEXTURE_2D)
+            self.asset_key = None
+
+    def upload_image(self, img):
+        raise RuntimeError("El renderer inmediato no soporta texturas YUV")
+
+    upload_planes = upload_image
+
+    def set_color(self, color):
+        self.color = color
+        self.asset_key = None
+
+    def stats(self):
+        return self.texture.stats() if self.texture is not None else {'size': None}
+
+    def bind(self):
+        if self.texture is not None:
+            self.texture.bind()
+
+    def release(self):
+        pass  # las texturas son del FaceTextureSet
+
+    def _release(self):
+        for tex in self._textures.values():
+            tex.release()
+        self._textures.clear()
+        self.texture = None
+
+
+class FaceTextureSet:
+    """Una FaceTexture por cara: el equivalente de FaceTextureArray sin arrays"""
+
+    def __init__(self, names):
+        self.names = list(names)
+        self.layers = {name: FaceTexture(name) for name in self.names}
+
+    def __getitem__(self, name):
+        return self.layers[name]
+
+    def __len__(self):
+        return len(self.names)
+
+    def bind(self):
+        pass
+
+    def stats(self):
+        return {'layers': len(self), 'faces': {name: t.stats() for name, t in self.layers.items()}}
+
+    def release(self):
+        for texture in self.layers.values():
+            texture._release()
+
+
+def create_face_textures(renderer, names, layer_size=1024):
+    """Texturas de las caras para el renderer: capas de un array si lo soporta, si no una por cara"""
+    if renderer.supports_texture_arrays:
+        return FaceTextureArray(names, layer_size, yuv=renderer.supports_yuv)
+    return FaceTextureSet(names)
@@ -1,105 +1,248 @@
 import glfw
+import gldebug  # antes que OpenGL.GL: en release desactiva el chequeo por llamada de PyOpenGL
 from OpenGL.GL import *
 from OpenGL.GLU import *
 import numpy as np
-import cv2
-from ffpyplayer.player import MediaPlayer
-import glm
+import os
 import time
-
-# Helper para chequear errores de OpenGL
-def check_gl_error(label="GL_ERROR"):
-    err = glGetError()
-    if err != GL_NO_ERROR:
-        print(f"{label}: {gluErrorString(err)} (0x{err:04X})")
-
-class Texture:
-    def __init__(self, path, flip=True):
-        self.id = glGenTextures(1)
-        self.load(path, flip)
-
-    def load(self, path, flip=True):
-        img = cv2.imread(path)
-        if img is None:
-            raise ValueError(f"No se pudo cargar la textura: {path}")
-        if flip:
-            img = cv2.flip(img, 0)
-        img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-        h, w, _ = img.shape
-
-        glActiveTexture(GL_TEXTURE0)
-        glBindTexture(GL_TEXTURE_2D, self.id)
-        check_gl_error("After bind Texture.load")
-        glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGB, w, h, 0, GL_RGB, GL_UNSIGNED_BYTE, img)
-        check_gl_error("After texImage2D Texture.load")
-
-    def bind(self):
-        glActiveTexture(GL_TEXTURE0)
-        glBindTexture(GL_TEXTURE_2D, self.id)
-        check_gl_error("After bind Texture.bind")
+import pygame
+from decoder import DecodeThread, FrameRing
+from clock import MasterClock, FrameScheduler
+from renderer import create_renderer
+from camera import Camera
+from picking import VertexPicker, project_points, unproject_point
+from mesh import FaceMesh
+from media import MediaSource, image_to_rgb
+from facetextures import create_face_textures
+from clipcache import ClipCache, ClipRecorder
+from preload import SourcePreloader
+from headless import create_context
+from profiler import Profiler, ProfilerOverlay
+from text import GlyphAtlas
+from governor import RenderGovernor
+from imagecache import image_cache
+from decodepool import DecodePool, PooledPlayer
+from coverage import ResolutionPolicy, scaled_size
+from visibility import VisibilityPass
 
 class VideoPlayer:
-    def __init__(self, video_path):
-        self.cap = cv2.VideoCapture(video_path)
-        if not self.cap.isOpened():
-            raise ValueError(f"No se pudo abrir el video: {video_path}")
-        self.audio_player = MediaPlayer(video_path)
-        self.texture_id = glGenTextures(1)
+    def __init__(self, video_path, texture, ring_size=4, yuv=False, clip_cache=None, source=None):
+        # Un solo MediaPlayer: reproduce el audio y decodifica el video una sola vez.
+        # source puede venir ya abierta y en pausa desde el SourcePreloader
+        self.source = source if source is not None else MediaSource(video_path, yuv=yuv)
+        if self.source.paused:
+            self.source.set_pause(False)
+        self.yuv = yuv
+        self.label = f"video {video_path}"
+        # Capa de la cara (FaceLayer o FaceTexture); la inversión vertical la hace el renderer
+        self.texture = texture
+        self.texture.set_label(self.label)
+        self.texture.flip_y = True
         self.frame_size = None
-        self._init_texture()
-        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
-        self.last_frame_time = time.time()
-
-    def _init_texture(self):
-        glActiveTexture(GL_TEXTURE0)
-        glBindTexture(GL_TEXTURE_2D, self.texture_id)
-        check_gl_error("After bind VideoPlayer._init_texture")
-        glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-        dummy = np.zeros((1,1,3), dtype=np.uint8)
-        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGB, 1, 1, 0, GL_RGB, GL_UNSIGNED_BYTE, dummy)
-        check_gl_error("After texImage2D VideoPlayer._init_texture")
+        self.native_size = None  # el del primer frame, antes de cualquier set_output_scale
+        self.full_size = None  # el nativo limitado a la capa: lo que se decodifica con escala 1
+        self.output_scale = 1.0
+        self.scale_changes = 0
+        self.oversized = 0  # frames más grandes que la capa, descartados hasta que el decodificador achica
+        self.uploaded_pixels = 0
+        self.native_pixels = 0  # los que se habrían subido con escala 1
+        # Ahorro en la misma ventana de un segundo que bytes_per_second de la textura
+        self.upload_saving_pct = 0.0
+        self._window_start = time.monotonic()
+        self._window_uploaded = 0
+        self._window_native = 0
+        self.visible = True
+        self.pause_hidden = False
+        self.pause_after = 1.0  # segundos oculta antes de pausar la decodificación
+        self.decode_paused = False
+        self._hidden_since = None
+        self.skipped_uploads = 0
+        self.fps = self.source.fps
+        # Los clips cortos se guardan decodificados durante la primera vuelta
+        self.recorder = None
+        if clip_cache is not None and clip_cache.accepts(video_path):
+            self.recorder = ClipRecorder(clip_cache, video_path, yuv)
+        # La decodificación corre en un hilo aparte y va por delante; update() presenta
+        # el frame que corresponde según el reloj maestro (audio o monotónico)
+        self.clock = MasterClock(self.source.get_pts)
+        self.frames = FrameRing(ring_size)
+        self.scheduler = FrameScheduler(self.clock, self.frames, 1.0 / self.fps)
+        self.decoder = DecodeThread(self._read_frame, ring=self.frames,
+                                    name=f"decoder:{video_path}")
+        self.decoder.start()
+
+    def _read_frame(self):
+        item = self.source.read_frame()
+        if item is not None:
+            size = item[1].get_size()
+            if self.native_size is None:
+                # La capa limita el tamaño: lo reduce el decodificador, no cada subida
+                self.full_size = self.texture.fit(*size)
+                if self.full_size != size:
+                    self.source.set_size(*self.full_size)
+                    self._abandon_recording()
+                self.native_size = size  # desde acá set_output_scale puede cambiar el tamaño
+            if self.texture.fit(*size) != size:
+                self.oversized += 1  # decodificado antes de que set_size tome efecto
+                return None
+        if self.recorder is not None and not self.recorder.done:
+            if self.source.loops or self.source.eof:
+                self.recorder.finish()
+            elif item is not None:
+                self.recorder.feed(*item)
+        return item
+
+    def set_visible(self, visible, pause=False):
+        """Con la cara oculta no se sube ningún frame; con pause además se pausa la
+        decodificación (y el audio) tras pause_after segundos oculta y al volver se
+        salta a la posición del reloj maestro"""
+        self.pause_hidden = pause
+        if visible == self.visible:
+            return
+        self.visible = visible
+        self._hidden_since = None if visible else time.monotonic()
+        if visible and self.decode_paused:
+            self.source.seek(self.clock.now())
+            self.frames.clear()
+            self.source.set_pause(False)
+            self.decode_paused = False
 
     def update(self):
-        audio_frame, audio_val = self.audio_player.get_frame()
-        now = time.time()
-        if now - self.last_frame_time < 1.0/self.fps:
+        if not self.visible and self.pause_hidden and not self.decode_paused \
+                and time.monotonic() - self._hidden_since >= self.pause_after:
+            if self.recorder is not None and not self.recorder.done:
+                self.recorder.abandon()  # el salto deja la primera vuelta incompleta
+            self.source.set_pause(True)
+            self.decode_paused = True
+        img = self.scheduler.next_frame()
+        if img is None:
             return
-        self.last_frame_time = now
-        ret, frame = self.cap.read()
-        if not ret:
-            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        if not self.visible:
+            self.skipped_uploads += 1  # el frame venció pero la cara no se ve
             return
-        img = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        img = np.flipud(img)
-        h, w, _ = img.shape
-        gl_format = GL_RGB
-        glActiveTexture(GL_TEXTURE0)
-        glBindTexture(GL_TEXTURE_2D, self.texture_id)
-        check_gl_error("After bind VideoPlayer.update")
-        glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
-        glTexImage2D(GL_TEXTURE_2D, 0, gl_format, w, h, 0, gl_format, GL_UNSIGNED_BYTE, img)
-        check_gl_error("After texImage2D VideoPlayer.update")
-        self.frame_size = (w, h)
-
-    def bind(self):
-        glActiveTexture(GL_TEXTURE0)
-        glBindTexture(GL_TEXTURE_2D, self.texture_id)
-        check_gl_error("After bind VideoPlayer.bind")
-
-    def release(self):
-        if hasattr(self, 'cap'):
-            self.cap.release()
-        if hasattr(self, 'audio_player'):
-            self.audio_player.close_player()
-        glDeleteTextures([self.texture_id])
+        with gldebug.group(self.label):
+            if self.yuv:
+                self.texture.upload_image(img)
+            else:
+                self.texture.upload(image_to_rgb(img))
+        self.frame_size = w, h = img.get_size()
+        full = self.full_size[0] * self.full_size[1]
+        self.uploaded_pixels += w * h
+        self.native_pixels += full
+        self._window_uploaded += w * h
+        self._window_native += full
+        now = time.monotonic()
+        if now - self._window_start >= 1.0:
+            self.upload_saving_pct = 100.0 * (1.0 - self._window_uploaded / self._window_native)
+            self._window_uploaded = self._window_native = 0
+            self._window_start = now
+
+    def set_output_scale(self, scale):
+        """Decodifica a scale de la resolución nativa (ver coverage.ResolutionPolicy)"""
+        if scale == self.output_scale or self.native_size is None:
+            return
+        self.output_scale = scale
+        size = self.texture.fit(*scaled_size(*self.native_size, scale)) if scale < 1.0 else self.full_size
+        self.source.set_size(*(size if size != self.native_size else (0, 0)))
+        self.scale_changes += 1
+        if size != self.native_size:
+            self._abandon_recording()
+
+    def _abandon_recording(self):
+        if self.recorder is not None and not self.recorder.done:
+            self.recorder.abandon()  # el clip de la caché tiene que quedar a resolución nativa
+
+    def time_to_next_frame(self):
+        """Segundos hasta el próximo frame a presentar (None si no hay ninguno o la cara está oculta)"""
+        if not self.visible:
+            return None
+        return self.scheduler.time_to_next(1.0 / self.fps)
+
+    def stats(self):
+        stats = self.frames.stats()
+        stats.update(self.scheduler.stats())
+        stats['upload_bytes_per_second'] = self.texture.bytes_per_second
+        stats['output_scale'] = self.output_scale
+        stats['scale_changes'] = self.scale_changes
+        stats['full_size'] = self.full_size
+        stats['oversized'] = self.oversized
+        stats['upload_saving_pct'] = self.upload_saving_pct
+        # ffpyplayer escala después del códec: solo se ahorra la conversión y la subida
+        stats['decode_saving_pct'] = 0.0
+        stats['visible'] = self.visible
+        stats['skipped_uploads'] = self.skipped_uploads
+        stats['decode_paused'] = self.decode_paused
+        return stats
+
+    def release(self, close_source=None):
+        # close_source permite cerrar el MediaPlayer fuera del hilo de render
+        if hasattr(self, 'decoder'):
+            self.decoder.stop()
+        if hasattr(self, 'source'):
+            (close_source or MediaSource.close)(self.source)
+
+class ClipPlayer:
+    """Reproduce en bucle un clip ya decodificado de la ClipCache: sin abrir el
+    archivo ni decodificar, solo sube el frame que toca según el reloj."""
+
+    def __init__(self, clip, texture):
+        self.clip = clip
+        self.yuv = clip.yuv
+        self.label = f"clip {clip.path}"
+        self.texture = texture
+        self.texture.set_label(self.label)
+        self.texture.flip_y = True
+        self.frame_size = clip.size
+        self.fps = len(clip) / clip.duration if clip.duration else 30.0
+        self.clock = MasterClock()
+        self.index = None
+        self.presented = 0
+        self.visible = True
+        self.skipped_uploads = 0
+
+    def set_visible(self, visible, pause=False):
+        if visible and not self.visible:
+            self.index = None  # subir el frame actual aunque el índice no haya cambiado
+        self.visible = visible
+
+    def update(self):
+        i = self.clip.index_at(self.clock.now())
+        if i == self.index:
+            return
+        self.index = i
+        if not self.visible:
+            self.skipped_uploads += 1
+            return
+        with gldebug.group(self.label):
+            if self.yuv:
+                self.texture.upload_planes(self.clip.frame(i))
+            else:
+                self.texture.upload(self.clip.frame(i))
+        self.presented += 1
+
+    def time_to_next_frame(self):
+        if not self.clip.duration or not self.visible:
+            return None
+        t = self.clock.now() % self.clip.duration
+        i = self.clip.index_at(t)
+        end = self.clip.pts[i + 1] if i + 1 < len(self.clip) else self.clip.duration
+        return end - t
+
+    def stats(self):
+        return {
+            'clip_frames': len(self.clip),
+            'clip_bytes': self.clip.nbytes,
+            'presented': self.presented,
+            'upload_bytes_per_second': self.texture.bytes_per_second,
+            'visible': self.visible,
+            'skipped_uploads': self.skipped_uploads,
+        }
+
+    def release(self, close_source=None):
+        pass  # la capa es de la cara y la usa el siguiente reproductor
 
 class Cube:
-    def __init__(self):
+    def __init__(self, subdivisions=1, brush_radius=1.0):
         self.vertices = np.array([
             [-1, -1,  1], [ 1, -1,  1], [ 1,  1,  1], [-1,  1,  1],
             [-1, -1, -1], [ 1, -1, -1], [ 1,  1, -1], [-1,  1, -1],
@@ -109,18 +252,22 @@ class Cube:
             'derecha': [1,5,6,2],
             'arriba': [3,2,6,7]
         }
+        self.version = 0  # cambia cada vez que se mueve un vértice
+        self.picker = VertexPicker()
+        # Cada cara es una malla N×N; las esquinas de la malla coinciden con self.vertices
+        self.brush_radius = brush_radius
+        self.meshes = {
+            name: FaceMesh(self.vertices[idx], subdivisions) for name, idx in self.faces.items()
+        }
 
-    def draw_face(self, face_name, texture):
-        glEnable(GL_TEXTURE_2D)
-        glColor3f(1.0,1.0,1.0)
-        texture.bind()
-        glBegin(GL_QUADS)
-        tex_coords = [(0,0),(1,0),(1,1),(0,1)]
-        for i, idx in enumerate(self.faces[face_name]):
-            glTexCoord2f(*tex_coords[i])
-            glVertex3fv(self.vertices[idx])
-        glEnd()
-        glDisable(GL_TEXTURE_2D)
+    def move_vertex(self, idx, position):
+        old = self.vertices[idx].copy()
+        self.vertices[idx] = position
+        delta = self.vertices[idx] - old
+        for name, mesh in self.meshes.items():
+            if idx in self.faces[name]:
+                mesh.deform(old, delta, self.brush_radius)
+        self.version += 1
 
     def draw_vertices(self):
         glPointSize(8)
@@ -131,36 +278,60 @@ class Cube:
         glEnd()
         glColor3f(1,1,1)
 
-    def pick_vertex(self, x, y, view, projection, threshold=15):
-        glFlush()
-        viewport = glGetIntegerv(GL_VIEWPORT)
-        closest = None
-        min_dist = threshold
-        for i, vert in enumerate(self.vertices):
-            sc = glm.project(glm.vec3(*vert), view, projection, glm.vec4(*viewport))
-            dx = x - sc.x
-            dy = (viewport[3] - y) - sc.y
-            dist = np.hypot(dx, dy)
-            if dist < min_dist:
-                min_dist = dist
-                closest = i
-        return closest
+    def _update_picker(self, view, projection, viewport):
+        self.picker.update(self.vertices, projection @ view, viewport, self.version)
+
+    def pick_vertex(self, x, y, view, projection, viewport, threshold=15):
+        # x, y en coordenadas de ventana (origen arriba a la izquierda)
+        self._update_picker(view, projection, viewport)
+        return self.picker.nearest(x, viewport[3] - y, threshold)
+
+    def select_box(self, x0, y0, x1, y1, view, projection, viewport):
+        self._update_picker(view, projection, viewport)
+        h = viewport[3]
+        return self.picker.select_box(x0, h - y0, x1, h - y1)
+
+    def select_lasso(self, points, view, projection, viewport):
+        self._update_picker(view, projection, viewport)
+        h = viewport[3]
+        return self.picker.select_lasso([(x, h - y) for x, y in points])
 
 class InteractiveCubeApp:
+    orbit_speed = 0.4  # grados por píxel al orbitar con el botón derecho
+    orbit_keys = {  # flechas: pasos de 15 grados
+        glfw.KEY_LEFT: (0.0, -15.0), glfw.KEY_RIGHT: (0.0, 15.0),
+        glfw.KEY_UP: (-15.0, 0.0), glfw.KEY_DOWN: (15.0, 0.0),
+    }
+
     def framebuffer_size_callback(self, window, width, height):
         self.width = width
         self.height = height
         glViewport(0, 0, width, height)
+        self.governor.invalidate('resize')
 
-    def __init__(self, width=800, height=600):
+    def __init__(self, width=800, height=600, renderer_mode=None, subdivisions=1):
         self.width = width
         self.height = height
         self.window = None
-        self.cube = Cube()
+        self.context = None  # contexto headless (init_headless)
+        self.governor = None  # decide cuándo dibujar (ver governor.py)
+        # CUBE_PROFILE=prefijo activa el perfilado y exporta <prefijo>.trace.json/.csv al salir
+        self.profile_path = os.environ.get('CUBE_PROFILE')
+        self.profiler = Profiler(enabled=bool(self.profile_path))
+        # Etiquetas del overlay (tecla P): el atlas se sube a GL al dibujarlo por primera vez
+        pygame.font.init()
+        self.text_atlas = GlyphAtlas(pygame.font.SysFont('Arial', 24))
+        self.profiler_overlay = ProfilerOverlay(self.profiler, self.text_atlas)
+        self.cube = Cube(subdivisions)
         self.selected_vertex = None
-        self.textures = {}
+        self.drag_pos = None  # última posición del cursor sin aplicar (ver apply_drag)
+        self.renderer_mode = renderer_mode  # 'shader' o 'immediate'
+        self.renderer = None
+        self.face_textures = None  # una capa por cara (ver facetextures.py)
         self.video_players = {}  
-        self.zoom = -6.0  
+        # Zoom, órbita y aspecto; de ella salen todas las matrices (ver camera.py)
+        self.camera = Camera(zoom=-6.0, pitch=30.0, yaw=-45.0)
+        self.orbit_from = None  # cursor al empezar a orbitar con el botón derecho
         self.image_paths = {'frente':'cover.png'}
         self.video_path = {
             'arriba': 'video.mp4',
@@ -168,19 +339,93 @@ class InteractiveCubeApp:
         }
         self.right_video_list = ['mish.mp4', 'mish2.gif', 'mish3.gif','mish4.gif']
         self.right_video_index = 0
+        # Clips cortos decodificados para volver a ellos sin reabrir el archivo
+        self.clip_cache = ClipCache(budget=128 * 1024 * 1024, max_duration=10.0)
+        # Siguiente y anterior de la lista abiertos en segundo plano
+        self.preloader = None
+        # Decodificación en otros procesos si CUBE_DECODE_POOL está definido (ver decodepool.py)
+        self.decode_pool = DecodePool.from_env()
+        # Resolución de decodificación según el área de cada cara en pantalla (CUBE_ADAPTIVE_RES=0 la apaga)
+        self.resolution_policy = ResolutionPolicy() if os.environ.get('CUBE_ADAPTIVE_RES', '1') != '0' else None
+        # Caras de espaldas, fuera de pantalla o sin área: no se dibujan ni suben frames;
+        # con CUBE_PAUSE_HIDDEN=1 además se pausa su decodificación (y su audio)
+        self.visibility = VisibilityPass()
+        self.pause_hidden = os.environ.get('CUBE_PAUSE_HIDDEN') == '1'
+
+    @property
+    def zoom(self):
+        return self.camera.zoom
+
+    @zoom.setter
+    def zoom(self, zoom):
+        self.camera.zoom = zoom
+
+    def open_video(self, path, face):
+        return self.open_player(path, self.face_textures[face])
+
+    def open_player(self, path, texture):
+        """ClipPlayer si el clip ya está decodificado en la ClipCache, si no VideoPlayer
+        (None si no se pudo abrir)"""
+        yuv = self.renderer.supports_yuv
+        if self.clip_cache.accepts(path):
+            clip = self.clip_cache.get(path, yuv)
+            # Los clips se guardan a resolución nativa: solo sirven si entran en la capa
+            if clip is not None and texture.fit(*clip.size) == clip.size:
+                return ClipPlayer(clip, texture)
+        if self.decode_pool is not None:
+            stream = self.decode_pool.open(path, yuv, texture.max_size)
+            if stream is not None:
+                return PooledPlayer(stream, texture, self.decode_pool)
+        source = self.preloader.take(path) if self.preloader else None
+        try:
+            return VideoPlayer(path, texture, yuv=yuv, clip_cache=self.clip_cache, source=source)
+        except ValueError as e:
+            print(f"Error: {e}")
+            return None
+
+    def preload_neighbours(self):
+        n = len(self.right_video_list)
+        yuv = self.renderer.supports_yuv
+        paths = []
+        for step in (1, -1):
+            path = self.right_video_list[(self.right_video_index + step) % n]
+            if path not in paths and (path, yuv) not in self.clip_cache:
+                paths.append(path)
+        self.preloader.keep(paths)
 
     def toggle_video(self):
         self.right_video_index = (self.right_video_index + 1) % len(self.right_video_list)
         new_path = self.right_video_list[self.right_video_index]
         self.video_path['derecha'] = new_path
-        self.video_players['derecha'].release()
-        self.video_players['derecha'] = VideoPlayer(new_path)
-
-
+        old = self.video_players.pop('derecha', None)
+        player = self.open_video(new_path, 'derecha')
+        if player is not None:
+            self.video_players['derecha'] = player
+        if old is not None:
+            old.release(close_source=self.preloader.close)
+        self.preload_neighbours()
+
+
+
+    def init_headless(self, backend=None):
+        # Sin ventana visible (benchmarks y CI): 'glfw' invisible o 'egl'; no hay eventos
+        self.context = create_context(self.width, self.height, backend)
+        self.window = self.context.window
+        self.governor = RenderGovernor(events=False)
+        gldebug.install()
+        glEnable(GL_DEPTH_TEST)
+        glClearColor(0.0, 0.0, 0.0, 1.0)
 
     def key_callback(self, window, key, scancode, action, mods):
+        if action == glfw.PRESS:
+            self.governor.invalidate('input')
         if key == glfw.KEY_SPACE and action == glfw.PRESS:
             self.toggle_video()
+        elif key == glfw.KEY_P and action == glfw.PRESS:
+            self.profiler_overlay.toggle()
+        elif key in self.orbit_keys and action in (glfw.PRESS, glfw.REPEAT):
+            self.camera.orbit_by(*self.orbit_keys[key])
+            self.governor.invalidate('input')
 
     def init_glfw(self):
         if not glfw.init():
@@ -207,83 +452,169 @@ class InteractiveCubeApp:
         glfw.set_scroll_callback(self.window, self.scroll_callback)
         glfw.set_key_callback(self.window, self.key_callback)
         glfw.set_framebuffer_size_callback(self.window, self.framebuffer_size_callback)
+        self.governor = RenderGovernor()
+        gldebug.install()
         glEnable(GL_DEPTH_TEST)
         glClearColor(0.0, 0.0, 0.0, 1.0)
 
     def load_resources(self):
+        self.renderer = create_renderer(mode=self.renderer_mode)
+        self.preloader = SourcePreloader(yuv=self.renderer.supports_yuv)
+        self.face_textures = create_face_textures(self.renderer, self.cube.faces)
         for face, path in self.image_paths.items():
-            self.textures[face] = Texture(path)
+            # Decodificada una sola vez por proceso; con mipmaps
+            self.face_textures[face].upload_asset(image_cache.get(path))
         for face, path in self.video_path.items():
-            self.video_players[face] = VideoPlayer(path)
+            player = self.open_video(path, face)
+            if player is not None:  # una cara sin video no se dibuja
+                self.video_players[face] = player
+        self.preload_neighbours()
 
     def mouse_button_callback(self, window, button, action, mods):
         if button == glfw.MOUSE_BUTTON_LEFT:
+            self.governor.invalidate('input')
             x,y = glfw.get_cursor_pos(window)
-            proj = glm.perspective(glm.radians(45), self.width/self.height, 0.1, 50)
-            view = glm.translate(glm.mat4(1), glm.vec3(0,0,self.zoom))
-            view = glm.rotate(view, glm.radians(30), glm.vec3(1,0,0))
-            view = glm.rotate(view, glm.radians(-45), glm.vec3(0,1,0))
             if action == glfw.PRESS:
-                self.selected_vertex = self.cube.pick_vertex(x,y,view,proj)
+                camera = self.camera
+                self.selected_vertex = self.cube.pick_vertex(x, y, camera.view, camera.projection, camera.viewport)
             else:
                 self.selected_vertex = None
+        elif button == glfw.MOUSE_BUTTON_RIGHT:
+            self.orbit_from = glfw.get_cursor_pos(window) if action == glfw.PRESS else None
 
     def mouse_motion_callback(self, window, xpos, ypos):
+        if self.orbit_from is not None:
+            # El objetivo de la órbita sigue al cursor; la cámara lo alcanza suavemente
+            x0, y0 = self.orbit_from
+            self.camera.orbit_by((ypos - y0) * self.orbit_speed, (xpos - x0) * self.orbit_speed)
+            self.orbit_from = (xpos, ypos)
+            self.governor.invalidate('input')
+            return
+        if self.selected_vertex is None:
+            return
+        # Solo la última posición: render() la aplica una vez por frame
+        self.drag_pos = (xpos, ypos)
+        self.governor.invalidate('drag')
+
+    def apply_drag(self):
+        """Mueve el vértice arrastrado a la última posición del cursor, a la profundidad que ya tenía"""
+        if self.drag_pos is None:
+            return
+        xpos, ypos = self.drag_pos
+        self.drag_pos = None
         if self.selected_vertex is None:
             return
-        viewport = glGetIntegerv(GL_VIEWPORT)
-        proj = glm.perspective(glm.radians(45), self.width/self.height, 0.1, 50)
-        view = glm.translate(glm.mat4(1), glm.vec3(0,0,self.zoom))
-        view = glm.rotate(view, glm.radians(30), glm.vec3(1,0,0))
-        view = glm.rotate(view, glm.radians(-45), glm.vec3(0,1,0))
-        old_world = self.cube.vertices[self.selected_vertex]
-        screen_pos = glm.project(glm.vec3(*old_world), view, proj, glm.vec4(*viewport))
-        new_world = glm.unProject(glm.vec3(xpos, viewport[3] - ypos, screen_pos.z), view, proj, glm.vec4(*viewport))
-        self.cube.vertices[self.selected_vertex] = [new_world.x, new_world.y, new_world.z]
+        camera = self.camera
+        idx = self.selected_vertex
+        window, in_front = project_points(self.cube.vertices[idx:idx + 1], camera.view_projection, camera.viewport)
+        if in_front[0]:
+            self.cube.move_vertex(idx, unproject_point(xpos, self.height - ypos, window[0, 2],
+                                                       camera.inverse_view_projection, camera.viewport))
 
     def scroll_callback(self, window, xoffset, yoffset):
-        self.zoom += yoffset * 0.5
-        self.zoom = max(-30.0, min(-2.0, self.zoom))
+        self.camera.zoom_by(yoffset * 0.5)
+        self.governor.invalidate('input')
 
     def setup_proj(self):
+        """Avanza la órbita de la cámara y devuelve sus matrices (vista, proyección)"""
         glViewport(0, 0, self.width, self.height)
-        glMatrixMode(GL_PROJECTION)
-        proj = glm.perspective(glm.radians(45), self.width/self.height, 0.1, 50.0)
-        glLoadMatrixf(np.array(proj.to_list(), dtype=np.float32))
-        glMatrixMode(GL_MODELVIEW)
-        mv = glm.translate(glm.mat4(1), glm.vec3(0,0,self.zoom))
-        mv = glm.rotate(mv, glm.radians(30), glm.vec3(1,0,0))
-        mv = glm.rotate(mv, glm.radians(-45), glm.vec3(0,1,0))
-        glLoadMatrixf(np.array(mv.to_list(), dtype=np.float32))
+        self.camera.set_viewport(self.width, self.height)
+        self.camera.update()
+        return self.camera.view, self.camera.projection
 
     def render(self):
         glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
-        self.setup_proj()
-        
-        self.cube.draw_face('frente', self.textures['frente'])
-        for vp in self.video_players.values():
-            vp.update()
-
-        self.cube.draw_face('frente', self.textures['frente'])
-        self.cube.draw_face('derecha', self.video_players['derecha'])
-        self.cube.draw_face('arriba', self.video_players['arriba'])
+        view, proj = self.setup_proj()
+        self.apply_drag()
+        visible = self.visibility.update(self.cube.meshes, self.camera.view_projection, self.camera.viewport)
+        self.adapt_video_sizes()
+        for face, vp in self.video_players.items():
+            vp.set_visible(face in visible, pause=self.pause_hidden)
+            with self.profiler.scope('VideoPlayer.update'):
+                vp.update()
+
+        # Las caras visibles con imagen o video, todas en una llamada con un solo bind de texturas
+        meshes = self.cube.meshes
+        faces = [(meshes[face], self.face_textures[face]) for face in self.cube.faces
+                 if face in visible and (face in self.image_paths or face in self.video_players)]
+        self.renderer.begin(view, proj)
+        self.renderer.draw_faces(faces)
+        self.renderer.end()
         #self.cube.draw_vertices()
+        self.profiler_overlay.draw(self.width, self.height)
+        gldebug.check("render")
+
+    def adapt_video_sizes(self):
+        """Ajusta la resolución de decodificación de cada video al área de su cara en
+        pantalla (la del VisibilityPass de este frame); las ocultas conservan la suya"""
+        if self.resolution_policy is None:
+            return
+        for face, vp in self.video_players.items():
+            if getattr(vp, 'native_size', None) is None:
+                continue  # ClipPlayer, PooledPlayer o todavía sin el primer frame
+            if not self.visibility.is_visible(face):
+                continue
+            area = self.visibility.areas[face]
+            vp.set_output_scale(self.resolution_policy.update(face, area, vp.native_size))
 
     def run(self):
         try:
             self.init_glfw()
             self.load_resources()
-            while not glfw.window_should_close(self.window):
-                glfw.poll_events()
-                self.render()
-                glfw.swap_buffers(self.window)
+            self.loop(lambda: glfw.window_should_close(self.window))
         finally:
             self.cleanup()
 
+    def loop(self, should_close):
+        # Los eventos que despiertan al governor se procesan mientras espera; los
+        # que llegan con el frame ya vencido, al empezar el frame
+        while not should_close():
+            if not self.governor.wait():
+                continue
+            self.profiler.begin_frame()
+            with self.profiler.scope('poll_events'):
+                self.governor.poll_events()
+            with self.profiler.scope('render'):
+                self.render()
+            with self.profiler.scope('swap_buffers'):
+                self.swap_buffers()
+            self.profiler.end_frame()
+            self.governor.frame_done()
+            self.schedule_next_frame()
+
+    def schedule_next_frame(self):
+        """Programa el próximo frame: el primer video que tenga uno a punto de vencer"""
+        if self.profiler_overlay.visible:
+            self.governor.invalidate('overlay')  # las gráficas avanzan en cada frame
+        if self.camera.animating:
+            self.governor.invalidate('camera')
+        for vp in self.video_players.values():
+            self.governor.schedule_in(vp.time_to_next_frame(), 'video')
+
+    def swap_buffers(self):
+        if self.context:
+            self.context.swap()
+        else:
+            glfw.swap_buffers(self.window)
+
     def cleanup(self):
+        if self.profile_path:
+            self.profiler.export(self.profile_path)
+        self.profiler.release()
+        self.text_atlas.release()
         for vp in self.video_players.values():
             vp.release()
-        glDeleteTextures([t.id for t in self.textures.values()])
+        if self.decode_pool:
+            self.decode_pool.shutdown()
+        if self.preloader:
+            self.preloader.shutdown()
+        if self.face_textures:
+            self.face_textures.release()
+        if self.renderer:
+            self.renderer.release()
+        if self.context:
+            self.context.release()
+            return
         if self.window:
             glfw.destroy_window(self.window)
         glfw.terminate()
@@ -0,0 +1,197 @@
+"""Comprobación de errores de OpenGL sin glGetError en cada llamada.
+
+CUBE_GL_DEBUG controla el modo y se lee al importar este módulo, que debe
+importarse antes que OpenGL.GL (PyOpenGL fija su chequeo por llamada al cargar):
+
+    sin definir / 0 -> release: PyOpenGL no llama a glGetError después de cada
+                       función y label(), group() y check() no hacen nada
+    1               -> callback de KHR_debug (o glGetError muestreado cada
+                       sample_every frames si no hay KHR_debug)
+    strict          -> lo mismo y además el chequeo por llamada de PyOpenGL,
+                       que lanza GLError en la función que falló
+
+Los mensajes se atribuyen a la pila de grupos (group) activa cuando se produjo
+el error y a los objetos etiquetados (label): con KHR_debug los nombra el propio
+driver vía glObjectLabel; en modo muestreado check() busca los objetos enlazados.
+"""
+import ctypes
+import os
+import sys
+
+import OpenGL
+
+MODE = os.environ.get('CUBE_GL_DEBUG', '').lower()
+DEBUG = MODE not in ('', '0', 'off')
+if 'OpenGL.GL' not in sys.modules:
+    OpenGL.ERROR_CHECKING = MODE == 'strict'
+    if not OpenGL.ERROR_CHECKING and os.environ.get('PYOPENGL_PLATFORM') == 'egl':
+        # Con ERROR_CHECKING=False PyOpenGL no define el checker que esperan sus wrappers EGL
+        from OpenGL.raw.EGL import _errors as _egl_errors
+        if not hasattr(_egl_errors, '_error_checker'):
+            _egl_errors._error_checker = None
+
+from OpenGL.GL import *  # noqa: E402
+
+sample_every = 60  # frames entre glGetError en el modo sin KHR_debug
+
+_mode = None  # None (release o sin instalar), 'callback' o 'sampled'
+_callback = None  # referencia al callback de ctypes para que no lo libere el GC
+_groups = []
+_labels = {}  # (kind, id) -> texto, para nombrar en check() lo enlazado al fallar
+_frames = 0
+errors = 0
+messages = 0
+
+_SEVERITY = {
+    GL_DEBUG_SEVERITY_HIGH: 'HIGH',
+    GL_DEBUG_SEVERITY_MEDIUM: 'MEDIUM',
+    GL_DEBUG_SEVERITY_LOW: 'LOW',
+    GL_DEBUG_SEVERITY_NOTIFICATION: 'NOTIFICATION',
+}
+
+
+class _NullGroup:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_GROUP = _NullGroup()
+
+
+class _Group:
+    __slots__ = ('name',)
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        _groups.append(self.name)
+        if _mode == 'callback':
+            glPushDebugGroup(GL_DEBUG_SOURCE_APPLICATION, 0, -1, self.name.encode())
+        return self
+
+    def __exit__(self, *exc):
+        if _mode == 'callback':
+            glPopDebugGroup()
+        _groups.pop()
+        return False
+
+
+def _where():
+    return " > ".join(_groups) if _groups else "-"
+
+
+def _on_message(source, type_, id_, severity, length, message, user):
+    global errors, messages
+    messages += 1
+    if type_ == GL_DEBUG_TYPE_ERROR:
+        errors += 1
+    text = ctypes.string_at(message, length).decode(errors='replace')
+    print(f"GL {_SEVERITY.get(severity, severity)}: {text} [{_where()}]")
+
+
+def _has_khr_debug():
+    if not bool(glDebugMessageCallback):
+        return False
+    count = glGetIntegerv(GL_NUM_EXTENSIONS)
+    extensions = {glGetStringi(GL_EXTENSIONS, i) for i in range(count)}
+    major = glGetIntegerv(GL_MAJOR_VERSION)
+    minor = glGetIntegerv(GL_MINOR_VERSION)
+    return b'GL_KHR_debug' in extensions or (major, minor) >= (4, 3)
+
+
+def install():
+    """Activa el modo depuración en el contexto actual (no hace nada en release)"""
+    global _mode, _callback
+    if not DEBUG or _mode is not None:
+        return _mode
+    if _has_khr_debug():
+        _callback = GLDEBUGPROC(_on_message)
+        glEnable(GL_DEBUG_OUTPUT)
+        # Síncrono: el mensaje llega dentro de la llamada que falló, con su grupo activo
+        glEnable(GL_DEBUG_OUTPUT_SYNCHRONOUS)
+        glDebugMessageCallback(_callback, None)
+        glDebugMessageControl(GL_DONT_CARE, GL_DONT_CARE, GL_DEBUG_SEVERITY_NOTIFICATION,
+                              0, None, GL_FALSE)
+        _mode = 'callback'
+    else:
+        _mode = 'sampled'
+    return _mode
+
+
+def label(kind, name, text):
+    """Nombre legible para un objeto GL (GL_TEXTURE, GL_BUFFER, GL_PROGRAM...).
+
+    El objeto tiene que existir ya (por ejemplo, una textura después de su primer bind).
+    """
+    if _mode is None:
+        return
+    _labels[(kind, int(name))] = text
+    if _mode == 'callback':
+        glObjectLabel(kind, name, -1, text.encode())
+
+
+def group(name):
+    """Contexto que atribuye a name los errores producidos dentro de él"""
+    if _mode is None:
+        return _NULL_GROUP
+    return _Group(name)
+
+
+# Enlaces que se consultan para nombrar los objetos etiquetados en uso al fallar
+_BINDINGS = (
+    (GL_TEXTURE, GL_TEXTURE_BINDING_2D),
+    (GL_TEXTURE, GL_TEXTURE_BINDING_2D_ARRAY),
+    (GL_BUFFER, GL_PIXEL_UNPACK_BUFFER_BINDING),
+    (GL_PROGRAM, GL_CURRENT_PROGRAM),
+    (GL_FRAMEBUFFER, GL_DRAW_FRAMEBUFFER_BINDING),
+)
+
+
+def _bound_labels():
+    """Etiquetas de los objetos enlazados ahora mismo (sin KHR_debug no hay otra pista)"""
+    bound = []
+    for kind, binding in _BINDINGS:
+        text = _labels.get((kind, int(glGetIntegerv(binding))))
+        if text is not None and text not in bound:
+            bound.append(text)
+    return ", ".join(bound) if bound else "-"
+
+
+def check(where=None):
+    """glGetError muestreado una vez cada sample_every llamadas (solo sin KHR_debug)"""
+    global _frames, errors
+    if _mode != 'sampled':
+        return
+    _frames += 1
+    if _frames % sample_every:
+        return
+    codes = []
+    err = glGetError()
+    while err != GL_NO_ERROR:
+        codes.append(err)
+        err = glGetError()
+    if not codes:
+        return
+    # Los errores ya están vaciados: las consultas de enlaces no los mezclan
+    bound = _bound_labels()
+    for err in codes:
+        errors += 1
+        print(f"GL error 0x{err:04X} en {where or _where()} con {bound} "
+              f"(muestreo cada {sample_every} frames)")
+
+
+def stats():
+    return {
+        'mode': MODE or 'release',
+        'checking': _mode,
+        'pyopengl_error_checking': OpenGL.ERROR_CHECKING,
+        'messages': messages,
+        'errors': errors,
+        'labels': len(_labels),
+    }
@@ -0,0 +1,110 @@
+import os
+import time
+from collections import Counter
+
+import glfw
+
+
+def _no_events():
+    pass
+
+
+class RenderGovernor:
+    """Decide cuándo dibujar un frame en lugar de redibujar sin parar.
+
+    Se dibuja solo si algo cambió (invalidate: entrada, resize, overlay) o si
+    vence un plazo pedido con schedule (próximo frame de video, tick del reloj).
+    Mientras tanto el hilo duerme en glfw.wait_events_timeout, que también
+    despierta con cualquier evento de la ventana. max_fps limita el ritmo.
+
+    Configuración por entorno:
+        CUBE_MAX_FPS=60     tope de frames por segundo (0 = sin tope)
+        CUBE_CONTINUOUS=1   dibuja siempre, como el bucle original
+    """
+
+    idle_timeout = 0.5  # segundos máximos dormido sin nada programado
+
+    def __init__(self, max_fps=None, continuous=None, events=True):
+        if max_fps is None:
+            max_fps = float(os.environ.get('CUBE_MAX_FPS', 60))
+        if continuous is None:
+            continuous = os.environ.get('CUBE_CONTINUOUS', '') not in ('', '0')
+        self.max_fps = max_fps
+        self.min_interval = 1.0 / max_fps if max_fps else 0.0
+        self.continuous = continuous
+        # Sin ventana (headless) no hay eventos: se duerme sin más
+        if events:
+            self._wait_events, self._poll_events = glfw.wait_events_timeout, glfw.poll_events
+        else:
+            self._wait_events, self._poll_events = time.sleep, _no_events
+        self._dirty = True  # el primer frame siempre se dibuja
+        self._deadline = None
+        self._deadline_reason = None
+        self._last_frame = float('-inf')
+        # Contadores
+        self.frames = 0
+        self.wakeups = 0
+        self.reasons = Counter()  # por qué se pidió cada redibujado
+
+    def invalidate(self, reason='input'):
+        """Algo visible cambió: dibujar en cuanto lo permita max_fps"""
+        self._dirty = True
+        self.reasons[reason] += 1
+
+    def schedule(self, when, reason='timer'):
+        """Dibujar no más tarde que when (time.monotonic)"""
+        if self._deadline is None or when < self._deadline:
+            self._deadline = when
+            self._deadline_reason = reason
+
+    def schedule_in(self, delay, reason='timer'):
+        if delay is not None:
+            self.schedule(time.monotonic() + max(delay, 0.0), reason)
+
+    def _next_frame_at(self, now):
+        earliest = self._last_frame + self.min_interval
+        if self.continuous or self._dirty:
+            return earliest
+        if self._deadline is not None:
+            return max(self._deadline, earliest)
+        return now + self.idle_timeout
+
+    def wait(self):
+        """Duerme hasta el próximo frame procesando los eventos que lo despierten.
+
+        Devuelve True si hay que dibujar ahora; con False el llamador solo
+        vuelve a comprobar si la ventana se cerró y llama otra vez. Si ya es
+        hora de dibujar no procesa nada: los eventos pendientes quedan para
+        poll_events(), que el bucle llama dentro del frame (scope poll_events
+        del profiler).
+        """
+        self.wakeups += 1
+        now = time.monotonic()
+        timeout = self._next_frame_at(now) - now
+        if timeout > 0:
+            self._wait_events(min(timeout, self.idle_timeout))
+        # Los callbacks de los eventos pueden haber invalidado el frame
+        return time.monotonic() >= self._next_frame_at(now) - 0.001 and (
+            self.continuous or self._dirty or self._deadline is not None)
+
+    def poll_events(self):
+        """Procesa los eventos pendientes sin esperar"""
+        self._poll_events()
+
+    def frame_done(self):
+        """Llamar después de cada swap; los plazos se vuelven a programar a partir de aquí"""
+        if not self._dirty and self._deadline is not None:
+            self.reasons[self._deadline_reason] += 1
+        self._last_frame = time.monotonic()
+        self._dirty = False
+        self._deadline = None
+        self.frames += 1
+
+    def stats(self):
+        return {
+            'max_fps': self.max_fps,
+            'continuous': self.continuous,
+            'frames': self.frames,
+            'wakeups': self.wakeups,
+            'reasons': dict(self.reasons),
+        }
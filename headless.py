@@ -0,0 +1,119 @@
+"""Contextos OpenGL sin ventana visible, para benchmarks y CI.
+
+Backends:
+    'glfw' -> ventana GLFW invisible (necesita un servidor gráfico)
+    'egl'  -> contexto EGL sin superficie de pantalla (pbuffer), por ejemplo con
+              Mesa llvmpipe en una máquina sin display
+
+PyOpenGL elige la plataforma (GLX o EGL) al importar OpenGL.GL por primera vez,
+así que hay que importar este módulo (o definir PYOPENGL_PLATFORM=egl) antes que
+cualquier otro que use GL. Con CUBE_HEADLESS=egl se hace automáticamente.
+"""
+import ctypes
+import os
+
+
+def use_backend(backend):
+    """Prepara PyOpenGL para el backend; hay que llamarla antes de importar OpenGL.GL"""
+    os.environ['CUBE_HEADLESS'] = backend
+    if backend == 'egl':
+        os.environ.setdefault('PYOPENGL_PLATFORM', 'egl')
+        os.environ.setdefault('EGL_PLATFORM', 'surfaceless')
+
+
+if os.environ.get('CUBE_HEADLESS') == 'egl':
+    use_backend('egl')
+
+
+def default_backend():
+    if os.environ.get('CUBE_HEADLESS'):
+        return os.environ['CUBE_HEADLESS']
+    if os.environ.get('DISPLAY') or os.environ.get('WAYLAND_DISPLAY'):
+        return 'glfw'
+    return 'egl'
+
+
+class HiddenWindowContext:
+    """Ventana GLFW que nunca se muestra; el framebuffer por defecto sigue existiendo"""
+
+    backend = 'glfw'
+
+    def __init__(self, width, height):
+        import glfw
+        self._glfw = glfw
+        if not glfw.init():
+            raise RuntimeError("No se pudo inicializar GLFW")
+        glfw.window_hint(glfw.VISIBLE, glfw.FALSE)
+        self.window = glfw.create_window(width, height, "headless", None, None)
+        if not self.window:
+            glfw.terminate()
+            raise RuntimeError("No se pudo crear la ventana invisible")
+        self.make_current()
+        glfw.swap_interval(0)  # sin vsync: se mide el tiempo real de cada frame
+
+    def make_current(self):
+        self._glfw.make_context_current(self.window)
+
+    def swap(self):
+        self._glfw.swap_buffers(self.window)
+
+    def release(self):
+        self._glfw.destroy_window(self.window)
+        self._glfw.terminate()
+
+
+class EGLContext:
+    """Contexto OpenGL (perfil de compatibilidad) sobre un pbuffer EGL"""
+
+    backend = 'egl'
+    window = None
+
+    def __init__(self, width, height):
+        from OpenGL import EGL, platform
+        if type(platform.PLATFORM).__name__ != 'EGLPlatform':
+            raise RuntimeError("PyOpenGL no usa EGL: definir CUBE_HEADLESS=egl o "
+                               "PYOPENGL_PLATFORM=egl antes de importar OpenGL")
+        self._egl = EGL
+        self.display = EGL.eglGetDisplay(EGL.EGL_DEFAULT_DISPLAY)
+        major, minor = EGL.EGLint(), EGL.EGLint()
+        if not EGL.eglInitialize(self.display, ctypes.pointer(major), ctypes.pointer(minor)):
+            raise RuntimeError("No se pudo inicializar EGL")
+        attribs = (EGL.EGLint * 13)(
+            EGL.EGL_SURFACE_TYPE, EGL.EGL_PBUFFER_BIT,
+            EGL.EGL_RENDERABLE_TYPE, EGL.EGL_OPENGL_BIT,
+            EGL.EGL_RED_SIZE, 8, EGL.EGL_GREEN_SIZE, 8, EGL.EGL_BLUE_SIZE, 8,
+            EGL.EGL_DEPTH_SIZE, 24,
+            EGL.EGL_NONE,
+        )
+        config, count = EGL.EGLConfig(), EGL.EGLint()
+        if not EGL.eglChooseConfig(self.display, attribs, ctypes.pointer(config), 1,
+                                   ctypes.pointer(count)) or count.value == 0:
+            raise RuntimeError("No hay una configuración EGL con pbuffer y OpenGL")
+        EGL.eglBindAPI(EGL.EGL_OPENGL_API)
+        self.context = EGL.eglCreateContext(self.display, config, EGL.EGL_NO_CONTEXT,
+                                            (EGL.EGLint * 1)(EGL.EGL_NONE))
+        size = (EGL.EGLint * 5)(EGL.EGL_WIDTH, width, EGL.EGL_HEIGHT, height, EGL.EGL_NONE)
+        self.surface = EGL.eglCreatePbufferSurface(self.display, config, size)
+        self.make_current()
+
+    def make_current(self):
+        self._egl.eglMakeCurrent(self.display, self.surface, self.surface, self.context)
+
+    def swap(self):
+        self._egl.eglSwapBuffers(self.display, self.surface)
+
+    def release(self):
+        EGL = self._egl
+        EGL.eglMakeCurrent(self.display, EGL.EGL_NO_SURFACE, EGL.EGL_NO_SURFACE, EGL.EGL_NO_CONTEXT)
+        EGL.eglDestroySurface(self.display, self.surface)
+        EGL.eglDestroyContext(self.display, self.context)
+        EGL.eglTerminate(self.display)
+
+
+def create_context(width, height, backend=None):
+    backend = backend or default_backend()
+    if backend == 'glfw':
+        return HiddenWindowContext(width, height)
+    if backend == 'egl':
+        return EGLContext(width, height)
+    raise ValueError(f"Backend headless desconocido: {backend}")
@@ -0,0 +1,280 @@
+import ctypes
+from collections import deque
+
+import numpy as np
+from OpenGL.GL import *
+
+import gldebug
+from renderer import compile_program
+from transforms import to_gl
+
+NOTHING, FACE, VERTEX = 0, 1, 2  # Pick.kind
+
+# Cada píxel del buffer es (tipo, número, u, v): caras con la uv interpolada y
+# encima los puntos de los vértices, redondos y del radio de picking
+ID_VERTEX_SHADER = """
+#version 330 core
+layout(location = 0) in vec3 a_position;
+layout(location = 1) in vec3 a_id;        // u, v y número de cara (o de vértice en los puntos)
+uniform mat4 u_mvp;
+uniform float u_point_size;
+out vec2 v_uv;
+flat out float v_index;
+void main() {
+    v_uv = a_id.xy;
+    v_index = a_id.z;
+    gl_Position = u_mvp * vec4(a_position, 1.0);
+    gl_PointSize = u_point_size;
+}
+"""
+
+ID_FRAGMENT_SHADER = """
+#version 330 core
+in vec2 v_uv;
+flat in float v_index;
+uniform float u_kind;                     // 1 caras, 2 vértices
+out vec4 frag_id;
+void main() {
+    if (u_kind > 1.5) {
+        // Con la profundidad según la distancia al centro gana el vértice más cercano al cursor
+        float d = length(gl_PointCoord - vec2(0.5)) * 2.0;
+        if (d > 1.0) {
+            discard;
+        }
+        gl_FragDepth = d;
+        frag_id = vec4(u_kind, v_index, 0.0, 0.0);
+    } else {
+        gl_FragDepth = gl_FragCoord.z;
+        frag_id = vec4(u_kind, v_index, v_uv);
+    }
+}
+"""
+
+
+class Pick:
+    """Lo que hay bajo un píxel: kind NOTHING, FACE (index = cara, u, v en [0, 1]) o VERTEX"""
+
+    __slots__ = ('kind', 'index', 'u', 'v')
+
+    def __init__(self, kind=NOTHING, index=-1, u=0.0, v=0.0):
+        self.kind = kind
+        self.index = index
+        self.u = u
+        self.v = v
+
+    def __repr__(self):
+        return f"Pick(kind={self.kind}, index={self.index}, u={self.u:.4f}, v={self.v:.4f})"
+
+
+class IdBuffer:
+    """Picking en la GPU: un framebuffer fuera de pantalla donde cada píxel dice
+    qué cara (con su uv exacta) o qué vértice hay debajo.
+
+    Se dibuja solo cuando hace falta (update() antes de cada pedido y solo si
+    cambiaron los vértices, las matrices o el viewport), así que no cuesta nada
+    en los frames sin eventos de entrada. request() copia un píxel a un PBO con
+    un fence y poll() entrega los resultados cuando la GPU terminó, sin esperar.
+    """
+
+    def __init__(self, handle_radius=15, max_pending=4):
+        self.handle_radius = handle_radius
+        self.program = compile_program(ID_VERTEX_SHADER, ID_FRAGMENT_SHADER)
+        self.u_mvp = glGetUniformLocation(self.program, "u_mvp")
+        self.u_point_size = glGetUniformLocation(self.program, "u_point_size")
+        self.u_kind = glGetUniformLocation(self.program, "u_kind")
+        self.vao = glGenVertexArrays(1)
+        self.vbo, self.ibo = glGenBuffers(2)
+        glBindVertexArray(self.vao)
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        glEnableVertexAttribArray(0)
+        glVertexAttribPointer(0, 3, GL_FLOAT, GL_FALSE, 24, ctypes.c_void_p(0))
+        glEnableVertexAttribArray(1)
+        glVertexAttribPointer(1, 3, GL_FLOAT, GL_FALSE, 24, ctypes.c_void_p(12))
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.ibo)
+        glBindVertexArray(0)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        self.fbo = None
+        self.renderbuffers = []
+        self.size = None
+        self._face_indices = 0
+        self._points = (0, 0)  # primer vértice y cantidad de puntos
+        self._key = None
+        self._free = list(glGenBuffers(max_pending))
+        for pbo in self._free:
+            glBindBuffer(GL_PIXEL_PACK_BUFFER, pbo)
+            glBufferData(GL_PIXEL_PACK_BUFFER, 16, None, GL_STREAM_READ)
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, 0)
+        self._pending = deque()  # (pbo, fence, tag) en el orden de los pedidos
+        self._ready = []
+        gldebug.label(GL_PROGRAM, self.program, "id buffer")
+        # Contadores
+        self.renders = 0
+        self.requests = 0
+        self.stalls = 0  # pedidos que tuvieron que esperar a la GPU porque no quedaban PBOs
+
+    def _resize(self, width, height):
+        self._release_framebuffer()
+        self.fbo = glGenFramebuffers(1)
+        self.renderbuffers = list(glGenRenderbuffers(2))
+        glBindFramebuffer(GL_FRAMEBUFFER, self.fbo)
+        for rb, fmt, attachment in zip(self.renderbuffers, (GL_RGBA32F, GL_DEPTH_COMPONENT24),
+                                       (GL_COLOR_ATTACHMENT0, GL_DEPTH_ATTACHMENT)):
+            glBindRenderbuffer(GL_RENDERBUFFER, rb)
+            glRenderbufferStorage(GL_RENDERBUFFER, fmt, width, height)
+            glFramebufferRenderbuffer(GL_FRAMEBUFFER, attachment, GL_RENDERBUFFER, rb)
+        status = glCheckFramebufferStatus(GL_FRAMEBUFFER)
+        glBindRenderbuffer(GL_RENDERBUFFER, 0)
+        glBindFramebuffer(GL_FRAMEBUFFER, 0)
+        if status != GL_FRAMEBUFFER_COMPLETE:
+            raise RuntimeError(f"Framebuffer de picking incompleto: 0x{int(status):x}")
+        gldebug.label(GL_FRAMEBUFFER, self.fbo, "id buffer")
+        self.size = (width, height)
+
+    def _upload(self, faces, points):
+        positions, ids, indices = [], [], []
+        first = 0
+        for index, mesh in faces:
+            n = len(mesh.positions)
+            positions.append(mesh.positions)
+            ids.append(np.hstack([mesh.texcoords, np.full((n, 1), index, dtype=np.float32)]))
+            indices.append(np.asarray(mesh.indices, dtype=np.uint32) + np.uint32(first))
+            first += n
+        points = np.asarray(points, dtype=np.float32)
+        positions.append(points)
+        ids.append(np.column_stack([np.zeros((len(points), 2)), np.arange(len(points))]))
+        data = np.ascontiguousarray(np.hstack([np.concatenate(positions), np.concatenate(ids)]),
+                                    dtype=np.float32)
+        indices = np.concatenate(indices) if indices else np.empty(0, dtype=np.uint32)
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        glBufferData(GL_ARRAY_BUFFER, data.nbytes, data, GL_DYNAMIC_DRAW)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        glBindVertexArray(self.vao)
+        glBufferData(GL_ELEMENT_ARRAY_BUFFER, indices.nbytes, indices, GL_DYNAMIC_DRAW)
+        glBindVertexArray(0)
+        self._face_indices = len(indices)
+        self._points = (first, len(points))
+
+    def update(self, faces, points, mvp, viewport, version=None):
+        """Vuelve a dibujar el buffer si cambió la escena; faces = [(número, malla con
+        positions/texcoords/indices)], points = posiciones de los vértices seleccionables.
+
+        Con version (que cambia con cada movimiento de vértices) no se compara la
+        geometría; sin ella se dibuja siempre. Devuelve True si dibujó.
+        """
+        key = (version, tuple(np.asarray(mvp).ravel()), tuple(viewport), tuple(i for i, _ in faces))
+        if version is not None and key == self._key:
+            return False
+        vx, vy, width, height = viewport
+        if self.size != (width, height):
+            self._resize(width, height)
+        with gldebug.group("id buffer"):
+            self._upload(faces, points)
+            glBindFramebuffer(GL_FRAMEBUFFER, self.fbo)
+            glViewport(0, 0, width, height)
+            glClearBufferfv(GL_COLOR, 0, np.zeros(4, dtype=np.float32))
+            glClearBufferfv(GL_DEPTH, 0, np.ones(1, dtype=np.float32))
+            glEnable(GL_DEPTH_TEST)
+            glUseProgram(self.program)
+            glUniformMatrix4fv(self.u_mvp, 1, GL_FALSE, to_gl(mvp))
+            glUniform1f(self.u_point_size, 2.0 * self.handle_radius)
+            glBindVertexArray(self.vao)
+            glUniform1f(self.u_kind, FACE)
+            glDrawElements(GL_TRIANGLES, self._face_indices, GL_UNSIGNED_INT, ctypes.c_void_p(0))
+            # Los vértices van encima de las caras, como en VertexPicker
+            glClearBufferfv(GL_DEPTH, 0, np.ones(1, dtype=np.float32))
+            glEnable(GL_PROGRAM_POINT_SIZE)
+            glUniform1f(self.u_kind, VERTEX)
+            glDrawArrays(GL_POINTS, *self._points)
+            glDisable(GL_PROGRAM_POINT_SIZE)
+            glBindVertexArray(0)
+            glUseProgram(0)
+            glBindFramebuffer(GL_FRAMEBUFFER, 0)
+            glViewport(vx, vy, width, height)
+        self._key = key
+        self.renders += 1
+        return True
+
+    def request(self, x, y, tag=None):
+        """Pide lo que hay en el píxel (x, y) (origen abajo a la izquierda) del último
+        update(); el resultado sale en un poll() posterior junto con tag"""
+        self.requests += 1
+        x, y = int(x), int(y)
+        if self.size is None or not (0 <= x < self.size[0] and 0 <= y < self.size[1]):
+            # Sin lectura, pero en la cola para salir en orden con los anteriores
+            self._pending.append((None, None, tag))
+            return
+        if not self._free:
+            self.stalls += 1
+            while not self._free:
+                self._ready.append(self._complete(*self._pending.popleft()))
+        pbo = self._free.pop()
+        glBindFramebuffer(GL_READ_FRAMEBUFFER, self.fbo)
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, pbo)
+        glReadPixels(x, y, 1, 1, GL_RGBA, GL_FLOAT, ctypes.c_void_p(0))
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, 0)
+        glBindFramebuffer(GL_READ_FRAMEBUFFER, 0)
+        fence = glFenceSync(GL_SYNC_GPU_COMMANDS_COMPLETE, 0)
+        self._pending.append((pbo, fence, tag))
+
+    def _complete(self, pbo, fence, tag):
+        if fence is None:
+            return tag, Pick()  # pedido fuera del buffer
+        # Sin timeout espera solo si hace falta (un pedido con todos los PBOs ocupados)
+        glClientWaitSync(fence, GL_SYNC_FLUSH_COMMANDS_BIT, 1_000_000_000)
+        glDeleteSync(fence)
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, pbo)
+        value = np.zeros(4, dtype=np.float32)
+        ptr = glMapBufferRange(GL_PIXEL_PACK_BUFFER, 0, 16, GL_MAP_READ_BIT)
+        if ptr:
+            ctypes.memmove(value.ctypes.data, ptr, 16)
+            glUnmapBuffer(GL_PIXEL_PACK_BUFFER)
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, 0)
+        self._free.append(pbo)
+        kind = int(round(float(value[0])))
+        if kind == NOTHING:
+            return tag, Pick()
+        return tag, Pick(kind, int(round(float(value[1]))), float(value[2]), float(value[3]))
+
+    @property
+    def pending(self):
+        return len(self._pending) + len(self._ready)
+
+    def poll(self):
+        """[(tag, Pick)] de los pedidos que ya terminaron, en el orden en que se hicieron"""
+        ready, self._ready = self._ready, []
+        while self._pending:
+            fence = self._pending[0][1]
+            if fence is not None and glClientWaitSync(fence, GL_SYNC_FLUSH_COMMANDS_BIT, 0) \
+                    not in (GL_ALREADY_SIGNALED, GL_CONDITION_SATISFIED):
+                break
+            ready.append(self._complete(*self._pending.popleft()))
+        return ready
+
+    def stats(self):
+        return {
+            'renders': self.renders,
+            'requests': self.requests,
+            'pending': self.pending,
+            'stalls': self.stalls,
+        }
+
+    def _release_framebuffer(self):
+        if self.fbo is not None:
+            glDeleteFramebuffers(1, [self.fbo])
+            glDeleteRenderbuffers(len(self.renderbuffers), self.renderbuffers)
+            self.fbo = None
+            self.renderbuffers = []
+            self.size = None
+
+    def release(self):
+        for pbo, fence, _ in self._pending:
+            if fence is not None:
+                glDeleteSync(fence)
+                self._free.append(pbo)
+        self._pending.clear()
+        glDeleteBuffers(len(self._free), self._free)
+        self._free = []
+        self._release_framebuffer()
+        glDeleteBuffers(2, [self.vbo, self.ibo])
+        glDeleteVertexArrays(1, [self.vao])
+        glDeleteProgram(self.program)
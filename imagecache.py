@@ -0,0 +1,95 @@
+import os
+import threading
+from collections import OrderedDict
+
+import cv2
+
+
+class ImageAsset:
+    """Imagen decodificada (alto, ancho, 3) RGB; key identifica el archivo y su versión"""
+
+    def __init__(self, key, pixels):
+        self.key = key
+        self.path = key[0]
+        self.pixels = pixels
+
+    @property
+    def nbytes(self):
+        return self.pixels.nbytes
+
+
+class ImageCache:
+    """Caché LRU de imágenes fijas decodificadas, compartida por todo el proceso.
+
+    Las claves son (ruta absoluta, mtime, flip): si el archivo cambia en disco
+    la clave cambia y se vuelve a decodificar; mientras tanto get() solo hace
+    un stat. Las capas recuerdan qué clave tienen subida (FaceLayer.upload_asset)
+    y no vuelven a subir la misma imagen.
+    """
+
+    def __init__(self, budget=64 * 1024 * 1024):
+        self.budget = budget
+        self._images = OrderedDict()
+        self._lock = threading.Lock()
+        self.nbytes = 0
+        # Contadores
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, path, flip=True):
+        """Imagen RGB (invertida verticalmente para OpenGL si flip); ValueError si no se puede leer"""
+        path = os.path.abspath(path)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            raise ValueError(f"No se pudo cargar la imagen: {path}")
+        key = (path, mtime, flip)
+        with self._lock:
+            asset = self._images.get(key)
+            if asset is not None:
+                self._images.move_to_end(key)
+                self.hits += 1
+                return asset
+            self.misses += 1
+        img = cv2.imread(path)
+        if img is None:
+            raise ValueError(f"No se pudo cargar la imagen: {path}")
+        if flip:
+            img = cv2.flip(img, 0)
+        asset = ImageAsset(key, cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
+        self._put(asset)
+        return asset
+
+    def _put(self, asset):
+        path, _, flip = asset.key
+        with self._lock:
+            # Las versiones anteriores del mismo archivo ya no se van a pedir
+            for key in [k for k in self._images if k[0] == path and k[2] == flip]:
+                self.nbytes -= self._images.pop(key).nbytes
+            if asset.nbytes > self.budget:
+                return
+            self._images[asset.key] = asset
+            self.nbytes += asset.nbytes
+            while self.nbytes > self.budget:
+                _, evicted = self._images.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._images.clear()
+            self.nbytes = 0
+
+    def stats(self):
+        return {
+            'images': len(self._images),
+            'bytes': self.nbytes,
+            'budget': self.budget,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+
+image_cache = ImageCache()
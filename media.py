@@ -0,0 +1,136 @@
+import os
+import threading
+
+import numpy as np
+from ffpyplayer.player import MediaPlayer
+
+
+def image_to_rgb(img):
+    """Array (h, w, 3) de un ffpyplayer.pic.Image rgb24, sin copia cuando el relleno lo permite"""
+    w, h = img.get_size()
+    linesize = img.get_linesizes(keep_align=True)[0]
+    if linesize % 3 == 0:
+        buf = img.to_memoryview(keep_align=True)[0]
+        rows = np.frombuffer(buf, dtype=np.uint8, count=linesize * h).reshape(h, linesize // 3, 3)
+        return rows[:, :w] if linesize // 3 != w else rows
+    return np.frombuffer(img.to_bytearray()[0], dtype=np.uint8).reshape(h, w, 3)
+
+
+class MediaSource:
+    """Un archivo abierto una sola vez: el mismo MediaPlayer reproduce el audio y
+    entrega los frames de video para la textura.
+
+    ffpyplayer entrega los frames en cuanto se los pide; read_frame() los devuelve
+    como (pts, imagen) y la presentación la decide el reloj maestro. Al volver al
+    principio el pts sigue creciendo para que el reloj no retroceda.
+
+    seek() puede llamarse desde otro hilo que read_frame(): el estado del pts se
+    cambia bajo un lock y los frames que ffpyplayer ya tenía decodificados de
+    antes del seek (a más de seek_tolerance del destino) se descartan para que
+    no se confundan con una vuelta al principio.
+    """
+
+    seek_tolerance = 1.0  # segundos
+
+    def __init__(self, path, yuv=False, loop=True, paused=False, audio=True):
+        # ffpyplayer no falla con un archivo que no existe: solo nunca entrega frames
+        if not os.path.isfile(path):
+            raise ValueError(f"No se pudo abrir el video: {path}")
+        self.path = path
+        self.yuv = yuv
+        self.paused = paused
+        ff_opts = {
+            'out_fmt': 'yuv420p' if yuv else 'rgb24',
+            'loop': 0 if loop else 1,
+            'paused': paused,
+        }
+        if not audio:
+            ff_opts['an'] = True  # solo video (por ejemplo en los procesos de decodepool.py)
+        self.player = MediaPlayer(path, ff_opts=ff_opts)
+        self.eof = False
+        self.loops = 0  # veces que volvió al principio
+        self.started = False  # get_pts() de ffpyplayer falla antes de abrir los streams
+        self._pts_offset = 0.0
+        self._raw_pts = 0.0
+        self._last_pts = 0.0
+        self._audio_offset = 0.0
+        self._audio_raw = 0.0
+        self._seek_raw = None  # destino del último seek hasta recibir un frame de después
+        self._lock = threading.Lock()
+
+    @property
+    def metadata(self):
+        return self.player.get_metadata()
+
+    @property
+    def fps(self):
+        num, den = self.metadata.get('frame_rate') or (0, 0)
+        return num / den if num and den else 30.0
+
+    @property
+    def duration(self):
+        return self.metadata.get('duration')
+
+    def read_frame(self):
+        """(pts, imagen) del siguiente frame decodificado o None si todavía no hay"""
+        frame, val = self.player.get_frame()
+        if val == 'eof':
+            self.eof = True
+            return None
+        if frame is None:
+            return None
+        img, pts = frame
+        self.started = True
+        with self._lock:
+            if self._seek_raw is not None:
+                if abs(pts - self._seek_raw) > self.seek_tolerance:
+                    return None  # decodificado antes del seek
+                self._seek_raw = None
+            if pts < self._raw_pts - 0.01:
+                # Los frames salen en orden de presentación: si el pts retrocede, volvió al principio
+                self._pts_offset = self._last_pts + 1.0 / self.fps - pts
+                self.loops += 1
+            self._raw_pts = pts
+            self._last_pts = self._pts_offset + pts
+            return self._last_pts, img
+
+    def get_pts(self):
+        """Posición del reloj de audio, también creciente entre vueltas (None antes del primer frame)"""
+        if not self.started:
+            return None
+        pts = self.player.get_pts()
+        if pts < self._audio_raw - 0.01:
+            self._audio_offset += self._audio_raw
+        self._audio_raw = pts
+        return self._audio_offset + pts
+
+    def set_pause(self, paused):
+        self.player.set_pause(paused)
+        self.paused = paused
+
+    def seek(self, t):
+        """t en la línea de tiempo creciente de read_frame() y get_pts(): con loop
+        puede pasar de la duración y se busca la misma posición dentro del archivo"""
+        duration = self.duration
+        raw = t % duration if duration else t
+        with self._lock:
+            self.player.seek(raw, relative=False)
+            self._pts_offset = t - raw
+            self._raw_pts = 0.0
+            self._last_pts = t
+            self._seek_raw = raw
+            self._audio_offset = t - raw
+            self._audio_raw = 0.0
+
+    def set_size(self, width, height):
+        """Tamaño de los frames que entrega ffpyplayer (escala en su hilo de conversión);
+        (0, 0) vuelve al tamaño original. Cambia a partir de uno o dos frames"""
+        self.player.set_size(width, height)
+
+    def set_volume(self, volume):
+        self.player.set_volume(volume)
+
+    def close(self):
+        if self.player is not None:
+            self.player.close_player()
+            self.player = None
@@ -0,0 +1,60 @@
+import numpy as np
+
+
+def falloff(distance_sq, radius):
+    """Peso del pincel a partir de la distancia al cuadrado: 1 en el centro, 0 desde el radio"""
+    t2 = np.minimum(distance_sq / np.float32(radius * radius), np.float32(1.0))
+    return (1.0 - t2) ** 2
+
+
+class FaceMesh:
+    """Cara del cubo subdividida en N×N celdas, en arrays float32 contiguos.
+
+    Las posiciones se generan interpolando bilinealmente las 4 esquinas en el
+    orden de coordenadas de textura (0,0), (1,0), (1,1), (0,1).
+    """
+
+    def __init__(self, corners, subdivisions=1):
+        if subdivisions < 1:
+            raise ValueError("La subdivisión debe ser al menos 1")
+        self.subdivisions = n = subdivisions
+        corners = np.asarray(corners, dtype=np.float32)
+
+        s = np.linspace(0.0, 1.0, n + 1, dtype=np.float32)
+        u, v = np.meshgrid(s, s)  # filas = v, columnas = u
+        u = u.reshape(-1, 1)
+        v = v.reshape(-1, 1)
+        c0, c1, c2, c3 = corners
+        self.positions = np.ascontiguousarray(
+            (1 - u) * (1 - v) * c0 + u * (1 - v) * c1 + u * v * c2 + (1 - u) * v * c3,
+            dtype=np.float32)
+        self.texcoords = np.ascontiguousarray(np.hstack([u, v]), dtype=np.float32)
+
+        # Dos triángulos por celda
+        row = np.arange(n, dtype=np.uint32)
+        i, j = np.meshgrid(row, row)  # i = columna, j = fila
+        a = (j * (n + 1) + i).reshape(-1)
+        b = a + 1
+        c = a + n + 2
+        d = a + n + 1
+        self.indices = np.ascontiguousarray(
+            np.stack([a, b, c, a, c, d], axis=1).reshape(-1), dtype=np.uint32)
+        self.version = 0
+
+    @property
+    def corner_indices(self):
+        n = self.subdivisions
+        return [0, n, (n + 1) * (n + 1) - 1, n * (n + 1)]
+
+    def deform(self, center, delta, radius):
+        """Desplaza los vértices alrededor de center con un pincel de caída suave"""
+        center = np.asarray(center, dtype=np.float32)
+        delta = np.asarray(delta, dtype=np.float32)
+        offset = self.positions - center
+        distance_sq = np.einsum('ij,ij->i', offset, offset)
+        # Solo se tocan los vértices dentro del radio del pincel
+        inside = np.flatnonzero(distance_sq < radius * radius)
+        if len(inside):
+            weights = falloff(distance_sq[inside], radius)
+            self.positions[inside] += weights[:, None] * delta
+        self.version += 1
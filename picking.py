@@ -0,0 +1,158 @@
+import numpy as np
+
+
+def project_points(points, mvp, viewport):
+    """Proyecta todos los puntos (N, 3) a coordenadas de ventana con una sola multiplicación.
+
+    Devuelve (ventana, visibles): ventana es (N, 3) con x, y (origen abajo a la
+    izquierda, como en OpenGL) y profundidad en [0, 1]; visibles marca los puntos
+    delante de la cámara.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    clip = points @ mvp[:3, :3].T + mvp[:3, 3]
+    w = points @ mvp[3, :3] + mvp[3, 3]
+    in_front = w > 1e-9
+    safe_w = np.where(in_front, w, 1.0)
+    ndc = clip / safe_w[:, None]
+    vx, vy, vw, vh = viewport
+    window = np.empty_like(ndc)
+    window[:, 0] = vx + (ndc[:, 0] + 1.0) * 0.5 * vw
+    window[:, 1] = vy + (ndc[:, 1] + 1.0) * 0.5 * vh
+    window[:, 2] = (ndc[:, 2] + 1.0) * 0.5
+    return window, in_front
+
+
+def unproject_point(x, y, depth, inverse_mvp, viewport):
+    """Inversa de project_points para un punto en coordenadas de ventana"""
+    vx, vy, vw, vh = viewport
+    ndc = np.array([
+        (x - vx) / vw * 2.0 - 1.0,
+        (y - vy) / vh * 2.0 - 1.0,
+        depth * 2.0 - 1.0,
+        1.0,
+    ])
+    world = inverse_mvp @ ndc
+    return world[:3] / world[3]
+
+
+class ScreenGrid:
+    """Índice espacial de puntos en pantalla: celdas fijas con los puntos ordenados por celda.
+
+    Con bounds (x0, y0, x1, y1) solo se indexan los puntos dentro de ese
+    rectángulo: un vértice con w apenas positivo se proyecta a coordenadas
+    enormes y la cantidad de columnas desbordaría las claves de int64.
+    """
+
+    def __init__(self, positions, valid, cell_size=32, bounds=None):
+        self.cell_size = float(cell_size)
+        self.positions = positions
+        if bounds is not None:
+            x0, y0, x1, y1 = bounds
+            valid = (valid & (positions[:, 0] >= x0) & (positions[:, 0] <= x1)
+                     & (positions[:, 1] >= y0) & (positions[:, 1] <= y1))
+        idx = np.flatnonzero(valid)
+        cells = np.floor(positions[idx] / self.cell_size).astype(np.int64)
+        self.origin = cells.min(axis=0) if len(idx) else np.zeros(2, dtype=np.int64)
+        cells -= self.origin
+        self.cols = int(cells[:, 0].max()) + 1 if len(idx) else 1
+        self.rows = int(cells[:, 1].max()) + 1 if len(idx) else 1
+        keys = cells[:, 1] * self.cols + cells[:, 0]
+        order = np.argsort(keys, kind='stable')
+        self.keys = keys[order]
+        self.indices = idx[order]
+
+    def _cell(self, x, y):
+        c = np.floor(np.array([x, y]) / self.cell_size).astype(np.int64) - self.origin
+        return int(c[0]), int(c[1])
+
+    def candidates(self, x0, y0, x1, y1):
+        """Índices de los puntos en las celdas que tocan el rectángulo"""
+        cx0, cy0 = self._cell(min(x0, x1), min(y0, y1))
+        cx1, cy1 = self._cell(max(x0, x1), max(y0, y1))
+        cx0, cy0 = max(cx0, 0), max(cy0, 0)
+        cx1, cy1 = min(cx1, self.cols - 1), min(cy1, self.rows - 1)
+        if cx0 > cx1 or cy0 > cy1:
+            return np.empty(0, dtype=np.int64)
+        # Cada fila de celdas es un rango contiguo de claves
+        rows = np.arange(cy0, cy1 + 1, dtype=np.int64) * self.cols
+        starts = np.searchsorted(self.keys, rows + cx0, side='left')
+        ends = np.searchsorted(self.keys, rows + cx1, side='right')
+        parts = [self.indices[s:e] for s, e in zip(starts, ends) if e > s]
+        if not parts:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(parts)
+
+
+def points_in_polygon(points, polygon):
+    """Test par-impar vectorizado sobre todos los puntos (bucle solo sobre las aristas)"""
+    polygon = np.asarray(polygon, dtype=np.float64)
+    x, y = points[:, 0], points[:, 1]
+    inside = np.zeros(len(points), dtype=bool)
+    xj, yj = polygon[-1]
+    for xi, yi in polygon:
+        crosses = (yi > y) != (yj > y)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            x_cross = (xj - xi) * (y - yi) / (yj - yi) + xi
+        inside ^= crosses & (x < x_cross)
+        xj, yj = xi, yi
+    return inside
+
+
+class VertexPicker:
+    """Picking de vértices en pantalla con proyección vectorizada y un índice por celdas.
+
+    La proyección y el índice se recalculan solo cuando cambian las matrices,
+    el viewport o la versión de los vértices.
+    """
+
+    def __init__(self, cell_size=32, margin=32):
+        self.cell_size = cell_size
+        self.margin = margin  # píxeles fuera del viewport que se indexan (más que el umbral de nearest)
+        self._key = None
+        self.window = None
+        self.valid = None
+        self.viewport = None
+        self._grid = None
+
+    def update(self, points, mvp, viewport, version=None):
+        key = (version, tuple(np.asarray(mvp).ravel()), tuple(viewport), len(points))
+        if version is not None and key == self._key:
+            return
+        self.window, self.valid = project_points(points, mvp, viewport)
+        self.viewport = viewport
+        self._grid = None
+        self._key = key
+
+    @property
+    def grid(self):
+        if self._grid is None:
+            vx, vy, vw, vh = self.viewport
+            m = self.margin
+            self._grid = ScreenGrid(self.window[:, :2], self.valid, self.cell_size,
+                                    (vx - m, vy - m, vx + vw + m, vy + vh + m))
+        return self._grid
+
+    def nearest(self, x, y, threshold=15):
+        """Vértice más cercano a (x, y) (origen abajo a la izquierda) dentro del umbral"""
+        cand = self.grid.candidates(x - threshold, y - threshold, x + threshold, y + threshold)
+        if len(cand) == 0:
+            return None
+        d = np.hypot(self.window[cand, 0] - x, self.window[cand, 1] - y)
+        best = int(np.argmin(d))
+        if d[best] >= threshold:
+            return None
+        return int(cand[best])
+
+    def select_box(self, x0, y0, x1, y1):
+        cand = self.grid.candidates(x0, y0, x1, y1)
+        p = self.window[cand]
+        inside = ((p[:, 0] >= min(x0, x1)) & (p[:, 0] <= max(x0, x1))
+                  & (p[:, 1] >= min(y0, y1)) & (p[:, 1] <= max(y0, y1)))
+        return np.sort(cand[inside])
+
+    def select_lasso(self, polygon):
+        polygon = np.asarray(polygon, dtype=np.float64)
+        (x0, y0), (x1, y1) = polygon.min(axis=0), polygon.max(axis=0)
+        cand = self.grid.candidates(x0, y0, x1, y1)
+        inside = points_in_polygon(self.window[cand, :2], polygon)
+        return np.sort(cand[inside])
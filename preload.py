@@ -0,0 +1,93 @@
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from media import MediaSource
+
+
+class SourcePreloader:
+    """Abre en segundo plano las fuentes que probablemente se muestren después.
+
+    Cada fuente queda en espera: abierta, con los streams analizados y en pausa
+    (ffpyplayer ya decodifica los primeros frames en su cola interna). take()
+    entrega la fuente lista sin bloquear el hilo de GLFW; lo único que queda
+    para el hilo de GL es crear la textura.
+    """
+
+    probe_timeout = 2.0  # segundos máximos esperando los metadatos
+
+    def __init__(self, yuv=False, max_workers=2):
+        self.yuv = yuv
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="preload")
+        self._pending = {}  # ruta -> Future[MediaSource]
+        # Contadores
+        self.ready_hits = 0    # take() con la fuente ya lista
+        self.waited = 0        # take() con la apertura todavía en curso
+        self.misses = 0        # take() sin precarga
+        self.discarded = 0     # precargas descartadas sin usarse
+
+    def _open(self, path):
+        source = MediaSource(path, yuv=self.yuv, paused=True)
+        deadline = time.monotonic() + self.probe_timeout
+        while source.metadata.get('src_vid_size', (0, 0)) == (0, 0):
+            if time.monotonic() > deadline:
+                break
+            time.sleep(0.002)
+        return source
+
+    def request(self, path):
+        if path not in self._pending:
+            self._pending[path] = self._executor.submit(self._open, path)
+
+    def keep(self, paths):
+        """Precarga paths y descarta las fuentes en espera que ya no hacen falta"""
+        for path in list(self._pending):
+            if path not in paths:
+                self.close(self._pending.pop(path))
+                self.discarded += 1
+        for path in paths:
+            self.request(path)
+
+    def take(self, path):
+        """Fuente en espera para path (abierta y en pausa) o None si no se precargó"""
+        future = self._pending.pop(path, None)
+        if future is None:
+            self.misses += 1
+            return None
+        if future.done():
+            self.ready_hits += 1
+        else:
+            self.waited += 1
+        try:
+            return future.result()
+        except Exception as e:
+            print(f"Error precargando {path}: {e}")
+            return None
+
+    def close(self, source):
+        """Cierra una fuente (o un Future de una) fuera del hilo de render"""
+        if isinstance(source, Future):
+            source.add_done_callback(self._close_done)
+            return
+        try:
+            self._executor.submit(source.close)
+        except RuntimeError:
+            source.close()  # el executor ya se cerró
+
+    def _close_done(self, future):
+        if future.exception() is None:
+            self.close(future.result())
+
+    def stats(self):
+        return {
+            'standby': len(self._pending),
+            'ready_hits': self.ready_hits,
+            'waited': self.waited,
+            'misses': self.misses,
+            'discarded': self.discarded,
+        }
+
+    def shutdown(self):
+        for future in self._pending.values():
+            self.close(future)
+        self._pending.clear()
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,329 @@
+"""Perfilado por etapas del frame (CPU y GPU).
+
+    profiler = Profiler(enabled=True)
+    profiler.begin_frame()
+    with profiler.scope('update_video_texture'):
+        ...
+    profiler.end_frame()
+
+Cada scope mide el tiempo de CPU y, si hay timer queries (GL 3.3), el de GPU
+con marcas GL_TIMESTAMP que se leen de forma asíncrona unos frames después.
+Los resultados se exportan como Chrome trace (chrome://tracing, Perfetto) o
+CSV y alimentan ProfilerOverlay. Deshabilitado, scope() devuelve siempre el
+mismo objeto vacío y no mide nada.
+"""
+import csv
+import ctypes
+import json
+import threading
+import time
+from collections import OrderedDict, deque
+
+import numpy as np
+from OpenGL.GL import *
+
+try:
+    # El wrapper de PyOpenGL para la versión de 64 bits no sabe reservar la salida
+    from OpenGL.raw.GL.VERSION.GL_3_3 import glGetQueryObjectui64v as _get_query_u64
+except ImportError:
+    _get_query_u64 = None
+
+
+class _NullScope:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SCOPE = _NullScope()
+GPU_TID = 1  # hilo ficticio de la GPU en el Chrome trace
+
+
+class _Scope:
+    __slots__ = ('profiler', 'name', 'start', 'depth', 'query')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        p = self.profiler
+        self.depth = p._depth
+        p._depth += 1
+        self.query = p._timestamp()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        p = self.profiler
+        p._depth -= 1
+        p._record(self.name, self.start, end, self.depth, self.query, p._timestamp())
+        return False
+
+
+class Profiler:
+    """Scopes de instrumentación con historial por etapa (suma por frame de
+    todos los scopes con el mismo nombre, estén anidados o no).
+
+    Los eventos se guardan como [frame, nombre, inicio_s, cpu_ms, profundidad,
+    hilo, gpu_inicio_ms, gpu_ms]; las columnas de GPU quedan en None hasta que
+    llega el resultado de las queries (o si no hay timer queries).
+    """
+
+    def __init__(self, enabled=False, gpu=True, history=240, max_events=200000):
+        self.enabled = enabled
+        self.use_gpu = gpu
+        self.gpu = None  # se decide en el primer frame, con el contexto GL ya creado
+        self.history = history
+        self.frame = 0
+        self.events = deque(maxlen=max_events)
+        self.cpu = OrderedDict()  # etapa -> deque con los ms de CPU de los últimos frames
+        self.gpu_times = OrderedDict()  # etapa -> deque con los ms de GPU ya resueltos
+        self._frame_totals = {}
+        self._frame_start = None
+        self._depth = 0
+        self._thread = threading.get_ident()
+        self._origin = time.perf_counter()
+        self._gpu_origin = None
+        self._free_queries = []
+        self._pending = deque()  # (evento, query inicio, query fin)
+
+    def set_enabled(self, enabled):
+        self.enabled = enabled
+        self._depth = 0
+
+    def scope(self, name):
+        if not self.enabled:
+            return _NULL_SCOPE
+        return _Scope(self, name)
+
+    # --- GPU ---
+
+    def _init_gpu(self):
+        self.gpu = False
+        if not self.use_gpu or _get_query_u64 is None or not bool(glQueryCounter):
+            return
+        try:
+            self._free_queries = list(glGenQueries(64))
+            glGetError()
+            self.gpu = True
+        except Exception:
+            self._free_queries = []
+
+    def _timestamp(self):
+        if not self.gpu or threading.get_ident() != self._thread:
+            return None
+        if not self._free_queries:
+            self._free_queries = list(glGenQueries(64))
+        query = self._free_queries.pop()
+        glQueryCounter(query, GL_TIMESTAMP)
+        return query
+
+    def _query_ms(self, query):
+        value = ctypes.c_uint64()
+        _get_query_u64(query, GL_QUERY_RESULT, ctypes.byref(value))
+        return value.value / 1e6
+
+    def _resolve(self):
+        """Lee las queries que ya terminaron, en orden, sin esperar a la GPU"""
+        while self._pending:
+            event, q0, q1 = self._pending[0]
+            if not glGetQueryObjectiv(q1, GL_QUERY_RESULT_AVAILABLE):
+                break
+            self._pending.popleft()
+            t0, t1 = self._query_ms(q0), self._query_ms(q1)
+            if self._gpu_origin is None:
+                # Alinear el reloj de la GPU con el de la CPU en la primera marca
+                self._gpu_origin = t0 - (event[2] - self._origin) * 1000.0
+            event[6] = t0 - self._gpu_origin
+            event[7] = t1 - t0
+            self._free_queries += [q0, q1]
+            times = self.gpu_times.get(event[1])
+            if times is None:
+                times = self.gpu_times[event[1]] = deque(maxlen=self.history)
+            times.append(event[7])
+
+    # --- Frames y eventos ---
+
+    def begin_frame(self):
+        if not self.enabled:
+            return
+        if self.gpu is None:
+            self._init_gpu()
+        self._frame_start = time.perf_counter()
+        self._frame_totals = {}
+
+    def end_frame(self):
+        if not self.enabled or self._frame_start is None:
+            return
+        end = time.perf_counter()
+        self._record('frame', self._frame_start, end, -1, None, None)
+        for name, times in self.cpu.items():
+            times.append(self._frame_totals.get(name, 0.0))
+        for name, total in self._frame_totals.items():
+            if name not in self.cpu:
+                self.cpu[name] = deque([total], maxlen=self.history)
+        if self.gpu:
+            self._resolve()
+        self.frame += 1
+        self._frame_start = None
+
+    def _record(self, name, start, end, depth, q0, q1):
+        cpu_ms = (end - start) * 1000.0
+        event = [self.frame, name, start, cpu_ms, depth, threading.get_ident(), None, None]
+        self.events.append(event)
+        self._frame_totals[name] = self._frame_totals.get(name, 0.0) + cpu_ms
+        if q0 is not None and q1 is not None:
+            self._pending.append((event, q0, q1))
+
+    def summary(self):
+        """Promedio y máximo reciente por etapa, en ms"""
+        out = OrderedDict()
+        for name, times in self.cpu.items():
+            values = np.fromiter(times, dtype=np.float64)
+            gpu = self.gpu_times.get(name)
+            out[name] = {
+                'cpu_avg_ms': float(values.mean()) if len(values) else 0.0,
+                'cpu_max_ms': float(values.max()) if len(values) else 0.0,
+                'gpu_avg_ms': float(np.mean(gpu)) if gpu else None,
+            }
+        return out
+
+    # --- Exportación ---
+
+    def export_chrome_trace(self, path):
+        """Eventos completos ('X') en formato Chrome trace; la GPU va como otro hilo"""
+        trace = [
+            {'name': 'process_name', 'ph': 'M', 'pid': 0, 'args': {'name': 'cubo'}},
+            {'name': 'thread_name', 'ph': 'M', 'pid': 0, 'tid': GPU_TID, 'args': {'name': 'GPU'}},
+        ]
+        for frame, name, start, cpu_ms, depth, tid, gpu_start, gpu_ms in self.events:
+            trace.append({
+                'name': name, 'cat': 'cpu', 'ph': 'X', 'pid': 0, 'tid': tid,
+                'ts': (start - self._origin) * 1e6, 'dur': cpu_ms * 1000.0,
+                'args': {'frame': frame},
+            })
+            if gpu_ms is not None:
+                trace.append({
+                    'name': name, 'cat': 'gpu', 'ph': 'X', 'pid': 0, 'tid': GPU_TID,
+                    'ts': gpu_start * 1000.0, 'dur': gpu_ms * 1000.0,
+                    'args': {'frame': frame},
+                })
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': trace, 'displayTimeUnit': 'ms'}, f)
+
+    def export_csv(self, path):
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['frame', 'stage', 'depth', 'start_ms', 'cpu_ms', 'gpu_ms'])
+            for frame, name, start, cpu_ms, depth, tid, gpu_start, gpu_ms in self.events:
+                writer.writerow([frame, name, depth, f"{(start - self._origin) * 1000.0:.3f}",
+                                 f"{cpu_ms:.3f}", '' if gpu_ms is None else f"{gpu_ms:.3f}"])
+
+    def export(self, prefix):
+        """Escribe <prefix>.trace.json y <prefix>.csv"""
+        if self.gpu:
+            glFinish()
+            self._resolve()
+        self.export_chrome_trace(f"{prefix}.trace.json")
+        self.export_csv(f"{prefix}.csv")
+
+    def release(self):
+        queries = self._free_queries + [q for _, q0, q1 in self._pending for q in (q0, q1)]
+        if queries:
+            glDeleteQueries(len(queries), queries)
+        self._free_queries = []
+        self._pending.clear()
+
+
+class ProfilerOverlay:
+    """Gráficos móviles del tiempo de CPU por etapa, dibujados en 2D sobre la escena.
+
+    Usa el pipeline fijo (como el HUD) con proyección ortográfica propia; las
+    etiquetas se dibujan con un GlyphAtlas si se pasa uno.
+    """
+
+    colors = [
+        (0.95, 0.35, 0.35), (0.35, 0.85, 0.45), (0.35, 0.6, 0.95), (0.95, 0.8, 0.3),
+        (0.8, 0.45, 0.95), (0.3, 0.9, 0.9), (0.95, 0.6, 0.3), (0.7, 0.7, 0.7),
+    ]
+
+    def __init__(self, profiler, atlas=None, width=360, height=140, scale_ms=33.3):
+        self.profiler = profiler
+        self.atlas = atlas
+        self.visible = False
+        self._keep_enabled = profiler.enabled  # perfilado pedido aparte del overlay
+        self.width = width
+        self.height = height
+        self.scale_ms = scale_ms  # valor que ocupa toda la altura del gráfico
+        self._labels = []
+        self._labels_frame = -1
+
+    def toggle(self):
+        self.visible = not self.visible
+        self.profiler.set_enabled(self.visible or self._keep_enabled)
+        return self.visible
+
+    def draw(self, window_width, window_height, margin=10):
+        if not self.visible or not self.profiler.cpu:
+            return
+        x0 = window_width - self.width - margin
+        y0 = window_height - self.height - margin
+        glMatrixMode(GL_PROJECTION)
+        glPushMatrix()
+        glLoadIdentity()
+        glOrtho(0, window_width, 0, window_height, -1, 1)
+        glMatrixMode(GL_MODELVIEW)
+        glPushMatrix()
+        glLoadIdentity()
+        glPushAttrib(GL_ENABLE_BIT | GL_CURRENT_BIT | GL_LINE_BIT)
+        glDisable(GL_DEPTH_TEST)
+        glDisable(GL_TEXTURE_2D)
+        glEnable(GL_BLEND)
+        glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+
+        glColor4f(0, 0, 0, 0.6)
+        glBegin(GL_QUADS)
+        glVertex2f(x0, y0)
+        glVertex2f(x0 + self.width, y0)
+        glVertex2f(x0 + self.width, y0 + self.height)
+        glVertex2f(x0, y0 + self.height)
+        glEnd()
+
+        # Una línea por etapa (todas las muestras en un solo array por etapa)
+        history = self.profiler.history
+        xs = x0 + np.arange(history, dtype=np.float32) * (self.width / max(history - 1, 1))
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glLineWidth(1.5)
+        for i, (name, times) in enumerate(self.profiler.cpu.items()):
+            values = np.fromiter(times, dtype=np.float32)
+            if len(values) < 2:
+                continue
+            ys = y0 + np.minimum(values / self.scale_ms, 1.0) * self.height
+            points = np.ascontiguousarray(np.column_stack([xs[history - len(values):], ys]))
+            glColor3f(*self.colors[i % len(self.colors)])
+            glVertexPointer(2, GL_FLOAT, 0, points)
+            glDrawArrays(GL_LINE_STRIP, 0, len(points))
+        glDisableClientState(GL_VERTEX_ARRAY)
+
+        if self.atlas is not None:
+            # Las etiquetas cambian dos veces por segundo para no regenerar quads cada frame
+            if self.profiler.frame - self._labels_frame >= 30:
+                self._labels_frame = self.profiler.frame
+                line = self.atlas.line_height
+                self._labels = [
+                    (f"{name} {stats['cpu_avg_ms']:.2f} ms", x0 + 4, y0 + self.height - line * (i + 1))
+                    for i, (name, stats) in enumerate(self.profiler.summary().items())
+                ]
+            self.atlas.draw(self._labels)
+
+        glPopAttrib()
+        glMatrixMode(GL_PROJECTION)
+        glPopMatrix()
+        glMatrixMode(GL_MODELVIEW)
+        glPopMatrix()
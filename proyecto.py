@@ -1,13 +1,27 @@
 import glfw
+import gldebug  # antes que OpenGL.GL: en release desactiva el chequeo por llamada de PyOpenGL
 from OpenGL.GL import *
-from OpenGL.GLU import *
 import numpy as np
 import cv2
 import pygame
 import os
 import sys
+import time
 from mutagen.mp3 import MP3
-from ffpyplayer.player import MediaPlayer
+from controls import ControlPanel
+from text import GlyphAtlas
+from renderer import QuadFace, create_renderer
+from camera import Camera
+from idbuffer import IdBuffer, FACE, VERTEX
+from picking import project_points, unproject_point
+from facetextures import create_face_textures
+from media import MediaSource, image_to_rgb
+from decoder import FrameRing
+from clock import MasterClock, FrameScheduler
+from headless import create_context
+from profiler import Profiler, ProfilerOverlay
+from governor import RenderGovernor
+from imagecache import image_cache
 
 
 # === CONFIGURACIÓN ===
@@ -34,31 +48,76 @@ caras_visibles = [
     [3, 2, 6, 7],  # Superior (video/portada)
 ]
 
+renderer_mode = os.environ.get('CUBE_RENDERER', 'shader')  # 'shader' o 'immediate'
+renderer = None
+
+# Cámara: única fuente de matrices (NumPy) para dibujar, picking y arrastre
+camera = Camera(zoom=-7.0, pitch=35.0, yaw=-45.0)
+orbit_speed = 0.4  # grados por píxel al arrastrar con el botón derecho
+orbit_from = None
+vertex_version = 0
+# Picking en la GPU (ver idbuffer.py): se dibuja y se lee solo con eventos del mouse
+id_buffer = None
+pick_faces = [QuadFace(vertices, corners) for corners in caras_visibles]
+mouse_down = False
+hover_pos = None  # última posición del cursor sin pedido de hover resuelto
+hover_pending = False
+hovered = None  # Pick bajo el cursor
+hand_cursor = None
+
 selected_vertex = None
+# Arrastre: los eventos del cursor solo guardan la última posición y apply_drag()
+# la aplica una vez por frame con las matrices en NumPy, sin consultas a GL
+drag_pos = None
+drag_event_time = None  # primer evento todavía sin aplicar (perf_counter)
+motion_events = 0
+drag_updates = 0
+drag_latency_ms = 0.0  # del primer evento pendiente a la actualización del vértice
 window_width, window_height = 1000, 800
 is_playing = False
-texture_id = None
-control_texture_id = None
-cap = None
-video_fps = 30
-start_time = 0
+face_textures = None  # una capa por cara de caras_visibles más la portada (ver facetextures.py)
+video_texture = None  # capa de los frames de video
+cover_texture = None  # capa de la portada: se sube una vez y se vuelve a usar en cada pausa
+showing_cover = True  # la cara superior muestra la portada en lugar del video
+use_yuv = False  # planos YUV con conversión en el shader (solo renderer 'shader')
+control_texture = None  # capa de la cara derecha
+source = None  # un solo demux/decodificación para audio y video
+playback_clock = None  # reloj maestro: pts del audio o reloj monotónico
+video_frames = FrameRing(4)
+frame_scheduler = None
 volume = 0.7
 control_texture_size = 512
+control_panel = None
 font = None
 pygame_font = None
+text_atlas = None
+headless_context = None  # contexto sin ventana visible (benchmarks y CI)
+# Perfilado por etapas: CUBE_PROFILE=prefijo lo activa y exporta <prefijo>.trace.json/.csv al salir
+profile_path = os.environ.get('CUBE_PROFILE')
+profiler = Profiler(enabled=bool(profile_path))
+profiler_overlay = None  # tecla P
+governor = None  # decide cuándo dibujar (ver governor.py)
+
+def init_window(headless=None):
+    global window_width, window_height, font, pygame_font, text_atlas, headless_context
+    global profiler_overlay, governor
+    
+    governor = RenderGovernor(events=not headless)
+    if headless:
+        # 'glfw' (ventana invisible) o 'egl'; sin ventana no se registran callbacks
+        headless_context = create_context(window_width, window_height, headless)
+        window = headless_context.window
+    else:
+        if not glfw.init():
+            raise Exception("GLFW initialization failed")
 
-def init_window():
-    global window_width, window_height, font, pygame_font
-    
-    if not glfw.init():
-        raise Exception("GLFW initialization failed")
+        window = glfw.create_window(window_width, window_height, "Spotify Cube Player", None, None)
+        if not window:
+            glfw.terminate()
+            raise Exception("Window creation failed")
 
-    window = glfw.create_window(window_width, window_height, "Spotify Cube Player", None, None)
-    if not window:
-        glfw.terminate()
-        raise Exception("Window creation failed")
-
-    glfw.make_context_current(window)
+        glfw.make_context_current(window)
+    gldebug.install()
     glEnable(GL_DEPTH_TEST)
     glEnable(GL_TEXTURE_2D)
     
@@ -66,6 +125,11 @@ def init_window():
     pygame.init()
     pygame_font = pygame.font.SysFont('Arial', 24)
     font = pygame_font  # Para compatibilidad
+    text_atlas = GlyphAtlas(pygame_font)
+    profiler_overlay = ProfilerOverlay(profiler, text_atlas)
+
+    if headless:
+        return window
 
     glfw.set_mouse_button_callback(window, mouse_button_callback)
     glfw.set_cursor_pos_callback(window, mouse_motion_callback)
@@ -78,83 +142,112 @@ def window_size_callback(window, width, height):
     global window_width, window_height
     window_width, window_height = width, height
     glViewport(0, 0, width, height)
+    governor.invalidate('resize')
 
 def init_audio_video():
-    global cap, texture_id, control_texture_id, player, video_fps
+    global source, face_textures, video_texture, cover_texture, control_texture, use_yuv
+    global playback_clock, frame_scheduler
 
-    cap = cv2.VideoCapture(video_path)
-    if not cap.isOpened():
+    if not os.path.exists(video_path):
         print(f"Error: No se pudo abrir el video {video_path}")
         sys.exit(1)
 
-    video_fps = cap.get(cv2.CAP_PROP_FPS)
-
-    # Audio embebido
-    player = MediaPlayer(video_path)
-    
-    # Texturas
-    texture_id = glGenTextures(1)
-    control_texture_id = glGenTextures(1)
-    glBindTexture(GL_TEXTURE_2D, texture_id)
-    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-
-    glBindTexture(GL_TEXTURE_2D, control_texture_id)
-    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-
-    load_cover_texture()
-
-
-def load_cover_texture():
-    """Carga la imagen de portada como textura"""
-    img = cv2.imread(cover_path)
-    if img is None:
+    # Audio embebido y video salen del mismo MediaPlayer
+    use_yuv = renderer.supports_yuv
+    source = MediaSource(video_path, yuv=use_yuv, loop=False, paused=True)
+    playback_clock = MasterClock(source.get_pts)
+    playback_clock.pause()
+    frame_scheduler = FrameScheduler(playback_clock, video_frames, 1.0 / source.fps)
+    
+    # Texturas (se reservan una vez por resolución y se actualizan con PBOs)
+    face_textures = create_face_textures(renderer, [*range(len(caras_visibles)), 'portada'])
+    face_textures[0].set_color((0.1, 0.1, 0.1))  # Color oscuro estilo Spotify
+    control_texture = face_textures[1]
+    control_texture.set_label("controles")
+    video_texture = face_textures[2]
+    video_texture.set_label(f"video {video_path}")
+    cover_texture = face_textures['portada']
+    cover_texture.set_label(f"portada {cover_path}")
+    # Portada y frames se suben sin invertir: la inversión vertical la hace el renderer
+    video_texture.flip_y = True
+    cover_texture.flip_y = True
+
+    show_cover()
+
+
+def show_cover():
+    """Muestra la portada en la cara superior.
+
+    La imagen sale de image_cache y la capa solo se vuelve a subir si el
+    archivo cambió en disco: pausar no lee ni sube nada.
+    """
+    global showing_cover
+    showing_cover = True
+    try:
+        cover_texture.upload_asset(image_cache.get(cover_path, flip=False))
+    except ValueError:
+        if cover_texture.size is not None:
+            return  # se sigue mostrando la última portada que se pudo cargar
         print(f"Error: No se pudo cargar la imagen {cover_path}")
         # Crear una imagen de respaldo
         img = np.zeros((512, 512, 3), dtype=np.uint8)
         cv2.putText(img, "COVER ART", (50, 256), cv2.FONT_HERSHEY_SIMPLEX, 2, (255, 255, 255), 4)
-    
-    img = cv2.flip(img, 0)
-    img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-    h, w, _ = img.shape
-    
-    glBindTexture(GL_TEXTURE_2D, texture_id)
-    glTexImage2D(GL_TEXTURE_2D, 0, GL_RGB, w, h, 0, GL_RGB, GL_UNSIGNED_BYTE, img)
+        cover_texture.upload(img)
 
 def update_video_texture():
-    global cap, player, is_playing
-
-    if not is_playing or not cap:
-        return
+    global source, is_playing, showing_cover
 
-    frame, val = player.get_frame()
-    if val == 'eof':
+    if not is_playing or not source:
         return
 
-    if frame is None:
+    # Pasar al buffer los frames que entregó el decodificador, con su pts
+    while video_frames.depth < video_frames.capacity:
+        item = source.read_frame()
+        if item is None:
+            break
+        size = item[1].get_size()
+        fitted = video_texture.fit(*size)
+        if fitted != size:
+            # Más grande que la capa: lo reduce el decodificador en los próximos frames
+            source.set_size(*fitted)
+            continue
+        video_frames.push(item)
+
+    # Presentar el que corresponde según el reloj maestro; los atrasados se descartan
+    img = frame_scheduler.next_frame()
+    if img is None:
         return
 
-    img, t = frame
-    frame = img.to_ndarray(format='rgb24')
-
-    h, w, _ = frame.shape
-    frame = cv2.flip(frame, 0)
-
-    glBindTexture(GL_TEXTURE_2D, texture_id)
-    glTexImage2D(GL_TEXTURE_2D, 0, GL_RGB, w, h, 0, GL_RGB, GL_UNSIGNED_BYTE, frame)
+    # La inversión vertical la hace el renderer con las coordenadas de textura
+    if use_yuv:
+        video_texture.upload_image(img)
+    else:
+        video_texture.upload(image_to_rgb(img))
+    showing_cover = False
+
+def seek_playback(new_time):
+    """Mueve el reloj maestro y el decodificador a new_time"""
+    playback_clock.seek(new_time)
+    source.seek(new_time)
+    video_frames.clear()
+    pygame.mixer.music.set_pos(new_time)
+
+def set_paused(paused):
+    if paused:
+        playback_clock.pause()
+    else:
+        playback_clock.resume()
+    source.set_pause(paused)
 
 def update_control_texture():
-    """Actualiza la textura de la interfaz de control"""
-    global control_texture_id, control_texture_size, is_playing, volume
+    """Actualiza solo las regiones de la interfaz de control que cambiaron"""
+    global control_panel
     
-    # Crear superficie de pygame
-    surface = pygame.Surface((control_texture_size, control_texture_size), pygame.SRCALPHA)
-    surface.fill((40, 40, 40, 230))  # Fondo semi-transparente
+    if control_panel is None:
+        control_panel = ControlPanel(control_texture_size, text_atlas)
     
-    # Dibujar barra de progreso
     if is_playing:
-        current_time = glfw.get_time() - start_time
+        current_time = playback_clock.now()
     else:
         current_time = 0
     
@@ -162,115 +255,19 @@ def update_control_texture():
     if total_time <= 0:
         total_time = 1  # evitar división por cero
     
-    progress = current_time / total_time
-    bar_width = control_texture_size * 0.8
-    bar_height = 10
-    bar_x = (control_texture_size - bar_width) // 2
-    bar_y = 50
-    
-    # Barra de fondo
-    pygame.draw.rect(surface, (100, 100, 100), (bar_x, bar_y, bar_width, bar_height))
-    # Barra de progreso
-    pygame.draw.rect(surface, (30, 215, 96), (bar_x, bar_y, bar_width * progress, bar_height))
-    
-    # Dibujar tiempo
-    mins, secs = divmod(int(current_time), 60)
-    time_text = f"{mins:02d}:{secs:02d}"
-    text_surface = pygame_font.render(time_text, True, (255, 255, 255))
-    surface.blit(text_surface, (bar_x, bar_y + 20))
-    
-    # Dibujar botones
-    button_size = 60
-    button_y = control_texture_size // 2
-    
-    # Botón de retroceso
-    rewind_rect = pygame.Rect(control_texture_size//2 - button_size*2, button_y, button_size, button_size)
-    pygame.draw.rect(surface, (70, 70, 70), rewind_rect, border_radius=10)
-    pygame.draw.polygon(surface, (200, 200, 200), [
-        (rewind_rect.centerx - 10, rewind_rect.centery),
-        (rewind_rect.centerx - 10, rewind_rect.centery - 15),
-        (rewind_rect.centerx + 5, rewind_rect.centery)
-    ])
-    
-    # Botón de play/pause
-    play_rect = pygame.Rect(control_texture_size//2 - button_size//2, button_y, button_size, button_size)
-    pygame.draw.rect(surface, (30, 215, 96), play_rect, border_radius=10)
-    if is_playing:
-        # Pausa: dos barras
-        pygame.draw.rect(surface, (255, 255, 255), (play_rect.centerx - 15, play_rect.centery - 15, 10, 30))
-        pygame.draw.rect(surface, (255, 255, 255), (play_rect.centerx + 5, play_rect.centery - 15, 10, 30))
-    else:
-        # Play: triángulo
-        pygame.draw.polygon(surface, (255, 255, 255), [
-            (play_rect.centerx - 10, play_rect.centery - 15),
-            (play_rect.centerx - 10, play_rect.centery + 15),
-            (play_rect.centerx + 15, play_rect.centery)
-        ])
-    
-    # Botón de avance
-    forward_rect = pygame.Rect(control_texture_size//2 + button_size, button_y, button_size, button_size)
-    pygame.draw.rect(surface, (70, 70, 70), forward_rect, border_radius=10)
-    pygame.draw.polygon(surface, (200, 200, 200), [
-        (forward_rect.centerx + 10, forward_rect.centery),
-        (forward_rect.centerx + 10, forward_rect.centery - 15),
-        (forward_rect.centerx - 5, forward_rect.centery)
-    ])
-    
-    # Control de volumen
-    vol_width = control_texture_size * 0.7
-    vol_height = 20
-    vol_x = (control_texture_size - vol_width) // 2
-    vol_y = control_texture_size - 80
-    
-    # Barra de volumen
-    pygame.draw.rect(surface, (100, 100, 100), (vol_x, vol_y, vol_width, vol_height))
-    pygame.draw.rect(surface, (30, 215, 96), (vol_x, vol_y, vol_width * volume, vol_height))
-    
-    # Indicador de volumen
-    vol_pos = vol_x + vol_width * volume
-    pygame.draw.circle(surface, (200, 200, 200), (int(vol_pos), vol_y + vol_height//2), 12)
-    
-    # Convertir la superficie a un array de numpy
-    data = pygame.image.tostring(surface, "RGBA", True)
-    img = np.frombuffer(data, dtype=np.uint8).reshape((control_texture_size, control_texture_size, 4))
-    img = np.flipud(img)  # Invertir verticalmente
-    
-    # Cargar la textura
-    glBindTexture(GL_TEXTURE_2D, control_texture_id)
-    glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, control_texture_size, control_texture_size, 0, 
-                 GL_RGBA, GL_UNSIGNED_BYTE, img)
+    control_panel.update(current_time, total_time, is_playing, volume)
+    control_panel.upload(control_texture)
 
-def draw_cube():
-    colors = [(0.1, 0.1, 0.1), (0.15, 0.15, 0.15)]  # Colores oscuros estilo Spotify
-    
-    for i, cara in enumerate(caras_visibles):
-        if i == 2:  # Cara superior (video/portada)
-            glBindTexture(GL_TEXTURE_2D, texture_id)
-            glColor3f(1, 1, 1)
-            glBegin(GL_QUADS)
-            glTexCoord2f(0, 0); glVertex3fv(vertices[cara[0]])
-            glTexCoord2f(1, 0); glVertex3fv(vertices[cara[1]])
-            glTexCoord2f(1, 1); glVertex3fv(vertices[cara[2]])
-            glTexCoord2f(0, 1); glVertex3fv(vertices[cara[3]])
-            glEnd()
-        elif i == 1:  # Cara derecha (controles)
-            glBindTexture(GL_TEXTURE_2D, control_texture_id)
-            glColor3f(1, 1, 1)
-            glBegin(GL_QUADS)
-            glTexCoord2f(0, 0); glVertex3fv(vertices[cara[0]])
-            glTexCoord2f(1, 0); glVertex3fv(vertices[cara[1]])
-            glTexCoord2f(1, 1); glVertex3fv(vertices[cara[2]])
-            glTexCoord2f(0, 1); glVertex3fv(vertices[cara[3]])
-            glEnd()
-        else:
-            glColor3fv(colors[i])
-            glBegin(GL_QUADS)
-            for idx in cara:
-                glVertex3fv(vertices[idx])
-            glEnd()
+def draw_cube(view, projection):
+    # Frente (color), derecha (controles) y superior (video/portada) en una llamada
+    top_texture = cover_texture if showing_cover else video_texture
+    renderer.begin(view, projection)
+    renderer.draw_faces([(0, face_textures[0]), (1, control_texture), (2, top_texture)])
+    renderer.end()
     
     # Dibujar HUD
-    draw_hud()
+    with profiler.scope('draw_hud'):
+        draw_hud()
 
 def draw_hud():
     """Dibuja la interfaz de usuario en 2D"""
@@ -285,30 +282,18 @@ def draw_hud():
     
     # Dibujar tiempo transcurrido
     if is_playing:
-        current_time = glfw.get_time() - start_time
+        current_time = playback_clock.now()
     else:
         current_time = 0
     
     mins, secs = divmod(int(current_time), 60)
     time_text = f"{mins:02d}:{secs:02d}"
+    vol_text = f"Vol: {int(volume * 100)}%"
     
-    text_surface = pygame_font.render(time_text, True, (255, 255, 255))
-    text_data = pygame.image.tostring(text_surface, "RGBA", True)
-    
+    # Tiempo e indicador de volumen en una sola llamada con el atlas de glifos
     glEnable(GL_BLEND)
     glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
-    glRasterPos2f(20, 40)
-    glDrawPixels(text_surface.get_width(), text_surface.get_height(), 
-                 GL_RGBA, GL_UNSIGNED_BYTE, text_data)
-    
-    # Indicador de volumen
-    vol_text = f"Vol: {int(volume * 100)}%"
-    vol_surface = pygame_font.render(vol_text, True, (255, 255, 255))
-    vol_data = pygame.image.tostring(vol_surface, "RGBA", True)
-    glRasterPos2f(20, 80)
-    glDrawPixels(vol_surface.get_width(), vol_surface.get_height(), 
-                 GL_RGBA, GL_UNSIGNED_BYTE, vol_data)
-    
+    text_atlas.draw([(time_text, 20, 40), (vol_text, 20, 80)])
     glDisable(GL_BLEND)
     
     # Restaurar matrices anteriores
@@ -318,130 +303,138 @@ def draw_hud():
     glPopMatrix()
 
 def mouse_button_callback(window, button, action, mods):
-    global selected_vertex, is_playing, start_time, volume
+    global selected_vertex, mouse_down, orbit_from
 
+    governor.invalidate('input')
+    if button == glfw.MOUSE_BUTTON_RIGHT:
+        # Botón derecho: orbitar la cámara alrededor del cubo
+        orbit_from = glfw.get_cursor_pos(window) if action == glfw.PRESS else None
+        return
     if button == glfw.MOUSE_BUTTON_LEFT:
         if action == glfw.PRESS:
+            mouse_down = True
             x, y = glfw.get_cursor_pos(window)
-            y = window_height - y  # Invertir coordenada Y
-            
-            # Comprobar si se hizo clic en los controles
-            handle_control_click(x, y)
-            
-            selected_vertex = pick_vertex(x, y)
+            # Vértice o control bajo el cursor: se resuelve en resolve_picks()
+            request_pick(x, window_height - y, 'click')
         elif action == glfw.RELEASE:
+            mouse_down = False
             selected_vertex = None
 
-def handle_control_click(x, y):
-    global is_playing, start_time, volume
-    
-    # Coordenadas relativas al centro de la ventana
-    rel_x = x - window_width / 2
-    rel_y = y - window_height / 2
-    
-    # Tamaño aproximado de la cara de controles en pantalla
-    control_size = min(window_width, window_height) * 0.4
-    
-    # Verificar si el clic está dentro del área de la cara de controles
-    if abs(rel_x) < control_size and abs(rel_y) < control_size:
-        # Convertir a coordenadas UV de la textura (0 a 1)
-        u = (rel_x + control_size) / (2 * control_size)
-        v = (rel_y + control_size) / (2 * control_size)
-        
-        # Coordenadas en la textura de controles
-        tex_x = int(u * control_texture_size)
-        tex_y = int((1 - v) * control_texture_size)  # Invertir Y
-        
-        # Detectar clic en botones (coordenadas aproximadas)
-        button_size = 60
-        button_y = control_texture_size // 2
-        
-        # Botón de retroceso
-        rewind_x1 = control_texture_size//2 - button_size*2
-        rewind_x2 = rewind_x1 + button_size
-        rewind_y1 = button_y
-        rewind_y2 = button_y + button_size
-        
-        # Botón de play/pause
-        play_x1 = control_texture_size//2 - button_size//2
-        play_x2 = play_x1 + button_size
-        play_y1 = button_y
-        play_y2 = button_y + button_size
-        
-        # Botón de avance
-        forward_x1 = control_texture_size//2 + button_size
-        forward_x2 = forward_x1 + button_size
-        forward_y1 = button_y
-        forward_y2 = button_y + button_size
-        
-        # Control de volumen
-        vol_y = control_texture_size - 80
-        vol_x1 = (control_texture_size - control_texture_size * 0.7) // 2
-        vol_x2 = vol_x1 + control_texture_size * 0.7
-        
-        # Verificar clic en controles
-        if rewind_x1 <= tex_x <= rewind_x2 and rewind_y1 <= tex_y <= rewind_y2:
-            # Retroceder 10 segundos
-            if is_playing:
-                current_time = glfw.get_time() - start_time
-                new_time = max(0, current_time - 10)
-                start_time = glfw.get_time() - new_time
-                pygame.mixer.music.set_pos(new_time)
-        
-        elif play_x1 <= tex_x <= play_x2 and play_y1 <= tex_y <= play_y2:
-            # Play/Pause
-            is_playing = not is_playing
-            if is_playing:
-                pygame.mixer.music.unpause()
-                if pygame.mixer.music.get_pos() == -1:  # Si no estaba reproduciendo
-                    pygame.mixer.music.play()
-                    start_time = glfw.get_time()
-            else:
-                pygame.mixer.music.pause()
-                load_cover_texture()  # Mostrar portada
-        
-        elif forward_x1 <= tex_x <= forward_x2 and forward_y1 <= tex_y <= forward_y2:
-            # Avanzar 10 segundos
-            if is_playing:
-                current_time = glfw.get_time() - start_time
-                total_time = pygame.mixer.music.get_length() / 1000.0
-                new_time = min(total_time, current_time + 10)
-                start_time = glfw.get_time() - new_time
-                pygame.mixer.music.set_pos(new_time)
-        
-        elif vol_x1 <= tex_x <= vol_x2 and vol_y - 20 <= tex_y <= vol_y + 20:
-            # Ajustar volumen
-            vol_pos = (tex_x - vol_x1) / (vol_x2 - vol_x1)
-            volume = max(0.0, min(1.0, vol_pos))
-            pygame.mixer.music.set_volume(volume)
+def request_pick(x, y, tag):
+    """Pide al IdBuffer lo que hay en (x, y) (y medida desde abajo); lo dibuja antes si cambió la escena"""
+    camera.set_viewport(window_width, window_height)
+    id_buffer.update(list(enumerate(pick_faces)), vertices, camera.view_projection,
+                     camera.viewport, vertex_version)
+    id_buffer.request(x, y, tag)
+
+def resolve_picks():
+    """Atiende los pedidos de picking que la GPU ya terminó (al principio de cada frame)"""
+    global selected_vertex, hovered, hover_pending
+    for tag, pick in id_buffer.poll():
+        if tag == 'hover':
+            hover_pending = False
+            set_hovered(pick)
+        elif pick.kind == VERTEX:
+            # Si el botón ya se soltó no se empieza a arrastrar
+            selected_vertex = pick.index if mouse_down else None
+        elif pick.kind == FACE and pick.index == 1:
+            handle_control_click(pick)
+    if hover_pos is not None and not hover_pending:
+        request_hover()
+
+def request_hover():
+    global hover_pos, hover_pending
+    request_pick(*hover_pos, 'hover')
+    hover_pos = None
+    hover_pending = True
+
+def set_hovered(pick):
+    """Cursor de mano sobre los vértices y los controles"""
+    global hovered, hand_cursor
+    hovered = pick
+    if headless_context:
+        return
+    over = pick.kind == VERTEX or (pick.kind == FACE and pick.index == 1
+                                   and control_widget_at(pick) is not None)
+    if over and hand_cursor is None:
+        hand_cursor = glfw.create_standard_cursor(glfw.HAND_CURSOR)
+    glfw.set_cursor(glfw.get_current_context(), hand_cursor if over else None)
+
+def control_texel(pick):
+    """Texel de la textura de controles bajo un Pick de la cara de controles"""
+    v = 1.0 - pick.v if control_texture.flip_y else pick.v
+    return int(pick.u * control_texture_size), int(v * control_texture_size)
+
+def control_widget_at(pick):
+    return control_panel.widget_at(*control_texel(pick)) if control_panel else None
+
+def handle_control_click(pick):
+    global is_playing, volume
+
+    widget = control_widget_at(pick)
+    if widget is None:
+        return
+    tex_x, _ = control_texel(pick)
+
+    # Verificar clic en controles
+    if widget.name == 'rewind':
+        # Retroceder 10 segundos
+        if is_playing:
+            current_time = playback_clock.now()
+            new_time = max(0, current_time - 10)
+            seek_playback(new_time)
+    
+    elif widget.name == 'play':
+        # Play/Pause
+        is_playing = not is_playing
+        set_paused(not is_playing)
+        if is_playing:
+            pygame.mixer.music.unpause()
+            if pygame.mixer.music.get_pos() == -1:  # Si no estaba reproduciendo
+                pygame.mixer.music.play()
+        else:
+            pygame.mixer.music.pause()
+            show_cover()
+    
+    elif widget.name == 'forward':
+        # Avanzar 10 segundos
+        if is_playing:
+            current_time = playback_clock.now()
+            total_time = pygame.mixer.music.get_length() / 1000.0
+            new_time = min(total_time, current_time + 10)
+            seek_playback(new_time)
+    
+    elif widget.name == 'volume':
+        # Ajustar volumen
+        volume = widget.value_at(tex_x)
+        pygame.mixer.music.set_volume(volume)
 
 def key_callback(window, key, scancode, action, mods):
-    global is_playing, start_time, volume
+    global is_playing, volume
     
     if action == glfw.PRESS:
+        governor.invalidate('input')
         if key == glfw.KEY_SPACE:  # Barra espaciadora para play/pause
             is_playing = not is_playing
+            set_paused(not is_playing)
             if is_playing:
                 pygame.mixer.music.play()
-                start_time = glfw.get_time()
             else:
                 pygame.mixer.music.pause()
-                load_cover_texture()
+                show_cover()
         
         elif key == glfw.KEY_LEFT:  # Retroceder 10 segundos
             if is_playing:
-                current_time = glfw.get_time() - start_time
+                current_time = playback_clock.now()
                 new_time = max(0, current_time - 10)
-                start_time = glfw.get_time() - new_time
-                pygame.mixer.music.set_pos(new_time)
+                seek_playback(new_time)
         
         elif key == glfw.KEY_RIGHT:  # Avanzar 10 segundos
             if is_playing:
-                current_time = glfw.get_time() - start_time
+                current_time = playback_clock.now()
                 total_time = pygame.mixer.music.get_length() / 1000.0
                 new_time = min(total_time, current_time + 10)
-                start_time = glfw.get_time() - new_time
-                pygame.mixer.music.set_pos(new_time)
+                seek_playback(new_time)
         
         elif key == glfw.KEY_UP:  # Aumentar volumen
             volume = min(1.0, volume + 0.1)
@@ -450,70 +443,137 @@ def key_callback(window, key, scancode, action, mods):
         elif key == glfw.KEY_DOWN:  # Disminuir volumen
             volume = max(0.0, volume - 0.1)
             pygame.mixer.music.set_volume(volume)
+        
+        elif key == glfw.KEY_P:  # Overlay del perfilador
+            profiler_overlay.toggle()
 
 def mouse_motion_callback(window, xpos, ypos):
-    global vertices, selected_vertex
+    global hover_pos, drag_pos, drag_event_time, motion_events, orbit_from
     
+    if orbit_from is not None:
+        camera.orbit_by((ypos - orbit_from[1]) * orbit_speed, (xpos - orbit_from[0]) * orbit_speed)
+        orbit_from = (xpos, ypos)
+        governor.invalidate('input')
+        return
     if selected_vertex is None:
+        # Hover: un pedido pendiente como máximo; las posiciones intermedias se descartan
+        hover_pos = (xpos, window_height - ypos)
+        if not hover_pending:
+            request_hover()
+            governor.invalidate('input')
         return
 
-    modelview = glGetDoublev(GL_MODELVIEW_MATRIX)
-    projection = glGetDoublev(GL_PROJECTION_MATRIX)
-    viewport = glGetIntegerv(GL_VIEWPORT)
-
-    winX = xpos
-    winY = viewport[3] - ypos
-    winZ = glReadPixels(int(winX), int(winY), 1, 1, GL_DEPTH_COMPONENT, GL_FLOAT)
-
-    world_coords = gluUnProject(winX, winY, winZ[0][0], modelview, projection, viewport)
-    if world_coords:
-        vertices[selected_vertex] = world_coords[:3]
-
-def pick_vertex(x, y, threshold=15):
-    modelview = glGetDoublev(GL_MODELVIEW_MATRIX)
-    projection = glGetDoublev(GL_PROJECTION_MATRIX)
-    viewport = glGetIntegerv(GL_VIEWPORT)
-
-    closest_idx = None
-    min_dist = threshold
-    for i, v in enumerate(vertices):
-        screen_coords = gluProject(v[0], v[1], v[2], modelview, projection, viewport)
-        dx = screen_coords[0] - x
-        dy = (viewport[3] - screen_coords[1]) - y
-        dist = np.hypot(dx, dy)
-        if dist < min_dist:
-            closest_idx = i
-            min_dist = dist
-    return closest_idx
-
-def main():
-    global window_width, window_height
-    
-    window = init_window()
+    motion_events += 1
+    if drag_pos is None:
+        drag_event_time = time.perf_counter()
+    drag_pos = (xpos, ypos)
+    governor.invalidate('drag')
+
+def apply_drag():
+    """Mueve el vértice arrastrado a la última posición del cursor, a la profundidad
+    que ya tenía en pantalla (se desplaza paralelo a la pantalla)"""
+    global drag_pos, drag_updates, drag_latency_ms, vertex_version
+    if drag_pos is None:
+        return
+    xpos, ypos = drag_pos
+    drag_pos = None
+    if selected_vertex is None:
+        return
+    window, in_front = project_points(vertices[selected_vertex:selected_vertex + 1],
+                                      camera.view_projection, camera.viewport)
+    if not in_front[0]:
+        return
+    vertices[selected_vertex] = unproject_point(xpos, window_height - ypos, window[0, 2],
+                                                camera.inverse_view_projection, camera.viewport)
+    vertex_version += 1
+    renderer.invalidate()
+    drag_updates += 1
+    drag_latency_ms = (time.perf_counter() - drag_event_time) * 1000.0
+
+def setup(headless=None):
+    global renderer, id_buffer
+    
+    window = init_window(headless)
+    renderer = create_renderer(vertices, dict(enumerate(caras_visibles)), renderer_mode)
+    id_buffer = IdBuffer()
     init_audio_video()
     
-    glfw.get_framebuffer_size(window)
     glViewport(0, 0, window_width, window_height)
-    
-    while not glfw.window_should_close(window):
-        glfw.poll_events()
-        glClearColor(0.08, 0.08, 0.08, 1.0) 
-        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
-        glLoadIdentity()
-        gluPerspective(45, window_width / window_height, 0.1, 50.0)
-        rot_x, rot_y = 35, -45
-        glTranslatef(0.0, 0.0, -7)
-        glRotatef(rot_x, 1, 0, 0)
-        glRotatef(rot_y, 0, 1, 0)
+    return window
+
+def render_frame():
+    glClearColor(0.08, 0.08, 0.08, 1.0) 
+    glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+    # Las matrices se reconstruyen solo si la cámara cambió (ver camera.py)
+    camera.set_viewport(window_width, window_height)
+    camera.update()
+    with profiler.scope('resolve_picks'):
+        resolve_picks()
+    with profiler.scope('apply_drag'):
+        apply_drag()
+    with profiler.scope('update_video_texture'):
         update_video_texture()
+    with profiler.scope('update_control_texture'):
         update_control_texture()
-        draw_cube()
+    with profiler.scope('draw_cube'):
+        draw_cube(camera.view, camera.projection)
+    profiler_overlay.draw(window_width, window_height)
+    gldebug.check("render_frame")
+
+def shutdown():
+    if profile_path:
+        profiler.export(profile_path)
+    profiler.release()
+    if source:
+        source.close()
+    for tex in (face_textures, text_atlas, renderer, id_buffer):
+        if tex:
+            tex.release()
+    pygame.mixer.quit()
+    if headless_context:
+        headless_context.release()
+    else:
+        glfw.terminate()
+
+def schedule_next_frame():
+    """Programa el próximo frame: video, segundero de la etiqueta de tiempo u overlay"""
+    if profiler_overlay.visible:
+        governor.invalidate('overlay')
+    if id_buffer.pending:
+        governor.invalidate('pick')  # el resultado llega en uno de los próximos frames
+    if camera.animating:
+        governor.invalidate('camera')
+    if is_playing and frame_scheduler is not None:
+        governor.schedule_in(frame_scheduler.time_to_next(1.0 / source.fps), 'video')
+        # La etiqueta de tiempo cambia al pasar cada segundo aunque no haya frames de video
+        governor.schedule_in(1.0 - playback_clock.now() % 1.0, 'clock')
+
+def swap_buffers(window):
+    if headless_context:
+        headless_context.swap()
+    else:
         glfw.swap_buffers(window)
 
-    if cap and cap.isOpened():
-        cap.release()
-    pygame.mixer.quit()
-    glfw.terminate()
+def run_loop(window, should_close):
+    # Los eventos que despiertan al governor se procesan mientras espera; los
+    # que llegan con el frame ya vencido, al empezar el frame
+    while not should_close():
+        if not governor.wait():
+            continue
+        profiler.begin_frame()
+        with profiler.scope('poll_events'):
+            governor.poll_events()
+        render_frame()
+        with profiler.scope('swap_buffers'):
+            swap_buffers(window)
+        profiler.end_frame()
+        governor.frame_done()
+        schedule_next_frame()
+
+def main():
+    window = setup()
+    run_loop(window, lambda: glfw.window_should_close(window))
+    shutdown()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
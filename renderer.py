@@ -0,0 +1,552 @@
+import ctypes
+import os
+
+import numpy as np
+from OpenGL.GL import *
+
+from transforms import to_gl
+
+TEX_COORDS = [(0, 0), (1, 0), (1, 1), (0, 1)]
+QUAD_INDICES = np.array([0, 1, 2, 0, 2, 3], dtype=np.uint32)
+
+MAX_LAYERS = 128  # capas como máximo: los arrays de uniforms por capa se dimensionan con cada array
+MODE_RGB, MODE_YUV, MODE_COLOR = 0, 1, 2  # cómo se lee cada capa (u_layer_params[capa].z)
+SOFTWARE_RASTERIZERS = ('llvmpipe', 'softpipe', 'swrast', 'swiftshader')
+
+# Todas las caras en una llamada: la capa del GL_TEXTURE_2D_ARRAY va como atributo
+# por vértice y los parámetros de cada capa (ver facetextures.FaceTextureArray) en uniforms.
+# Modos: 0 = RGBA, 1 = YUV 4:2:0 (BT.601, rango limitado) con disposición I420
+# (Y arriba, U y V lado a lado debajo), 2 = color liso
+LAYER_VERTEX_FUNCTIONS = """
+uniform float u_layer_side;               // lado de las capas en texeles
+uniform vec4 u_layer_params[MAX_LAYERS];  // escala u, escala v, modo, flags (1 invertir y, 2 mipmaps)
+out vec2 v_texcoord;
+out vec2 v_chroma;
+flat out vec4 v_bounds;                   // mínimo y máximo de v_texcoord
+flat out vec4 v_chroma_bounds;
+flat out int v_layer;
+flat out int v_mode;
+flat out float v_lod_bias;
+void emit_layer(int layer, vec2 texcoord) {
+    v_layer = layer;
+    vec4 params = u_layer_params[layer];
+    v_mode = int(params.z + 0.5);
+    // La inversión vertical de los frames se resuelve aquí y no en la CPU
+    vec2 uv = mod(params.w, 2.0) > 0.5 ? vec2(texcoord.x, 1.0 - texcoord.y) : texcoord;
+    // Solo las capas con mipmaps propios los usan; el resto se lee siempre del nivel 0
+    v_lod_bias = params.w > 1.5 ? 0.0 : -16.0;
+    // El contenido ocupa la esquina (0, 0) de la capa; los límites dejan medio texel
+    // de margen para que el filtro lineal no lea fuera de él
+    vec2 half_texel = vec2(0.5 / u_layer_side);
+    vec2 scale = v_mode == 1 ? vec2(1.0, 2.0 / 3.0) : vec2(1.0);  // el array YUV mide 1.5 lados de alto
+    v_texcoord = uv * params.xy * scale;
+    v_bounds = vec4(half_texel * scale, max(params.xy - half_texel, half_texel) * scale);
+    vec2 chroma_origin = vec2(0.0, 2.0 / 3.0);
+    v_chroma = chroma_origin + uv * params.xy * 0.5 * scale;
+    v_chroma_bounds = vec4(chroma_origin + half_texel * scale,
+                           chroma_origin + max(params.xy * 0.5 - half_texel, half_texel) * scale);
+}
+"""
+
+VERTEX_SHADER = """
+#version 330 core
+#define MAX_LAYERS 16
+layout(location = 0) in vec3 a_position;
+layout(location = 1) in vec2 a_texcoord;
+layout(location = 2) in float a_layer;
+uniform mat4 u_mvp;
+""" + LAYER_VERTEX_FUNCTIONS + """
+void main() {
+    emit_layer(int(a_layer + 0.5), a_texcoord);
+    gl_Position = u_mvp * vec4(a_position, 1.0);
+}
+"""
+
+# Las mismas caras repetidas por instancia (ShaderRenderer.draw_instances): el atributo
+# por vértice dice qué cara del cubo es y cada instancia trae su matriz de modelo y la
+# capa de cada cara. u_pass descarta las caras de un modo para dibujar RGB y YUV por separado
+INSTANCED_VERTEX_SHADER = """
+#version 330 core
+#define MAX_LAYERS 16
+layout(location = 0) in vec3 a_position;
+layout(location = 1) in vec2 a_texcoord;
+layout(location = 2) in float a_slot;
+layout(location = 3) in mat4 a_model;     // ocupa las posiciones 3 a 6
+layout(location = 7) in vec4 a_layers;    // capa de cada cara de la instancia
+uniform mat4 u_mvp;                       // proyección · vista
+uniform int u_pass;                       // 0 todas las caras, 1 las que no son YUV, 2 solo YUV
+""" + LAYER_VERTEX_FUNCTIONS + """
+void main() {
+    emit_layer(int(a_layers[int(a_slot + 0.5)] + 0.5), a_texcoord);
+    gl_Position = u_mvp * a_model * vec4(a_position, 1.0);
+    if (u_pass != 0 && (v_mode == 1) != (u_pass == 2)) {
+        gl_Position = vec4(2.0, 2.0, 2.0, 1.0);  // fuera del volumen de recorte: el triángulo no se rasteriza
+    }
+}
+"""
+
+FRAGMENT_SHADER = """
+#version 330 core
+#define MAX_LAYERS 16
+in vec2 v_texcoord;
+in vec2 v_chroma;
+flat in vec4 v_bounds;
+flat in vec4 v_chroma_bounds;
+flat in int v_layer;
+flat in int v_mode;
+flat in float v_lod_bias;
+uniform sampler2DArray u_faces;
+uniform sampler2DArray u_faces_yuv;
+uniform vec4 u_layer_colors[MAX_LAYERS];
+out vec4 frag_color;
+vec4 sample_rgb(vec2 uv, float layer) {
+    return texture(u_faces, vec3(uv, layer), v_lod_bias);
+}
+vec4 sample_yuv(vec2 uv, float layer) {
+    vec2 chroma = clamp(v_chroma, v_chroma_bounds.xy, v_chroma_bounds.zw);
+    float y = 1.16438 * (texture(u_faces_yuv, vec3(uv, layer)).r - 0.0625);
+    float u = texture(u_faces_yuv, vec3(chroma, layer)).r - 0.5;
+    float v = texture(u_faces_yuv, vec3(chroma + vec2(0.5, 0.0), layer)).r - 0.5;
+    vec3 rgb = vec3(y + 1.59603 * v,
+                    y - 0.39176 * u - 0.81297 * v,
+                    y + 2.01723 * u);
+    return vec4(clamp(rgb, 0.0, 1.0), 1.0);
+}
+void main() {
+    float layer = float(v_layer);
+    vec2 uv = clamp(v_texcoord, v_bounds.xy, v_bounds.zw);
+    if (v_mode == 2) {
+        frag_color = u_layer_colors[v_layer];
+        return;
+    }
+#if defined(HAS_RGB) && defined(HAS_YUV)
+    frag_color = v_mode == 0 ? sample_rgb(uv, layer) : sample_yuv(uv, layer);
+#elif defined(HAS_YUV)
+    frag_color = sample_yuv(uv, layer);
+#elif defined(HAS_RGB)
+    frag_color = sample_rgb(uv, layer);
+#endif
+}
+"""
+
+
+def _with_defines(src, layers, defines=()):
+    header = f"#define MAX_LAYERS {layers}\n" + "".join(f"#define {name}\n" for name in defines)
+    return src.replace("#define MAX_LAYERS 16\n", header, 1)
+
+
+def vertex_shader(layers, instanced=False):
+    """VERTEX_SHADER (o INSTANCED_VERTEX_SHADER) con los uniforms por capa del tamaño del array"""
+    return _with_defines(INSTANCED_VERTEX_SHADER if instanced else VERTEX_SHADER, layers)
+
+
+def fragment_shader(rgb, yuv, layers=16):
+    """FRAGMENT_SHADER solo con los modos que usan las capas: los rasterizadores por
+    software (llvmpipe) ejecutan las lecturas de textura de las ramas no tomadas"""
+    defines = [name for name, used in (("HAS_RGB", rgb), ("HAS_YUV", yuv)) if used]
+    return _with_defines(FRAGMENT_SHADER, layers, defines)
+
+
+def compile_program(vertex_src, fragment_src):
+    """Compila y enlaza un programa de shaders; lanza RuntimeError con el log si falla"""
+    shaders = []
+    for kind, src in ((GL_VERTEX_SHADER, vertex_src), (GL_FRAGMENT_SHADER, fragment_src)):
+        shader = glCreateShader(kind)
+        glShaderSource(shader, src)
+        glCompileShader(shader)
+        if not glGetShaderiv(shader, GL_COMPILE_STATUS):
+            log = glGetShaderInfoLog(shader)
+            raise RuntimeError(f"Error compilando shader: {log.decode() if isinstance(log, bytes) else log}")
+        shaders.append(shader)
+    program = glCreateProgram()
+    for shader in shaders:
+        glAttachShader(program, shader)
+    glLinkProgram(program)
+    for shader in shaders:
+        glDetachShader(program, shader)
+        glDeleteShader(shader)
+    if not glGetProgramiv(program, GL_LINK_STATUS):
+        log = glGetProgramInfoLog(program)
+        raise RuntimeError(f"Error enlazando programa: {log.decode() if isinstance(log, bytes) else log}")
+    return program
+
+
+class ShaderProgram:
+    def __init__(self, vertex_src, fragment_src, samplers):
+        self.id = compile_program(vertex_src, fragment_src)
+        self.u_mvp = glGetUniformLocation(self.id, "u_mvp")
+        self.u_layer_side = glGetUniformLocation(self.id, "u_layer_side")
+        self.u_layer_params = glGetUniformLocation(self.id, "u_layer_params")
+        self.u_layer_colors = glGetUniformLocation(self.id, "u_layer_colors")
+        self.u_pass = glGetUniformLocation(self.id, "u_pass")  # -1 si no es el programa instanciado
+        glUseProgram(self.id)
+        for unit, name in enumerate(samplers):
+            glUniform1i(glGetUniformLocation(self.id, name), unit)
+        glUseProgram(0)
+
+    def release(self):
+        glDeleteProgram(self.id)
+
+
+class QuadFace:
+    """Cara de 4 vértices de renderer.vertices con la interfaz de FaceMesh"""
+
+    texcoords = np.array(TEX_COORDS, dtype=np.float32)
+    indices = QUAD_INDICES
+
+    def __init__(self, vertices, corners):
+        self.vertices = vertices
+        self.corners = corners
+        self.version = 0
+
+    @property
+    def positions(self):
+        return np.ascontiguousarray(self.vertices[self.corners], dtype=np.float32)
+
+
+class InstanceBuffer:
+    """Datos por instancia para ShaderRenderer.draw_instances: la matriz de modelo
+    y la capa de cada cara (hasta 4) de cada instancia. version cambia con cada
+    set() y el renderer vuelve a subir el buffer solo entonces.
+    """
+
+    stride = 20  # floats: matriz 4x4 en orden de columnas + 4 capas
+
+    def __init__(self, capacity):
+        self.data = np.zeros((capacity, self.stride), dtype=np.float32)
+        self.count = 0
+        self.version = 0
+
+    @property
+    def capacity(self):
+        return len(self.data)
+
+    def set(self, i, model=None, layers=None):
+        """Cambia la instancia i (model en fila mayor, como transforms); amplía count si hace falta"""
+        if model is not None:
+            self.data[i, :16] = to_gl(model).ravel()
+        if layers is not None:
+            self.data[i, 16:16 + len(layers)] = layers
+        self.count = max(self.count, i + 1)
+        self.version += 1
+
+
+class ImmediateRenderer:
+    """Camino clásico con glBegin/glEnd y la pila de matrices de función fija"""
+
+    name = 'immediate'
+    supports_yuv = False
+    supports_texture_arrays = False
+
+    def __init__(self, vertices=None, faces=None):
+        self.vertices = vertices
+        self.faces = faces
+
+    def invalidate(self):
+        pass
+
+    def _set_color(self, color, flip_y=False):
+        if color is None:
+            glEnable(GL_TEXTURE_2D)
+            glColor3f(1.0, 1.0, 1.0)
+        else:
+            glDisable(GL_TEXTURE_2D)
+            glColor3fv(color)
+        # La inversión vertical se hace con la matriz de textura
+        glMatrixMode(GL_TEXTURE)
+        glLoadIdentity()
+        if flip_y:
+            glTranslatef(0.0, 1.0, 0.0)
+            glScalef(1.0, -1.0, 1.0)
+        glMatrixMode(GL_MODELVIEW)
+
+    def begin(self, view, projection):
+        glMatrixMode(GL_PROJECTION)
+        glLoadMatrixf(to_gl(projection))
+        glMatrixMode(GL_MODELVIEW)
+        glLoadMatrixf(to_gl(view))
+
+    def draw_face(self, face, color=None, flip_y=False, yuv=False):
+        if yuv:
+            raise RuntimeError("El renderer inmediato no soporta texturas YUV")
+        self._set_color(color, flip_y)
+        glBegin(GL_QUADS)
+        for i, idx in enumerate(self.faces[face]):
+            glTexCoord2f(*TEX_COORDS[i])
+            glVertex3fv(self.vertices[idx])
+        glEnd()
+        glDisable(GL_TEXTURE_2D)
+
+    def draw_mesh(self, mesh, color=None, flip_y=False, yuv=False):
+        if yuv:
+            raise RuntimeError("El renderer inmediato no soporta texturas YUV")
+        self._set_color(color, flip_y)
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glEnableClientState(GL_TEXTURE_COORD_ARRAY)
+        glVertexPointer(3, GL_FLOAT, 0, mesh.positions)
+        glTexCoordPointer(2, GL_FLOAT, 0, mesh.texcoords)
+        glDrawElements(GL_TRIANGLES, len(mesh.indices), GL_UNSIGNED_INT, mesh.indices)
+        glDisableClientState(GL_TEXTURE_COORD_ARRAY)
+        glDisableClientState(GL_VERTEX_ARRAY)
+        glDisable(GL_TEXTURE_2D)
+
+    def draw_faces(self, faces):
+        """Una llamada y un bind por cara: faces = [(cara o FaceMesh, FaceTexture)]"""
+        for geometry, texture in faces:
+            texture.bind()
+            if hasattr(geometry, 'indices'):
+                self.draw_mesh(geometry, texture.color, texture.flip_y)
+            else:
+                self.draw_face(geometry, texture.color, texture.flip_y)
+
+    def end(self):
+        glMatrixMode(GL_TEXTURE)
+        glLoadIdentity()
+        glMatrixMode(GL_MODELVIEW)
+        glColor3f(1.0, 1.0, 1.0)
+
+    def release(self):
+        pass
+
+
+class ShaderRenderer:
+    """Caras en VBO/VAO con un programa de shaders y las texturas en un
+    FaceTextureArray: todas las caras de un draw_faces() en una sola llamada.
+
+    La geometría de cada combinación de caras se arma una vez; después solo
+    se vuelven a subir las posiciones de las caras que cambiaron (FaceMesh.version
+    o invalidate() para las caras de 4 vértices de vertices/faces).
+    """
+
+    name = 'shader'
+    supports_yuv = True
+    supports_texture_arrays = True
+
+    def __init__(self, vertices=None, faces=None):
+        self.vertices = vertices
+        self.faces = faces or {}
+        self.quads = {face: QuadFace(vertices, corners) for face, corners in self.faces.items()}
+        self.uploads = 0
+        self.draw_calls = 0
+        # ids de (geometría, capa) -> [vao, vbo posiciones, vbo uv+capa, ibo, índices,
+        #                             geometrías, primer vértice de cada una, versiones subidas]
+        self.batches = {}
+        self.programs = {}  # (hay RGB, hay YUV, capas, instanciado) -> ShaderProgram, se compilan al usarse
+        self.instance_buffers = {}  # id(InstanceBuffer) -> [vbo, capacidad, versión subida]
+        self.program = None
+        self.mvp = None
+        # En los rasterizadores por software mezclar RGB y YUV en una llamada hace que
+        # cada fragmento lea las cuatro texturas: ahí se separa en una llamada por modo
+        renderer = (glGetString(GL_RENDERER) or b'').decode(errors='replace').lower()
+        self.split_modes = any(name in renderer for name in SOFTWARE_RASTERIZERS)
+
+    def invalidate(self):
+        for quad in self.quads.values():
+            quad.version += 1
+
+    def _geometry(self, geometry):
+        return geometry if hasattr(geometry, 'indices') else self.quads[geometry]
+
+    def _batch_buffers(self, parts, tag=None):
+        # tag separa las geometrías instanciadas, cuyo VAO lleva además los atributos por instancia
+        key = (tag,) + tuple((id(mesh), layer) for mesh, layer in parts)
+        entry = self.batches.get(key)
+        if entry is None:
+            meshes = [mesh for mesh, _ in parts]
+            firsts = np.cumsum([0] + [len(mesh.positions) for mesh in meshes])
+            positions = np.concatenate([mesh.positions for mesh in meshes])
+            attributes = np.concatenate([
+                np.hstack([mesh.texcoords, np.full((len(mesh.texcoords), 1), layer, dtype=np.float32)])
+                for mesh, layer in parts]).astype(np.float32)
+            indices = np.concatenate([mesh.indices + np.uint32(first)
+                                      for mesh, first in zip(meshes, firsts)]).astype(np.uint32)
+            vao = glGenVertexArrays(1)
+            pos_vbo, attr_vbo, ibo = glGenBuffers(3)
+            glBindVertexArray(vao)
+            glBindBuffer(GL_ARRAY_BUFFER, pos_vbo)
+            glBufferData(GL_ARRAY_BUFFER, positions.nbytes, positions, GL_DYNAMIC_DRAW)
+            glEnableVertexAttribArray(0)
+            glVertexAttribPointer(0, 3, GL_FLOAT, GL_FALSE, 0, ctypes.c_void_p(0))
+            glBindBuffer(GL_ARRAY_BUFFER, attr_vbo)
+            glBufferData(GL_ARRAY_BUFFER, attributes.nbytes, attributes, GL_STATIC_DRAW)
+            glEnableVertexAttribArray(1)
+            glVertexAttribPointer(1, 2, GL_FLOAT, GL_FALSE, 12, ctypes.c_void_p(0))
+            glEnableVertexAttribArray(2)
+            glVertexAttribPointer(2, 1, GL_FLOAT, GL_FALSE, 12, ctypes.c_void_p(8))
+            glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, ibo)
+            glBufferData(GL_ELEMENT_ARRAY_BUFFER, indices.nbytes, indices, GL_STATIC_DRAW)
+            glBindVertexArray(0)
+            glBindBuffer(GL_ARRAY_BUFFER, 0)
+            entry = self.batches[key] = [vao, pos_vbo, attr_vbo, ibo, len(indices),
+                                         meshes, firsts, [mesh.version for mesh in meshes], None]
+            self.uploads += 1
+            return entry
+        # Solo cambian las posiciones: las UV, las capas y los índices son estáticos
+        meshes, firsts, versions = entry[5], entry[6], entry[7]
+        bound = False
+        for i, mesh in enumerate(meshes):
+            if versions[i] == mesh.version:
+                continue
+            if not bound:
+                glBindBuffer(GL_ARRAY_BUFFER, entry[1])
+                bound = True
+            positions = mesh.positions
+            glBufferSubData(GL_ARRAY_BUFFER, int(firsts[i]) * 12, positions.nbytes, positions)
+            versions[i] = mesh.version
+            self.uploads += 1
+        if bound:
+            glBindBuffer(GL_ARRAY_BUFFER, 0)
+        return entry
+
+    def begin(self, view, projection):
+        self.mvp = to_gl(projection @ view)
+        self.program = None
+
+    def _use(self, modes, layers, instanced=False):
+        rgb, yuv = MODE_RGB in modes, MODE_YUV in modes
+        key = (rgb, yuv, layers, instanced)
+        program = self.programs.get(key)
+        if program is None:
+            program = self.programs[key] = ShaderProgram(vertex_shader(layers, instanced),
+                                                         fragment_shader(rgb, yuv, layers),
+                                                         ["u_faces", "u_faces_yuv"])
+        if program is not self.program:
+            glUseProgram(program.id)
+            glUniformMatrix4fv(program.u_mvp, 1, GL_FALSE, self.mvp)
+            self.program = program
+        return program
+
+    def draw_faces(self, faces):
+        """Dibuja faces = [(cara o FaceMesh, FaceLayer)] con una llamada y un bind
+        (dos llamadas si split_modes y hay caras RGB y YUV).
+
+        Todas las capas tienen que ser del mismo FaceTextureArray.
+        """
+        if not faces:
+            return
+        if self.split_modes:
+            yuv = [item for item in faces if item[1].mode == MODE_YUV]
+            if yuv and len(yuv) < len(faces):
+                self._draw_batch([item for item in faces if item[1].mode != MODE_YUV])
+                self._draw_batch(yuv, bind=False)
+                return
+        self._draw_batch(faces)
+
+    def _draw_batch(self, faces, bind=True):
+        array = faces[0][1].array
+        entry = self._batch_buffers([(self._geometry(geometry), layer.index) for geometry, layer in faces])
+        program = self._use({layer.mode for _, layer in faces}, len(array))
+        self._set_layers(program, array)
+        if bind:
+            array.bind()
+        glBindVertexArray(entry[0])
+        glDrawElements(GL_TRIANGLES, entry[4], GL_UNSIGNED_INT, ctypes.c_void_p(0))
+        glBindVertexArray(0)
+        self.draw_calls += 1
+
+    def _set_layers(self, program, array):
+        glUniform1f(program.u_layer_side, array.layer_size)
+        glUniform4fv(program.u_layer_params, len(array), array.params)
+        glUniform4fv(program.u_layer_colors, len(array), array.colors)
+
+    def _instance_vbo(self, instances):
+        entry = self.instance_buffers.get(id(instances))
+        if entry is None:
+            entry = self.instance_buffers[id(instances)] = [glGenBuffers(1), 0, None]
+        if entry[2] == instances.version:
+            return entry[0]
+        glBindBuffer(GL_ARRAY_BUFFER, entry[0])
+        data = instances.data
+        if entry[1] != len(data):
+            glBufferData(GL_ARRAY_BUFFER, data.nbytes, data, GL_DYNAMIC_DRAW)
+            entry[1] = len(data)
+        else:
+            glBufferSubData(GL_ARRAY_BUFFER, 0, instances.count * data.strides[0], data)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        entry[2] = instances.version
+        self.uploads += 1
+        return entry[0]
+
+    def _attach_instances(self, entry, vbo):
+        # Atributos por instancia (divisor 1) en el VAO de la geometría; se hace una vez por buffer
+        if entry[8] == vbo:
+            return
+        stride = InstanceBuffer.stride * 4
+        glBindVertexArray(entry[0])
+        glBindBuffer(GL_ARRAY_BUFFER, vbo)
+        for i in range(5):  # 4 columnas de la matriz de modelo y las capas
+            glEnableVertexAttribArray(3 + i)
+            glVertexAttribPointer(3 + i, 4, GL_FLOAT, GL_FALSE, stride, ctypes.c_void_p(16 * i))
+            glVertexAttribDivisor(3 + i, 1)
+        glBindVertexArray(0)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        entry[8] = vbo
+
+    def draw_instances(self, faces, array, instances):
+        """Dibuja las caras faces = [cara o FaceMesh] una vez por instancia con
+        glDrawElementsInstanced. La cara faces[i] de cada instancia usa la capa
+        instances.data[instancia, 16 + i] de array (un FaceTextureArray).
+
+        Con split_modes y capas RGB e YUV mezcladas son dos llamadas: cada una
+        descarta en el vertex shader las caras del otro modo.
+        """
+        if not instances.count:
+            return
+        entry = self._batch_buffers([(self._geometry(geometry), slot) for slot, geometry in enumerate(faces)],
+                                    tag='instanced')
+        self._attach_instances(entry, self._instance_vbo(instances))
+        used = array.params[np.unique(instances.data[:instances.count, 16:16 + len(faces)].astype(np.intp)), 2]
+        modes = set(np.rint(used).astype(int).tolist())
+        if self.split_modes and MODE_YUV in modes and len(modes) > 1:
+            passes = [(modes - {MODE_YUV}, 1), ({MODE_YUV}, 2)]
+        else:
+            passes = [(modes, 0)]
+        array.bind()
+        glBindVertexArray(entry[0])
+        for pass_modes, pass_id in passes:
+            program = self._use(pass_modes, len(array), instanced=True)
+            self._set_layers(program, array)
+            glUniform1i(program.u_pass, pass_id)
+            glDrawElementsInstanced(GL_TRIANGLES, entry[4], GL_UNSIGNED_INT, ctypes.c_void_p(0),
+                                    instances.count)
+            self.draw_calls += 1
+        glBindVertexArray(0)
+
+    def release_instances(self, instances):
+        entry = self.instance_buffers.pop(id(instances), None)
+        if entry is None:
+            return
+        glDeleteBuffers(1, [entry[0]])
+        for batch in self.batches.values():
+            if batch[8] == entry[0]:
+                batch[8] = None
+
+    def end(self):
+        glUseProgram(0)
+        self.program = None
+
+    def release(self):
+        for vao, pos_vbo, attr_vbo, ibo, *_ in self.batches.values():
+            glDeleteBuffers(3, [pos_vbo, attr_vbo, ibo])
+            glDeleteVertexArrays(1, [vao])
+        self.batches.clear()
+        for vbo, *_ in self.instance_buffers.values():
+            glDeleteBuffers(1, [vbo])
+        self.instance_buffers.clear()
+        for program in self.programs.values():
+            program.release()
+        self.programs.clear()
+
+
+RENDERERS = {
+    ImmediateRenderer.name: ImmediateRenderer,
+    ShaderRenderer.name: ShaderRenderer,
+}
+
+
+def create_renderer(vertices=None, faces=None, mode=None):
+    """Crea el renderer indicado (o el de la variable CUBE_RENDERER); 'shader' por defecto"""
+    mode = mode or os.environ.get('CUBE_RENDERER', 'shader')
+    if mode not in RENDERERS:
+        raise ValueError(f"Renderer desconocido: {mode} (opciones: {', '.join(RENDERERS)})")
+    return RENDERERS[mode](vertices, faces)
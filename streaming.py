@@ -0,0 +1,194 @@
+import ctypes
+import time
+
+import numpy as np
+
+import gldebug
+from OpenGL.GL import *
+
+
+class PixelBufferRing:
+    """Dos pixel buffer objects que se usan de forma alternada para subir texturas:
+    mientras la GPU copia desde uno, la CPU escribe en el otro."""
+
+    def __init__(self, label=None):
+        self.pbos = list(glGenBuffers(2))
+        self.size = 0
+        self.index = 0
+        if label:
+            self.set_label(label)
+
+    def set_label(self, label):
+        for pbo in self.pbos:
+            gldebug.label(GL_BUFFER, pbo, f"{label} (PBO)")
+
+    def allocate(self, nbytes):
+        for pbo in self.pbos:
+            glBindBuffer(GL_PIXEL_UNPACK_BUFFER, pbo)
+            glBufferData(GL_PIXEL_UNPACK_BUFFER, nbytes, None, GL_STREAM_DRAW)
+        glBindBuffer(GL_PIXEL_UNPACK_BUFFER, 0)
+        self.size = nbytes
+
+    def stage(self, data, nbytes):
+        """Copia data al siguiente PBO y lo deja enlazado a GL_PIXEL_UNPACK_BUFFER.
+
+        Devuelve False si no se pudo mapear (la subida tiene que ir desde la
+        memoria del cliente); con True hay que llamar a glTexSubImage con el
+        offset 0 y después a unbind().
+        """
+        if nbytes > self.size:
+            # Filas con relleno: los PBOs crecen hasta el tamaño del buffer del decodificador
+            self.allocate(nbytes)
+        pbo = self.pbos[self.index]
+        self.index ^= 1
+        glBindBuffer(GL_PIXEL_UNPACK_BUFFER, pbo)
+        # Invalidar evita esperar a que la GPU termine de leer el contenido anterior
+        ptr = glMapBufferRange(GL_PIXEL_UNPACK_BUFFER, 0, nbytes,
+                               GL_MAP_WRITE_BIT | GL_MAP_INVALIDATE_BUFFER_BIT)
+        if not ptr:
+            glBindBuffer(GL_PIXEL_UNPACK_BUFFER, 0)
+            return False
+        ctypes.memmove(ptr, data.ctypes.data, nbytes)
+        glUnmapBuffer(GL_PIXEL_UNPACK_BUFFER)
+        return True
+
+    def unbind(self):
+        glBindBuffer(GL_PIXEL_UNPACK_BUFFER, 0)
+
+    def release(self):
+        glDeleteBuffers(len(self.pbos), self.pbos)
+        self.pbos = []
+
+
+class UploadMeter:
+    """Contadores de subida: total de bytes y tasa medida en ventanas de un segundo"""
+
+    def __init__(self):
+        self.uploads = 0
+        self.bytes_uploaded = 0
+        self.bytes_per_second = 0.0
+        self._window_start = time.monotonic()
+        self._window_bytes = 0
+
+    def _account(self, nbytes):
+        self.uploads += 1
+        self.bytes_uploaded += nbytes
+        self._window_bytes += nbytes
+        now = time.monotonic()
+        elapsed = now - self._window_start
+        if elapsed >= 1.0:
+            self.bytes_per_second = self._window_bytes / elapsed
+            self._window_bytes = 0
+            self._window_start = now
+
+
+class StreamingTexture(UploadMeter):
+    """Textura para contenido que cambia cada frame (video, panel de control).
+
+    El almacenamiento se reserva una sola vez por resolución y cada frame se
+    actualiza con glTexSubImage2D desde un PixelBufferRing.
+    """
+
+    def __init__(self, channels=3, min_filter=GL_LINEAR, mag_filter=GL_LINEAR, use_pbo=True,
+                 pixel_format=None):
+        super().__init__()
+        if channels == 4:
+            self.internal_format, self.format = GL_RGBA8, GL_RGBA
+        elif channels == 3:
+            self.internal_format, self.format = GL_RGB8, GL_RGB
+        elif channels == 1:
+            self.internal_format, self.format = GL_R8, GL_RED
+        else:
+            raise ValueError(f"Número de canales no soportado: {channels}")
+        if pixel_format is not None:
+            # Por ejemplo GL_BGR para subir los frames de OpenCV sin cvtColor
+            self.format = pixel_format
+        self.channels = channels
+        self.id = glGenTextures(1)
+        self.size = None
+        self.label = None
+        self.use_pbo = use_pbo and bool(glGenBuffers)
+        self.pbos = None  # PixelBufferRing, se crea con el primer almacenamiento
+        self.allocations = 0
+
+        glBindTexture(GL_TEXTURE_2D, self.id)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, min_filter)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, mag_filter)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
+
+    def _allocate(self, width, height):
+        glBindTexture(GL_TEXTURE_2D, self.id)
+        glTexImage2D(GL_TEXTURE_2D, 0, self.internal_format, width, height, 0,
+                     self.format, GL_UNSIGNED_BYTE, None)
+        self.size = (width, height)
+        self.allocations += 1
+        if self.use_pbo:
+            if self.pbos is None:
+                self.pbos = PixelBufferRing(self.label)
+            self.pbos.allocate(width * height * self.channels)
+
+    def set_label(self, label):
+        """Nombre de la textura y sus PBOs en los mensajes de depuración de GL"""
+        self.label = label
+        gldebug.label(GL_TEXTURE, self.id, label)  # la textura ya existe: se enlazó en __init__
+        if self.pbos is not None:
+            self.pbos.set_label(label)
+
+    def upload(self, data, width=None):
+        """Sube un frame completo (h, w, canales); reserva memoria solo si cambia el tamaño.
+
+        Si width es menor que el ancho de data, las columnas sobrantes se tratan
+        como relleno de fila (linesize del decodificador) y no se suben.
+        """
+        h, row_length = data.shape[:2]
+        w = width or row_length
+        if self.size != (w, h):
+            self._allocate(w, h)
+        self._sub_image(0, 0, w, h, data, row_length if row_length != w else 0)
+
+    def update_region(self, x, y, data):
+        """Sube solo el rectángulo (x, y, w, h) de la textura ya reservada"""
+        if self.size is None:
+            raise RuntimeError("La textura no tiene almacenamiento reservado")
+        h, w = data.shape[:2]
+        self._sub_image(x, y, w, h, data)
+
+    def _sub_image(self, x, y, w, h, data, row_length=0):
+        data = np.ascontiguousarray(data, dtype=np.uint8)
+        nbytes = data.nbytes
+        glBindTexture(GL_TEXTURE_2D, self.id)
+        glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
+        glPixelStorei(GL_UNPACK_ROW_LENGTH, row_length)
+        try:
+            self._transfer(x, y, w, h, data, nbytes)
+        finally:
+            if row_length:
+                glPixelStorei(GL_UNPACK_ROW_LENGTH, 0)
+        self._account(w * h * self.channels)
+
+    def _transfer(self, x, y, w, h, data, nbytes):
+        if self.pbos is not None and self.pbos.stage(data, nbytes):
+            glTexSubImage2D(GL_TEXTURE_2D, 0, x, y, w, h, self.format,
+                            GL_UNSIGNED_BYTE, ctypes.c_void_p(0))
+            self.pbos.unbind()
+            return
+        glTexSubImage2D(GL_TEXTURE_2D, 0, x, y, w, h, self.format, GL_UNSIGNED_BYTE, data)
+
+    def stats(self):
+        return {
+            'size': self.size,
+            'allocations': self.allocations,
+            'uploads': self.uploads,
+            'bytes_uploaded': self.bytes_uploaded,
+            'bytes_per_second': self.bytes_per_second,
+        }
+
+    def bind(self):
+        glBindTexture(GL_TEXTURE_2D, self.id)
+
+    def release(self):
+        if self.pbos is not None:
+            self.pbos.release()
+            self.pbos = None
+        glDeleteTextures([self.id])
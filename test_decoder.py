@@ -0,0 +1,43 @@
+import threading
+
+from decoder import FrameRing
+
+
+def test_push_after_clear_drops_stale_generation():
+    ring = FrameRing(2)
+    ring.push((30.0, 'viejo'))
+    ring.push((30.1, 'viejo'))
+    generation = ring.generation
+    pushed = threading.Event()
+
+    def producer():
+        # Frame decodificado antes del seek, esperando espacio en el buffer lleno
+        ring.push((30.2, 'viejo'), block=True, generation=generation)
+        pushed.set()
+
+    thread = threading.Thread(target=producer)
+    thread.start()
+    ring.clear()
+    thread.join(1.0)
+    assert pushed.is_set()
+    assert ring.depth == 0
+    assert ring.stale == 1
+
+
+def test_pop_due_skips_frames_from_before_a_rewind():
+    ring = FrameRing(4)
+    ring.push((30.2, 'viejo'))
+    for pts in (20.0, 20.07, 20.14):
+        ring.push((pts, 'nuevo'))
+    assert ring.pop_due(20.1) is None  # sin max_ahead el frame viejo tapa a los nuevos
+    assert ring.pop_due(20.1, max_ahead=1 / 30) == (20.07, 'nuevo')
+    assert ring.depth == 1
+    assert ring.next_pts() == 20.14
+
+
+def test_pop_due_keeps_future_frames_in_order():
+    ring = FrameRing(4)
+    for pts in (1.0, 1.5, 2.0):
+        ring.push((pts, pts))
+    assert ring.pop_due(0.5, max_ahead=1 / 30) is None
+    assert ring.depth == 3
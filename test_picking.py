@@ -0,0 +1,44 @@
+import numpy as np
+
+from picking import ScreenGrid, VertexPicker
+
+VIEWPORT = (0, 0, 100, 100)
+# w = z: un vértice con z apenas positivo se proyecta a coordenadas enormes
+MVP = np.array([
+    [1.0, 0.0, 0.0, 0.0],
+    [0.0, 1.0, 0.0, 0.0],
+    [0.0, 0.0, 1.0, 0.0],
+    [0.0, 0.0, 1.0, 0.0],
+])
+POINTS = np.array([
+    [0.0, 0.0, 1.0],    # (50, 50)
+    [0.2, 0.0, 1.0],    # (60, 50)
+    [3.0, 0.0, 1.0],    # (200, 50): fuera del viewport y del margen
+    [1.0, 0.0, 2e-9],   # w apenas positivo: x ~ 2.5e10
+])
+
+
+def test_screen_grid_bounds_skip_far_points():
+    positions = np.array([[10.0, 10.0], [90.0, 90.0], [1e15, 50.0]])
+    valid = np.ones(len(positions), dtype=bool)
+    grid = ScreenGrid(positions, valid, cell_size=32, bounds=(0, 0, 100, 100))
+    assert sorted(grid.indices.tolist()) == [0, 1]
+    assert grid.cols == 3
+    assert sorted(grid.candidates(0, 0, 100, 100).tolist()) == [0, 1]
+
+
+def test_nearest_ignores_points_outside_the_viewport():
+    picker = VertexPicker()
+    picker.update(POINTS, MVP, VIEWPORT)
+    assert picker.valid[3] and picker.window[3, 0] > 1e10
+    assert picker.nearest(51, 50) == 0
+    assert picker.nearest(200, 50) is None
+    assert picker.nearest(99, 50) is None
+
+
+def test_select_box_returns_only_points_on_screen():
+    picker = VertexPicker()
+    picker.update(POINTS, MVP, VIEWPORT)
+    assert picker.select_box(0, 0, 100, 100).tolist() == [0, 1]
+    assert picker.select_box(100, 100, 0, 0).tolist() == [0, 1]
+    assert picker.select_box(55, 40, 70, 60).tolist() == [1]
@@ -0,0 +1,149 @@
+import string
+
+import numpy as np
+import pygame
+from OpenGL.GL import *
+
+DEFAULT_CHARSET = string.digits + string.ascii_letters + string.punctuation + " "
+
+
+class Glyph:
+    __slots__ = ('x', 'y', 'width', 'height', 'u0', 'v0', 'u1', 'v1')
+
+    def __init__(self, x, y, width, height, atlas_w, atlas_h):
+        self.x, self.y = x, y
+        self.width, self.height = width, height
+        self.u0, self.v0 = x / atlas_w, y / atlas_h
+        self.u1, self.v1 = (x + width) / atlas_w, (y + height) / atlas_h
+
+
+class GlyphAtlas:
+    """Rasteriza cada glifo una sola vez en un atlas y dibuja texto con quads texturizados.
+
+    El mismo atlas sirve para el HUD (OpenGL) y para componer texto en
+    superficies de pygame, así que en régimen estable no se rasteriza la fuente.
+    """
+
+    def __init__(self, font, charset=DEFAULT_CHARSET, color=(255, 255, 255), atlas_width=512, padding=1):
+        self.font = font
+        self.color = color
+        self.line_height = font.get_linesize()
+        self.glyphs = {}
+        self.texture_id = None
+        self._quad_cache = {}
+
+        rendered = {ch: font.render(ch, True, color) for ch in dict.fromkeys(charset)}
+        # Empaquetado por filas
+        x = y = 0
+        row_h = 0
+        positions = {}
+        for ch, surf in rendered.items():
+            w, h = surf.get_size()
+            if x + w + padding > atlas_width:
+                x = 0
+                y += row_h + padding
+                row_h = 0
+            positions[ch] = (x, y)
+            x += w + padding
+            row_h = max(row_h, h)
+        atlas_height = 1
+        while atlas_height < y + row_h:
+            atlas_height *= 2
+
+        self.surface = pygame.Surface((atlas_width, atlas_height), pygame.SRCALPHA)
+        self.surface.fill((0, 0, 0, 0))
+        for ch, surf in rendered.items():
+            gx, gy = positions[ch]
+            self.surface.blit(surf, (gx, gy))
+            self.glyphs[ch] = Glyph(gx, gy, surf.get_width(), surf.get_height(), atlas_width, atlas_height)
+        self._glyph_surfaces = {
+            ch: self.surface.subsurface((g.x, g.y, g.width, g.height)) for ch, g in self.glyphs.items()
+        }
+        self.fallback = self.glyphs.get('?')
+
+    def _glyph(self, ch):
+        return self.glyphs.get(ch, self.fallback)
+
+    def measure(self, text):
+        width = 0
+        for ch in text:
+            g = self._glyph(ch)
+            if g is not None:
+                width += g.width
+        return width, self.line_height
+
+    def blit(self, surface, text, pos):
+        """Compone el texto sobre una superficie de pygame usando los glifos cacheados"""
+        x, y = pos
+        for ch in text:
+            g = self._glyph(ch)
+            if g is None:
+                continue
+            surface.blit(self._glyph_surfaces.get(ch, self._glyph_surfaces.get('?')), (x, y))
+            x += g.width
+
+    def _ensure_texture(self):
+        if self.texture_id is not None:
+            return
+        w, h = self.surface.get_size()
+        data = pygame.image.tostring(self.surface, "RGBA", False)
+        self.texture_id = glGenTextures(1)
+        glBindTexture(GL_TEXTURE_2D, self.texture_id)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_NEAREST)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_NEAREST)
+        glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
+        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, w, h, 0, GL_RGBA, GL_UNSIGNED_BYTE, data)
+
+    def _quads(self, text):
+        """Vértices y coordenadas de textura de un texto en (0, 0), cacheados por cadena"""
+        cached = self._quad_cache.get(text)
+        if cached is not None:
+            return cached
+        verts = []
+        uvs = []
+        x = 0
+        for ch in text:
+            g = self._glyph(ch)
+            if g is None:
+                continue
+            # Eje Y hacia arriba (proyección ortográfica del HUD); la fila 0 del atlas es la de arriba
+            verts += [(x, 0), (x + g.width, 0), (x + g.width, g.height), (x, g.height)]
+            uvs += [(g.u0, g.v1), (g.u1, g.v1), (g.u1, g.v0), (g.u0, g.v0)]
+            x += g.width
+        cached = (np.array(verts, dtype=np.float32).reshape(-1, 2),
+                  np.array(uvs, dtype=np.float32).reshape(-1, 2))
+        if len(self._quad_cache) > 256:
+            self._quad_cache.clear()
+        self._quad_cache[text] = cached
+        return cached
+
+    def draw(self, items):
+        """Dibuja una lista de (texto, x, y) en una sola llamada de dibujo"""
+        verts = []
+        uvs = []
+        for text, x, y in items:
+            v, uv = self._quads(text)
+            if len(v):
+                verts.append(v + np.array([x, y], dtype=np.float32))
+                uvs.append(uv)
+        if not verts:
+            return
+        verts = np.ascontiguousarray(np.concatenate(verts))
+        uvs = np.ascontiguousarray(np.concatenate(uvs))
+
+        self._ensure_texture()
+        glEnable(GL_TEXTURE_2D)
+        glBindTexture(GL_TEXTURE_2D, self.texture_id)
+        glColor4f(1, 1, 1, 1)
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glEnableClientState(GL_TEXTURE_COORD_ARRAY)
+        glVertexPointer(2, GL_FLOAT, 0, verts)
+        glTexCoordPointer(2, GL_FLOAT, 0, uvs)
+        glDrawArrays(GL_QUADS, 0, len(verts))
+        glDisableClientState(GL_TEXTURE_COORD_ARRAY)
+        glDisableClientState(GL_VERTEX_ARRAY)
+
+    def release(self):
+        if self.texture_id is not None:
+            glDeleteTextures([self.texture_id])
+            self.texture_id = None
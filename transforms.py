@@ -0,0 +1,44 @@
+import math
+
+import numpy as np
+
+# Matrices 4x4 en NumPy (fila mayor, vectores columna: p' = M @ p), equivalentes
+# a gluPerspective / glTranslatef / glRotatef y a las funciones de glm.
+
+
+def perspective(fovy, aspect, near, far):
+    f = 1.0 / math.tan(math.radians(fovy) / 2.0)
+    m = np.zeros((4, 4), dtype=np.float64)
+    m[0, 0] = f / aspect
+    m[1, 1] = f
+    m[2, 2] = (far + near) / (near - far)
+    m[2, 3] = 2.0 * far * near / (near - far)
+    m[3, 2] = -1.0
+    return m
+
+
+def translate(x, y, z):
+    m = np.identity(4, dtype=np.float64)
+    m[:3, 3] = (x, y, z)
+    return m
+
+
+def rotate(angle, x, y, z):
+    axis = np.array([x, y, z], dtype=np.float64)
+    axis /= np.linalg.norm(axis)
+    x, y, z = axis
+    c = math.cos(math.radians(angle))
+    s = math.sin(math.radians(angle))
+    t = 1.0 - c
+    m = np.identity(4, dtype=np.float64)
+    m[:3, :3] = [
+        [t * x * x + c,     t * x * y - s * z, t * x * z + s * y],
+        [t * x * y + s * z, t * y * y + c,     t * y * z - s * x],
+        [t * x * z - s * y, t * y * z + s * x, t * z * z + c],
+    ]
+    return m
+
+
+def to_gl(m):
+    """Matriz en orden de columnas lista para glLoadMatrixf / glUniformMatrix4fv"""
+    return np.ascontiguousarray(np.asarray(m, dtype=np.float32).T)
@@ -0,0 +1,231 @@
+import math
+import sys
+
+import glfw
+import gldebug  # antes que OpenGL.GL (ver gldebug.py)
+import numpy as np
+from OpenGL.GL import *
+
+import transforms
+from camera import Camera
+from facetextures import create_face_textures
+from imagecache import image_cache
+from renderer import InstanceBuffer, MAX_LAYERS, QuadFace, create_renderer
+from window import InteractiveCubeApp
+
+# La misma geometría que window.Cube, compartida por todos los cubos de la pared
+CUBE_VERTICES = np.array([
+    [-1, -1,  1], [ 1, -1,  1], [ 1,  1,  1], [-1,  1,  1],
+    [-1, -1, -1], [ 1, -1, -1], [ 1,  1, -1], [-1,  1, -1],
+], dtype=np.float32)
+CUBE_FACES = {
+    'frente': [0, 1, 2, 3],
+    'derecha': [1, 5, 6, 2],
+    'arriba': [3, 2, 6, 7],
+}
+
+
+def grid_transforms(count, spacing=3.0, angle=(30.0, -45.0)):
+    """Matrices de modelo de count cubos en una rejilla cuadrada centrada en el origen,
+    girados como el cubo de window.py para que se vean las tres caras"""
+    cols = max(math.ceil(math.sqrt(count)), 1)
+    rows = math.ceil(count / cols)
+    tilt = transforms.rotate(angle[0], 1, 0, 0) @ transforms.rotate(angle[1], 0, 1, 0)
+    models = []
+    for i in range(count):
+        row, col = divmod(i, cols)
+        x = (col - (cols - 1) / 2.0) * spacing
+        y = ((rows - 1) / 2.0 - row) * spacing
+        models.append(transforms.translate(x, y, 0.0) @ tilt)
+    return models
+
+
+class VideoWall:
+    """Muchos cubos con la misma geometría dibujados con una sola llamada instanciada.
+
+    Cada cubo tiene su matriz de modelo y una capa por cara en un FaceTextureArray
+    compartido. Las capas se asignan por fuente: los cubos que muestran la misma
+    imagen o el mismo video usan la misma capa y un solo decodificador.
+
+    open_player(ruta, capa) crea el reproductor de un video (VideoPlayer o
+    ClipPlayer, ver InteractiveCubeApp.open_player). Las capas son chicas
+    (layer_size): cada reproductor le pide al decodificador frames de ese
+    tamaño (FaceLayer.fit), así ninguna subida reduce en la CPU.
+    """
+
+    faces = ('frente', 'derecha', 'arriba')
+
+    def __init__(self, renderer, open_player, capacity=100, layer_size=256, max_layers=MAX_LAYERS):
+        self.renderer = renderer
+        self.open_player = open_player
+        self.geometry = [QuadFace(CUBE_VERTICES, CUBE_FACES[face]) for face in self.faces]
+        self.textures = create_face_textures(renderer, range(max_layers), layer_size)
+        self.instances = InstanceBuffer(capacity)
+        self.models = []  # matriz de modelo (fila mayor) de cada cubo
+        self.cube_layers = []  # capa de cada cara de cada cubo
+        self._layers = {}  # ('imagen' | 'video', ruta) -> capa
+        self.players = {}  # ruta -> reproductor, uno por fuente
+        # Sin draw_instances (renderer inmediato) se dibuja un cubo por llamada
+        self.instanced = hasattr(renderer, 'draw_instances')
+
+    def __len__(self):
+        return len(self.models)
+
+    def _layer(self, kind, path):
+        key = (kind, path)
+        index = self._layers.get(key)
+        if index is not None:
+            return index
+        if len(self._layers) >= len(self.textures):
+            raise RuntimeError(f"No quedan capas libres en la pared ({len(self.textures)})")
+        index = self._layers[key] = len(self._layers)
+        texture = self.textures[index]
+        if kind == 'imagen':
+            texture.upload_asset(image_cache.get(path))
+        else:
+            player = self.open_player(path, texture)
+            if player is not None:
+                self.players[path] = player
+            else:
+                texture.set_color((0.1, 0.1, 0.1))  # el video no se pudo abrir
+        return index
+
+    def add_cube(self, model, cover, video=None, side=None):
+        """Agrega un cubo con la portada al frente, video arriba y side a la derecha
+        (la portada en las caras sin video); devuelve su índice"""
+        cover_layer = self._layer('imagen', cover)
+        layers = (
+            cover_layer,
+            self._layer('video', side) if side else cover_layer,
+            self._layer('video', video) if video else cover_layer,
+        )
+        if len(self.models) == self.instances.capacity:
+            grown = InstanceBuffer(self.instances.capacity * 2)
+            grown.data[:len(self.models)] = self.instances.data[:len(self.models)]
+            self._release_instances()
+            self.instances = grown
+        i = len(self.models)
+        self.models.append(np.asarray(model, dtype=np.float64))
+        self.cube_layers.append(layers)
+        self.instances.set(i, model, layers)
+        return i
+
+    def set_transform(self, i, model):
+        self.models[i] = np.asarray(model, dtype=np.float64)
+        self.instances.set(i, model)
+
+    def update(self):
+        """Sube el frame que toca de cada fuente de video (una vez aunque la usen varios cubos)"""
+        for player in self.players.values():
+            player.update()
+
+    def time_to_next_frame(self):
+        times = [t for t in (p.time_to_next_frame() for p in self.players.values()) if t is not None]
+        return min(times) if times else None
+
+    def draw(self, view, projection, instanced=None):
+        instanced = self.instanced if instanced is None else instanced
+        if instanced:
+            self.renderer.begin(view, projection)
+            self.renderer.draw_instances(self.geometry, self.textures, self.instances)
+            self.renderer.end()
+            return
+        # Una llamada por cubo: el camino del renderer inmediato y la referencia del benchmark
+        for model, layers in zip(self.models, self.cube_layers):
+            self.renderer.begin(view @ model, projection)
+            self.renderer.draw_faces([(geometry, self.textures[layer])
+                                      for geometry, layer in zip(self.geometry, layers)])
+            self.renderer.end()
+
+    def oversized(self):
+        """Frames que llegaron más grandes que la capa y se descartaron (solo los
+        primeros de cada fuente, hasta que el decodificador achica)"""
+        return sum(getattr(player, 'oversized', 0) for player in self.players.values())
+
+    def stats(self):
+        return {
+            'cubes': len(self),
+            'layers': len(self._layers),
+            'decoders': len(self.players),
+            'instanced': self.instanced,
+            'layer_size': self.textures.layer_size if hasattr(self.textures, 'layer_size') else None,
+            'frame_sizes': {path: player.frame_size for path, player in self.players.items()},
+            'oversized': self.oversized(),
+        }
+
+    def _release_instances(self):
+        if hasattr(self.renderer, 'release_instances'):
+            self.renderer.release_instances(self.instances)
+
+    def release(self):
+        for player in self.players.values():
+            player.release()
+        self.players.clear()
+        self._release_instances()
+        self.textures.release()
+
+
+class VideoWallApp(InteractiveCubeApp):
+    """Ventana con una pared de count cubos: portada al frente y los videos de
+    videos repartidos entre las caras superior y derecha.
+
+    Uso: python videowall.py [cubos]   (CUBE_RENDERER elige el renderer)
+    """
+
+    def __init__(self, count=100, cover='cover.png', videos=('mish.mp4', 'mish.gif', 'mish2.gif', 'mish4.gif'),
+                 **kwargs):
+        super().__init__(**kwargs)
+        # De frente y sin órbita; el zoom se ajusta al tamaño de la pared en load_resources
+        self.camera = Camera(pitch=0.0, yaw=0.0, far=500.0, zoom_range=(-500.0, -2.0))
+        self.count = count
+        self.cover = cover
+        self.videos = list(videos)
+        self.wall = None
+
+    def load_resources(self):
+        self.renderer = create_renderer(mode=self.renderer_mode)
+        self.wall = VideoWall(self.renderer, self.open_player, capacity=self.count)
+        n = len(self.videos)
+        for i, model in enumerate(grid_transforms(self.count)):
+            self.wall.add_cube(model, self.cover, video=self.videos[i % n], side=self.videos[(i + 1) % n])
+        cols = max(math.ceil(math.sqrt(self.count)), 1)
+        self.zoom = -max(6.0, cols * 4.0)
+
+    def render(self):
+        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+        view, proj = self.setup_proj()
+        with self.profiler.scope('VideoWall.update'):
+            self.wall.update()
+        self.wall.draw(view, proj)
+        self.profiler_overlay.draw(self.width, self.height)
+
+    def schedule_next_frame(self):
+        if self.profiler_overlay.visible:
+            self.governor.invalidate('overlay')
+        self.governor.schedule_in(self.wall.time_to_next_frame(), 'video')
+
+    def key_callback(self, window, key, scancode, action, mods):
+        if action == glfw.PRESS:
+            self.governor.invalidate('input')
+            if key == glfw.KEY_P:
+                self.profiler_overlay.toggle()
+
+    def mouse_button_callback(self, window, button, action, mods):
+        pass  # la pared no tiene vértices que arrastrar
+
+    def mouse_motion_callback(self, window, xpos, ypos):
+        pass
+
+    def scroll_callback(self, window, xoffset, yoffset):
+        self.camera.zoom_by(yoffset * 2.0)
+        self.governor.invalidate('input')
+
+    def cleanup(self):
+        if self.wall:
+            self.wall.release()
+            self.wall = None
+        super().cleanup()
+
+
+if __name__ == '__main__':
+    VideoWallApp(count=int(sys.argv[1]) if len(sys.argv) > 1 else 100).run()
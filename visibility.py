@@ -0,0 +1,80 @@
+import numpy as np
+
+VISIBLE = 'visible'
+BACK_FACING = 'back_facing'
+OUTSIDE = 'outside'        # fuera del frustum
+DEGENERATE = 'degenerate'  # área nula en pantalla
+
+
+def classify_face(positions, indices, mvp, viewport, min_area=1.0):
+    """(estado, área) de una malla (FaceMesh o QuadFace) con sus vértices actuales.
+
+    área son los píxeles que cubren sus triángulos de frente (antihorarios en la
+    ventana), como coverage.projected_area. Una malla está fuera del frustum si
+    todos sus vértices quedan del mismo lado de un mismo plano; si cruza el plano
+    de la cámara no se puede proyectar y se toma como visible con el viewport
+    entero de área.
+    """
+    points = np.asarray(positions, dtype=np.float64)
+    clip = points @ mvp[:, :3].T + mvp[:, 3]
+    w = clip[:, 3]
+    for axis in range(3):
+        if (clip[:, axis] > w).all() or (clip[:, axis] < -w).all():
+            return OUTSIDE, 0.0
+    vx, vy, vw, vh = viewport
+    full = float(vw * vh)
+    if not (w > 1e-9).all():
+        return VISIBLE, full
+    window = clip[:, :2] / w[:, None] * (0.5 * vw, 0.5 * vh)
+    tri = window[np.asarray(indices).reshape(-1, 3)]
+    a, b, c = tri[:, 0], tri[:, 1], tri[:, 2]
+    cross = (b[:, 0] - a[:, 0]) * (c[:, 1] - a[:, 1]) - (b[:, 1] - a[:, 1]) * (c[:, 0] - a[:, 0])
+    front = float(cross[cross > 0].sum()) * 0.5
+    back = -float(cross[cross < 0].sum()) * 0.5
+    if front + back < min_area:
+        return DEGENERATE, front
+    if front < min_area:
+        return BACK_FACING, front
+    return VISIBLE, min(front, full)
+
+
+class VisibilityPass:
+    """Visibilidad de las caras del cubo, recalculada en cada frame.
+
+    Las caras de espaldas, fuera del frustum o sin área no se dibujan y sus
+    reproductores no suben frames (ver VideoPlayer.set_visible).
+    """
+
+    def __init__(self, min_area=1.0):
+        self.min_area = min_area
+        self.states = {}  # cara -> estado
+        self.areas = {}   # cara -> píxeles de frente en pantalla
+        # Contadores
+        self.hidden_frames = {}  # cara -> frames que pasó oculta
+        self.changes = 0
+
+    def update(self, meshes, mvp, viewport):
+        """Clasifica cada malla de meshes (nombre -> malla); devuelve los nombres visibles"""
+        visible = set()
+        for name, mesh in meshes.items():
+            state, area = classify_face(mesh.positions, mesh.indices, mvp, viewport, self.min_area)
+            if self.states.get(name, state) != state:
+                self.changes += 1
+            self.states[name] = state
+            self.areas[name] = area
+            if state == VISIBLE:
+                visible.add(name)
+            else:
+                self.hidden_frames[name] = self.hidden_frames.get(name, 0) + 1
+        return visible
+
+    def is_visible(self, name):
+        return self.states.get(name, VISIBLE) == VISIBLE
+
+    def stats(self):
+        return {
+            'faces': dict(self.states),
+            'areas': dict(self.areas),
+            'hidden_frames': dict(self.hidden_frames),
+            'changes': self.changes,
+        }
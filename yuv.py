@@ -0,0 +1,4 @@
+def plane_sizes(width, height):
+    """(ancho, alto) de los planos Y, U y V de un frame yuv420p"""
+    chroma = ((width + 1) // 2, (height + 1) // 2)
+    return [(width, height), chroma, chroma]